@@ -2,9 +2,13 @@
 Main FastAPI application.
 """
 import os
+import copy
+import json
 import uuid
 import asyncio
-from typing import List, Set
+import contextvars
+import threading
+from typing import List, Optional, Set
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -12,14 +16,16 @@ load_dotenv()
 
 from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from app.models.schemas import (
     QueryRequest, QueryResponse, UploadResponse, StatusResponse,
     Entity, Relationship, GraphNode, GraphEdge, GraphData,
-    Citation, AnswerEntity, ChunkReference, SessionProcessingStatus, ExportData
+    Citation, AnswerEntity, ChunkReference, SessionProcessingStatus, ExportData,
+    BatchQueryRequest, BatchQueryResponse, BatchQueryResult
 )
-from app.modules.preprocessing import preprocess_documents
+from app.modules.preprocessing import TokenChunker, iter_document_chunks, shutdown_pdf_pool
+from app.modules.pdf_extraction import PdfExtractor
 from app.modules.retrieval import EmbeddingModel, FAISSRetriever
 from app.modules.entity_extraction import EntityExtractor
 from app.modules.graph_builder import KnowledgeGraphBuilder
@@ -30,8 +36,16 @@ from app.modules.citation import (
 from app.modules.context_graph import ContextualGraphBuilder
 from app.modules.enhanced_answer_generator import EnhancedAnswerGenerator
 from app.modules.pdf_exporter import PDFExporter
-from app.modules.pipeline_tracker import PipelineTracker
-from app.modules.text_reconstructor import TextReconstructor
+from app.modules.ingest_pipeline import DEFAULT_POLL_SECONDS, IngestPipeline, IngestProgress, IngestResult
+from app.modules.pipeline_tracker import INGEST_KINDS, PipelineTracker, Trace, annotate, current_span, trace_span
+from app.modules.text_reconstructor import (
+    TextReconstructor, RECONSTRUCTION_VERSION, reconstruct_document_chunks
+)
+from app.modules.session_store import open_session_store
+from app.modules.session_manager import SessionManager
+from app.modules.llm_integration import close_llm_pools
+from app.modules.answer_cache import AnswerCache
+from app.modules.word_segmentation import configure_segmenter, load_word_list
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -56,8 +70,90 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
-# Global state for sessions (in-memory, for production use DB)
-sessions = {}
+# Persisted sessions are reloaded lazily from this directory after a restart
+SESSION_STORE_DIR = os.getenv(
+    "SESSION_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "sessions")
+)
+SESSION_PERSISTENCE = os.getenv("SESSION_PERSISTENCE", "true").lower() in ("1", "true", "yes", "on")
+
+# Live-session limits: evicted sessions are spilled to the session store and reloaded on demand
+SESSION_MEMORY_BUDGET_MB = float(os.getenv("SESSION_MEMORY_BUDGET_MB", "1024"))
+SESSION_IDLE_TTL_SECONDS = float(os.getenv("SESSION_IDLE_TTL_SECONDS", "3600"))
+SESSION_SPILL_TO_DISK = os.getenv("SESSION_SPILL_TO_DISK", "true").lower() in ("1", "true", "yes", "on")
+
+# Chunk embeddings are cached on disk by content hash; empty disables the cache
+EMBEDDING_CACHE_DIR = os.getenv(
+    "EMBEDDING_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "embeddings")
+)
+
+# Embedding throughput knobs for CPU-only hosts
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0")) or None
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+
+# FAISS index selection ("auto" picks Flat / IVF-Flat / IVF-PQ by corpus size) and ANN defaults
+FAISS_INDEX_FACTORY = os.getenv("FAISS_INDEX_FACTORY", "auto")
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+# "cosine" scores by inner product over normalized vectors; "l2" keeps the legacy 1/(1+d) scores
+FAISS_METRIC = os.getenv("FAISS_METRIC", "cosine").lower()
+
+# Answers generated concurrently per /query-batch request (bounded to spare the LLM provider)
+QUERY_BATCH_CONCURRENCY = max(1, int(os.getenv("QUERY_BATCH_CONCURRENCY", "4")))
+
+# Answer cache: responses reused for the same session, retrieved chunks, generator and prompt
+# version; ANSWER_CACHE_SIMILARITY > 0 also matches paraphrased queries by embedding cosine
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+
+# Worker processes for PDF page extraction (0 = one per core, 1 = in-process)
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "0")) or None
+# Fast PDF text backend ("auto" = PyMuPDF if installed, else pypdf; "pdfplumber" disables the
+# fast path); pages scoring below PDF_MIN_TEXT_QUALITY are re-extracted with pdfplumber
+PDF_EXTRACT_BACKEND = os.getenv("PDF_EXTRACT_BACKEND", "auto").lower()
+PDF_MIN_TEXT_QUALITY = float(os.getenv("PDF_MIN_TEXT_QUALITY", "0.9"))
+
+# Chunk sizing: "words" (~300 words, sentence overlap) or "tokens" (embedding tokenizer tokens;
+# chunks always fit the model's max sequence length, 0 = the model limit)
+CHUNKING_MODE = os.getenv("CHUNKING_MODE", "words").lower()
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "0")) or None
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+
+# Ingest pipeline: chunks per batch handed between stages, and batches buffered per stage
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "4"))
+
+# Recent upload/query traces kept for /pipeline-visualization (ring buffer across sessions)
+PIPELINE_TRACE_CAPACITY = int(os.getenv("PIPELINE_TRACE_CAPACITY", "200"))
+
+# Domain word list (one word per line) added to the vocabulary used to split concatenated words
+SEGMENTATION_WORDS_FILE = os.getenv("SEGMENTATION_WORDS_FILE", "")
+if SEGMENTATION_WORDS_FILE:
+    try:
+        configure_segmenter(load_word_list(SEGMENTATION_WORDS_FILE))
+    except OSError as e:
+        print(f"[CONFIG] Ignoring SEGMENTATION_WORDS_FILE {SEGMENTATION_WORDS_FILE}: {e}")
+
+# Global state for sessions (in-memory LRU, backed by the on-disk session store)
+sessions = SessionManager(
+    memory_budget_bytes=int(SESSION_MEMORY_BUDGET_MB * 1024 * 1024),
+    idle_ttl_seconds=SESSION_IDLE_TTL_SECONDS
+)
+
+try:
+    pdf_extractor = PdfExtractor(PDF_EXTRACT_BACKEND, PDF_MIN_TEXT_QUALITY)
+except ValueError as e:
+    print(f"[CONFIG] {e}; using the default PDF backend")
+    pdf_extractor = PdfExtractor(min_quality=PDF_MIN_TEXT_QUALITY)
+
+answer_cache = AnswerCache(
+    max_entries=ANSWER_CACHE_SIZE,
+    ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+    similarity_threshold=ANSWER_CACHE_SIMILARITY
+)
 
 # Lazy initialization of components (on first use)
 embedding_model = None
@@ -65,15 +161,45 @@ entity_extractor = None
 answer_generator = None
 enhanced_answer_generator = None
 pipeline_tracker = None
+session_store = None
+token_chunker = None
 
 def get_embedding_model():
     """Lazily initialize embedding model on first use."""
     global embedding_model
     if embedding_model is None:
         print("Initializing embedding model (this may take a moment)...")
-        embedding_model = EmbeddingModel()
+        options = dict(
+            batch_size=EMBEDDING_BATCH_SIZE,
+            num_threads=EMBEDDING_THREADS,
+            query_cache_size=QUERY_CACHE_SIZE
+        )
+        try:
+            embedding_model = EmbeddingModel(cache_dir=EMBEDDING_CACHE_DIR or None, **options)
+        except OSError as e:
+            print(f"Embedding cache disabled, cannot use {EMBEDDING_CACHE_DIR}: {e}")
+            embedding_model = EmbeddingModel(**options)
     return embedding_model
 
+def get_token_chunker():
+    """Lazily build the token-aware chunker from the embedding tokenizer (None in words mode)."""
+    global token_chunker, CHUNKING_MODE
+    if token_chunker is None and CHUNKING_MODE == "tokens":
+        model = get_embedding_model().model
+        try:
+            token_chunker = TokenChunker(
+                model.tokenizer,
+                model.max_seq_length,
+                overlap_tokens=CHUNK_OVERLAP_TOKENS,
+                max_tokens=CHUNK_MAX_TOKENS
+            )
+            print(f"[CONFIG] Token-aware chunking: {token_chunker.max_tokens} tokens per chunk, "
+                  f"{token_chunker.overlap_tokens} overlap")
+        except ValueError as e:
+            print(f"[CONFIG] {e}; chunking by words")
+            CHUNKING_MODE = "words"
+    return token_chunker
+
 def get_entity_extractor():
     """Lazily initialize entity extractor on first use."""
     global entity_extractor
@@ -99,9 +225,17 @@ def get_pipeline_tracker():
     """Get or initialize pipeline tracker."""
     global pipeline_tracker
     if pipeline_tracker is None:
-        pipeline_tracker = PipelineTracker()
+        pipeline_tracker = PipelineTracker(capacity=PIPELINE_TRACE_CAPACITY)
     return pipeline_tracker
-    return answer_generator
+
+def get_session_store():
+    """Lazily open the on-disk session store (None when persistence is disabled)."""
+    global session_store
+    if session_store is None and SESSION_PERSISTENCE:
+        session_store = open_session_store(SESSION_STORE_DIR)
+        if SESSION_SPILL_TO_DISK:
+            sessions.store = session_store
+    return session_store
 
 
 class RAGSession:
@@ -109,13 +243,25 @@ class RAGSession:
     
     def __init__(self, session_id: str):
         self.session_id = session_id
-        self.retriever = FAISSRetriever(get_embedding_model())
+        self.retriever = FAISSRetriever(
+            get_embedding_model(),
+            index_factory=FAISS_INDEX_FACTORY,
+            nprobe=FAISS_NPROBE,
+            ef_search=FAISS_EF_SEARCH,
+            metric=FAISS_METRIC
+        )
         self.chunks = []
+        # Reconstructed chunk text for answers and snippets, parallel to chunks
+        self.display_chunks = []
+        self.reconstruction_version = None
+        self.display_lock = threading.Lock()
         self.sources = []
         self.entities = []
         self.entity_chunk_map = {}
         self.graph_builder = KnowledgeGraphBuilder()
         self.is_processing = False
+        # Documents are being appended; queries keep using the committed index meanwhile
+        self.is_appending = False
         self.processing_error = None
         
         # PHASE 1: Detailed processing status tracking
@@ -123,111 +269,400 @@ class RAGSession:
         self.processing_stage = "idle"  # 'idle', 'chunking', 'embedding', 'building_graph'
         self.total_entities = 0
         self.total_graph_edges = 0
+        # Most recent ingest run (per-stage throughput and queue depth, per-document progress)
+        self.ingest_pipeline = None
+        self.ingest_progress = None
     
-    def update_document_status(self, filename: str, status: str, progress: int = 0, chunks: int = 0, error: str = None):
-        """Update processing status for a document."""
+    def update_document_status(self, filename: str, status: str, progress: int = 0, chunks: int = 0, error: str = None, **details):
+        """
+        Update processing status for a document.
+        
+        Extra keyword arguments (pages_parsed, chunks_embedded, eta_seconds, ...) are stored
+        alongside and kept until overwritten.
+        """
         if filename not in self.documents_metadata:
-            self.documents_metadata[filename] = {}
+            self.documents_metadata[filename] = {'filename': filename}
         self.documents_metadata[filename].update({
             'status': status,
             'progress': progress,
             'chunks_count': chunks,
-            'error': error
+            'error': error,
+            **details
         })
     
     def get_processing_status(self):
         """Get current processing status."""
-        from app.models.schemas import SessionProcessingStatus, DocumentProcessingStatus
+        from app.models.schemas import SessionProcessingStatus, DocumentProcessingStatus, PipelineStageStatus
         
         docs_status = [
             DocumentProcessingStatus(**self.documents_metadata[fname])
             for fname in self.documents_metadata
         ]
+        pipeline_stages = [
+            PipelineStageStatus(**stage) for stage in self.ingest_pipeline.stage_stats()
+        ] if self.ingest_pipeline else []
+        
+        busy = self.is_processing or self.is_appending
+        if busy:
+            overall = self.ingest_progress.overall() if self.ingest_progress else {
+                'poll_after_seconds': DEFAULT_POLL_SECONDS
+            }
+        elif self.processing_error:
+            overall = {}
+        else:
+            overall = {'progress': 100.0, 'eta_seconds': 0.0}
         
         return SessionProcessingStatus(
             session_id=self.session_id,
-            overall_status='processing' if self.is_processing else ('error' if self.processing_error else 'completed'),
+            overall_status='processing' if busy else ('error' if self.processing_error else 'completed'),
             documents=docs_status,
             total_chunks=len(self.chunks),
             total_entities=self.total_entities,
             total_graph_edges=self.total_graph_edges,
             current_stage=self.processing_stage,
-            error_message=self.processing_error
+            error_message=self.processing_error,
+            pipeline_stages=pipeline_stages,
+            **overall
         )
 
 
-def process_session_sync(session_id: str, chunks: List, sources: List, session: RAGSession, file_contents_info: List = None):
+def get_session(session_id: str):
+    """
+    Look up a session, lazily reloading it from the session store if it is not in memory.
+    
+    Args:
+        session_id: Session / index identifier
+        
+    Returns:
+        RAGSession or None if the session does not exist
+    """
+    session = sessions.get(session_id)
+    if session is not None:
+        return session
+    
+    store = get_session_store()
+    if store is None or not store.exists(session_id):
+        return None
+    
+    session = RAGSession(session_id)
+    try:
+        if not store.load(session):
+            return None
+    except Exception as e:
+        print(f"[STORE] Failed to load session {session_id}: {str(e)}")
+        return None
+    
+    sessions[session_id] = session
+    print(f"[STORE] Reloaded session {session_id} from disk ({len(session.chunks)} chunks)")
+    
+    # Sessions persisted before the cosine metric was enabled get their index rebuilt once
+    if session.retriever.needs_metric_migration():
+        try:
+            session.retriever.migrate_metric()
+            persist_session(session)
+        except Exception as e:
+            print(f"[STORE] Keeping legacy index for session {session_id}: {str(e)}")
+    
+    # Display chunks from an older reconstruction pipeline are rebuilt off the request path
+    if session.reconstruction_version != RECONSTRUCTION_VERSION:
+        print(f"[STORE] Reconstructing chunks of session {session_id} "
+              f"(version {session.reconstruction_version} -> {RECONSTRUCTION_VERSION})")
+        threading.Thread(target=refresh_display_chunks, args=(session,), daemon=True).start()
+    return session
+
+
+def persist_session(session: RAGSession):
+    """Write a fully processed session to the session store, if enabled."""
+    store = get_session_store()
+    if store is None:
+        return
+    try:
+        store.save(session)
+        print(f"[STORE] Persisted session {session.session_id}")
+    except Exception as e:
+        print(f"[STORE] Failed to persist session {session.session_id}: {str(e)}")
+
+
+def refresh_display_chunks(session: RAGSession):
+    """
+    Rebuild a session's display chunks with the current reconstruction pipeline.
+    
+    Queries reconstruct retrieved chunks on the fly until the new chunks are published.
+    """
+    try:
+        while True:
+            chunks = session.chunks
+            display_chunks = reconstruct_document_chunks(chunks)
+            with session.display_lock:
+                # Retry if an append or delete replaced the chunk list meanwhile
+                if session.chunks is chunks:
+                    session.display_chunks = display_chunks
+                    session.reconstruction_version = RECONSTRUCTION_VERSION
+                    break
+        print(f"[STORE] Reconstructed {len(display_chunks)} chunks of session {session.session_id}")
+    except Exception as e:
+        print(f"[STORE] Reconstruction failed for session {session.session_id}: {str(e)}")
+        return
+    
+    persist_session(session)
+    sessions.update_size(session.session_id)
+
+
+def ingest_documents(
+    session: RAGSession,
+    file_contents: List,
+    index,
+    start_idx: int = 0,
+    graph_builder: Optional[KnowledgeGraphBuilder] = None
+) -> IngestResult:
+    """
+    Run uploaded files through the ingest pipeline (blocking, for thread pool execution).
+    
+    Extraction and chunking, embedding, entity extraction, graph building and chunk
+    reconstruction run as overlapping stages; the graph is extended as entities arrive,
+    everything else is returned for the caller to publish. Inside a trace, every stage
+    records a child span of the active span.
+    
+    Args:
+        session: Session being filled
+        file_contents: (content, filename) tuples
+        index: Called with (chunks, sources, embeddings) once every chunk is embedded
+        start_idx: Session-wide index of the first new chunk
+        graph_builder: Builder whose graph is extended (the session's by default)
+        
+    Returns:
+        Ingest result
+    """
+    entity_extractor = get_entity_extractor()
+    progress = IngestProgress(
+        [(filename, len(content)) for content, filename in file_contents],
+        publish=session.update_document_status
+    )
+    pipeline = IngestPipeline(
+        embed=session.retriever.embedding_model.encode_documents,
+        index=index,
+        extract_entities=lambda chunks, start, seen: entity_extractor.extract_from_chunks(
+            chunks, start_idx=start, seen_entities=seen
+        ),
+        add_to_graph=(graph_builder or session.graph_builder).add_to_graph,
+        reconstruct=reconstruct_document_chunks,
+        batch_size=INGEST_BATCH_SIZE,
+        queue_size=INGEST_QUEUE_SIZE,
+        on_batch=progress.batch_done,
+        span=current_span()
+    )
+    session.ingest_pipeline = pipeline
+    session.ingest_progress = progress
+    chunk_stream = iter_document_chunks(
+        file_contents,
+        pdf_workers=PDF_EXTRACT_WORKERS,
+        pdf_extractor=pdf_extractor,
+        chunker=get_token_chunker(),
+        progress=progress.extraction_progress
+    )
+    return pipeline.run(progress.chunks(chunk_stream), start_idx=start_idx, known_entities=session.entities)
+
+
+def process_session_sync(session_id: str, session: RAGSession, file_contents: List, trace: Optional[Trace] = None):
     """Process session synchronously (blocking, for thread pool execution)."""
+    filenames = [filename for _, filename in file_contents]
+    trace = trace or get_pipeline_tracker().start_trace('upload', session_id)
     try:
         print(f"[ASYNC] Starting processing for session {session_id}")
         
-        # Initialize document metadata
-        if file_contents_info:
-            for filename, _ in file_contents_info:
-                session.update_document_status(filename, 'uploaded', 0)
-        
-        # Build retrieval index
-        session.processing_stage = 'embedding'
-        print(f"[ASYNC] Building embedding index for session {session_id}...")
-        
-        # Update progress for documents
-        if file_contents_info:
-            for filename, _ in file_contents_info:
-                session.update_document_status(filename, 'embedding', 50)
-        
-        session.retriever.build_index(chunks, sources)
-        print(f"[ASYNC] Embedding index built successfully for {session_id}")
-        
-        # Update progress
-        if file_contents_info:
-            for filename, _ in file_contents_info:
-                session.update_document_status(filename, 'embedding', 100)
-        
-        # Extract entities
-        session.processing_stage = 'entities'
-        print(f"[ASYNC] Extracting entities for session {session_id}...")
-        session.entities, session.entity_chunk_map = get_entity_extractor().extract_from_chunks(chunks)
-        session.total_entities = len(session.entities)
-        print(f"[ASYNC] Extracted {len(session.entities)} entities for {session_id}")
-        
-        # Build knowledge graph
-        session.processing_stage = 'graph'
-        print(f"[ASYNC] Building knowledge graph for session {session_id}...")
-        session.graph_builder.build_graph(
-            session.entities,
-            session.entity_chunk_map,
-            chunks
-        )
+        session.processing_stage = 'ingesting'
+        with trace.span('ingest', files=len(file_contents)):
+            result = ingest_documents(
+                session,
+                file_contents,
+                index=lambda chunks, sources, embeddings: session.retriever.build_index(chunks, sources, embeddings)
+            )
+        if not result.chunks:
+            raise ValueError("No text content could be extracted from the uploaded files. Please check your documents.")
+        print(f"[ASYNC] Created {len(result.chunks)} chunks and {len(result.entities)} entities for {session_id}")
+        
+        with session.display_lock:
+            session.chunks = result.chunks
+            session.display_chunks = result.display_chunks
+            session.reconstruction_version = RECONSTRUCTION_VERSION
+        session.sources = result.sources
+        session.entities = result.entities
+        session.entity_chunk_map = result.entity_chunk_map
+        session.total_entities = len(result.entities)
         session.total_graph_edges = len(session.graph_builder.graph.edges())
-        print(f"[ASYNC] Knowledge graph built successfully for {session_id}")
         
         # Mark all documents as indexed
-        if file_contents_info:
-            for filename, _ in file_contents_info:
-                session.update_document_status(filename, 'indexed', 100)
+        for filename in filenames:
+            session.update_document_status(
+                filename, 'indexed', 100, chunks=sum(1 for src in result.sources if src == filename),
+                eta_seconds=0.0
+            )
         
         session.processing_stage = 'completed'
         session.is_processing = False
         print(f"[ASYNC] Session {session_id} processing completed successfully")
         
+        with trace.span('persist'):
+            persist_session(session)
+        sessions.update_size(session_id)
+        trace.finish()
+        
     except Exception as e:
+        trace.finish(e)
         print(f"[ASYNC] Error processing session {session_id}: {str(e)}")
+        for filename in filenames:
+            session.update_document_status(filename, 'error', 0, error=str(e), eta_seconds=None)
         session.is_processing = False
         session.processing_error = str(e)
         session.processing_stage = 'error'
 
 
-async def process_session_async(session_id: str, chunks: List, sources: List, session: RAGSession, file_contents_info: List = None):
+async def process_session_async(session_id: str, session: RAGSession, file_contents: List, trace: Optional[Trace] = None):
     """Process session asynchronously (non-blocking)."""
     try:
         loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, process_session_sync, session_id, chunks, sources, session, file_contents_info)
+        await loop.run_in_executor(None, process_session_sync, session_id, session, file_contents, trace)
     except Exception as e:
         print(f"[ASYNC] Error in async processing for {session_id}: {str(e)}")
         session.processing_error = str(e)
         session.is_processing = False
 
 
+def process_append_sync(session: RAGSession, file_contents: List, trace: Optional[Trace] = None):
+    """
+    Add new documents to an already indexed session (blocking, for thread pool execution).
+    
+    Only the new chunks are embedded and scanned for entities. Their embeddings and graph
+    edges are staged while the pipeline runs and committed to the FAISS index, entity maps
+    and knowledge graph only once every stage has succeeded, so a failed append leaves the
+    session as it was.
+    """
+    session_id = session.session_id
+    filenames = [filename for _, filename in file_contents]
+    trace = trace or get_pipeline_tracker().start_trace('append', session_id)
+    staged_embeddings = []
+    # Shallow copy: shares the spaCy model, extends a copy of the graph
+    graph_builder = copy.copy(session.graph_builder)
+    graph_builder.graph = session.graph_builder.graph.copy()
+    error = None
+    try:
+        print(f"[APPEND] Adding {len(filenames)} files to session {session_id}")
+        
+        session.processing_stage = 'ingesting'
+        with trace.span('ingest', files=len(file_contents)):
+            result = ingest_documents(
+                session,
+                file_contents,
+                index=lambda chunks, sources, embeddings: staged_embeddings.append(embeddings),
+                start_idx=len(session.chunks),
+                graph_builder=graph_builder
+            )
+        if not result.chunks:
+            raise ValueError("No text content could be extracted from the uploaded files. Please check your documents.")
+        
+        # Commit the extended corpus together once every structure is ready; queries are
+        # only turned away for the moment the index and chunk lists are swapped
+        session.is_processing = True
+        with trace.span('commit', chunks=len(result.chunks)):
+            session.retriever.add_documents(result.chunks, result.sources, staged_embeddings[0])
+        session.graph_builder.graph = graph_builder.graph
+        with session.display_lock:
+            session.chunks = session.retriever.chunks
+            session.display_chunks = session.display_chunks + result.display_chunks
+        session.sources = session.retriever.sources
+        session.entities = session.entities + result.entities
+        session.entity_chunk_map = {**session.entity_chunk_map, **result.entity_chunk_map}
+        answer_cache.invalidate_session(session_id)
+        session.total_entities = len(session.entities)
+        session.total_graph_edges = len(session.graph_builder.graph.edges())
+        
+        for filename in filenames:
+            session.update_document_status(
+                filename, 'indexed', 100, chunks=sum(1 for src in result.sources if src == filename),
+                eta_seconds=0.0
+            )
+        print(f"[APPEND] Session {session_id} now has {len(session.chunks)} chunks, {session.total_entities} entities")
+    except Exception as e:
+        # Nothing was committed, so the session stays queryable as it was
+        error = e
+        print(f"[APPEND] Error appending to session {session_id}: {str(e)}")
+        for filename in filenames:
+            session.update_document_status(filename, 'error', 0, error=str(e), eta_seconds=None)
+    finally:
+        session.processing_stage = 'completed'
+        session.is_processing = False
+        session.is_appending = False
+    
+    with trace.span('persist'):
+        persist_session(session)
+    sessions.update_size(session_id)
+    trace.finish(error)
+
+
+def remove_document_sync(session: RAGSession, filename: str):
+    """
+    Remove one document from a session (blocking, for thread pool execution).
+    
+    The document's vectors are removed from the FAISS index by id; chunk lists, entity maps
+    and the knowledge graph are remapped to the surviving chunk positions.
+    """
+    session_id = session.session_id
+    try:
+        session.processing_stage = 'removing'
+        remap = session.retriever.remove_documents(filename)
+        
+        entity_chunk_map = {
+            remap[chunk_idx]: chunk_entities
+            for chunk_idx, chunk_entities in session.entity_chunk_map.items()
+            if chunk_idx in remap
+        }
+        entities = EntityExtractor.prune_entities(session.entities, entity_chunk_map)
+        session.graph_builder.prune_graph(entities, entity_chunk_map, remap)
+        
+        with session.display_lock:
+            display_chunks = [None] * len(remap)
+            for old, new in remap.items():
+                if old < len(session.display_chunks):
+                    display_chunks[new] = session.display_chunks[old]
+            session.chunks = session.retriever.chunks
+            session.display_chunks = display_chunks
+        session.sources = session.retriever.sources
+        session.entities = entities
+        session.entity_chunk_map = entity_chunk_map
+        answer_cache.invalidate_session(session_id)
+        session.total_entities = len(entities)
+        session.total_graph_edges = len(session.graph_builder.graph.edges())
+        session.documents_metadata.pop(filename, None)
+        print(f"[DELETE] Removed {filename} from session {session_id}; {len(session.chunks)} chunks remain")
+    finally:
+        session.processing_stage = 'completed'
+        session.is_processing = False
+    
+    persist_session(session)
+    sessions.update_size(session_id)
+
+
+def compact_index_sync(session: RAGSession):
+    """Rebuild a session's index without its tombstoned vectors (background task)."""
+    session.is_processing = True
+    session.processing_stage = 'compacting'
+    try:
+        session.retriever.compact()
+    except Exception as e:
+        print(f"[DELETE] Compaction failed for session {session.session_id}: {str(e)}")
+    finally:
+        session.processing_stage = 'completed'
+        session.is_processing = False
+    persist_session(session)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Close pooled LLM connections and stop PDF extraction workers."""
+    await close_llm_pools()
+    shutdown_pdf_pool()
+
+
 @app.get("/status", response_model=StatusResponse)
 async def status():
     """Health check endpoint."""
@@ -237,6 +672,81 @@ async def status():
     )
 
 
+@app.get("/sessions/stats")
+async def session_stats():
+    """Memory usage and eviction statistics for live sessions."""
+    return sessions.stats()
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss statistics for the query embedding, chunk embedding and answer caches."""
+    if embedding_model is None:
+        return {"query_embeddings": None, "chunk_embeddings": None, "answers": answer_cache.stats()}
+    return {
+        "query_embeddings": embedding_model.query_cache_info(),
+        "chunk_embeddings": embedding_model.cache.stats() if embedding_model.cache else None,
+        "answers": answer_cache.stats()
+    }
+
+
+async def read_uploads(files: List[UploadFile]):
+    """
+    Validate and read uploaded files (they are preprocessed by the background ingest).
+    
+    Args:
+        files: Uploaded PDF or text files
+        
+    Returns:
+        List of (content, filename) tuples
+        
+    Raises:
+        HTTPException: On missing, unsupported or empty files
+    """
+    if not files or len(files) == 0:
+        raise HTTPException(status_code=400, detail="No files provided. Please select at least one file.")
+    
+    print(f"\n[UPLOAD] Starting upload for {len(files)} files")
+    
+    # Validate file types
+    supported_extensions = {'.pdf', '.txt', '.md', '.yaml', '.yml'}
+    for file in files:
+        if not any(file.filename.lower().endswith(ext) for ext in supported_extensions):
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Invalid file type: {file.filename}. Supported: PDF, TXT, MD"
+            )
+    
+    # Read file contents
+    file_contents = []
+    total_size = 0
+    for file in files:
+        try:
+            content = await file.read()
+            if len(content) == 0:
+                raise HTTPException(status_code=400, detail=f"File {file.filename} is empty")
+            file_contents.append((content, file.filename))
+            total_size += len(content)
+            print(f"[UPLOAD] Read {len(content)} bytes from {file.filename}")
+        except Exception as e:
+            print(f"[UPLOAD] Error reading {file.filename}: {str(e)}")
+            raise HTTPException(status_code=400, detail=f"Error reading file {file.filename}: {str(e)}")
+    
+    print(f"[UPLOAD] Total file size: {total_size / 1024 / 1024:.2f} MB")
+    
+    return file_contents
+
+
+async def read_traced_uploads(files: List[UploadFile], trace: Trace):
+    """read_uploads timed as the trace's 'read' span; a failed read also closes the trace."""
+    try:
+        with trace.span('read', files=len(files)):
+            return await read_uploads(files)
+    except Exception as e:
+        trace.finish(e)
+        raise
+
+
 @app.post("/upload", response_model=UploadResponse)
 async def upload(files: List[UploadFile] = File(...), background_tasks: BackgroundTasks = None):
     """
@@ -247,85 +757,33 @@ async def upload(files: List[UploadFile] = File(...), background_tasks: Backgrou
         background_tasks: Background task queue
         
     Returns:
-        Upload response with index ID and chunk count
+        Upload response with index ID and chunk count (0 while the background ingest runs;
+        /upload-status reports progress)
     """
     try:
-        if not files or len(files) == 0:
-            raise HTTPException(status_code=400, detail="No files provided. Please select at least one file.")
-        
-        print(f"\n[UPLOAD] Starting upload for {len(files)} files")
-        
-        # Validate file types
-        supported_extensions = {'.pdf', '.txt', '.md', '.yaml', '.yml'}
-        for file in files:
-            if not any(file.filename.lower().endswith(ext) for ext in supported_extensions):
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Invalid file type: {file.filename}. Supported: PDF, TXT, MD"
-                )
-        
-        # Read file contents
-        file_contents = []
-        total_size = 0
-        for file in files:
-            try:
-                content = await file.read()
-                if len(content) == 0:
-                    raise HTTPException(status_code=400, detail=f"File {file.filename} is empty")
-                file_contents.append((content, file.filename))
-                total_size += len(content)
-                print(f"[UPLOAD] Read {len(content)} bytes from {file.filename}")
-            except Exception as e:
-                print(f"[UPLOAD] Error reading {file.filename}: {str(e)}")
-                raise HTTPException(status_code=400, detail=f"Error reading file {file.filename}: {str(e)}")
-        
-        print(f"[UPLOAD] Total file size: {total_size / 1024 / 1024:.2f} MB")
-        
-        # Preprocess documents
-        print("[UPLOAD] Preprocessing documents...")
-        try:
-            chunks, sources = preprocess_documents(file_contents)
-        except Exception as e:
-            print(f"[UPLOAD] Preprocessing error: {str(e)}")
-            raise HTTPException(status_code=400, detail=f"Error preprocessing documents: {str(e)}")
-        
-        if not chunks or len(chunks) == 0:
-            raise HTTPException(status_code=400, detail="No text content could be extracted from the uploaded files. Please check your documents.")
-        
-        print(f"[UPLOAD] Created {len(chunks)} chunks from documents")
+        session_id = str(uuid.uuid4())
+        trace = get_pipeline_tracker().start_trace('upload', session_id)
+        file_contents = await read_traced_uploads(files, trace)
         
         # Create session
-        session_id = str(uuid.uuid4())
         session = RAGSession(session_id)
-        session.chunks = chunks
-        session.sources = sources
         
         # Mark session as processing in background
         session.is_processing = True
+        for _, filename in file_contents:
+            session.update_document_status(filename, 'uploaded', 0)
+        get_session_store()  # Open the store first so evictions can spill to disk
         sessions[session_id] = session
         
-        # Queue heavy processing as background task to avoid timeout
+        # Queue preprocessing and indexing as a background task to avoid timeout
         if background_tasks:
-            background_tasks.add_task(
-                process_session_async,
-                session_id,
-                chunks,
-                sources,
-                session,
-                file_contents  # Pass file contents info for status tracking
-            )
+            background_tasks.add_task(process_session_async, session_id, session, file_contents, trace)
             print(f"[UPLOAD] Session {session_id} queued for background processing")
         else:
             # Fallback: Process synchronously in thread pool
             print("[UPLOAD] Processing in thread pool...")
             await asyncio.get_event_loop().run_in_executor(
-                None, 
-                process_session_sync, 
-                session_id, 
-                chunks, 
-                sources, 
-                session,
-                file_contents  # Pass file contents info for status tracking
+                None, process_session_sync, session_id, session, file_contents, trace
             )
             print(f"[UPLOAD] Session {session_id} processing complete")
         
@@ -333,7 +791,7 @@ async def upload(files: List[UploadFile] = File(...), background_tasks: Backgrou
         return UploadResponse(
             status="success",
             index_id=session_id,
-            chunks_count=len(chunks),
+            chunks_count=len(session.chunks),
             message=f"Upload started. Session {session_id} is processing in background."
         )
         
@@ -349,21 +807,116 @@ async def upload(files: List[UploadFile] = File(...), background_tasks: Backgrou
 @app.get("/upload-status/{session_id}", response_model=SessionProcessingStatus)
 async def upload_status(session_id: str):
     """Check detailed processing status for a session (PHASE 1)."""
-    if session_id not in sessions:
+    session = get_session(session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
-    
-    session = sessions[session_id]
     return session.get_processing_status()
 
 
+@app.post("/upload/{index_id}/append", response_model=UploadResponse)
+async def append_documents(index_id: str, files: List[UploadFile] = File(...), background_tasks: BackgroundTasks = None):
+    """
+    Append documents to an existing session.
+    
+    Only the new files are preprocessed and embedded; ingest cost scales with the delta
+    rather than the whole corpus. The session keeps answering queries from its current
+    documents until the new ones are committed.
+    
+    Args:
+        index_id: Existing session / index ID
+        files: List of PDF or text files to add
+        background_tasks: Background task queue
+        
+    Returns:
+        Upload response with the session's index ID and new chunk count (0 while the
+        background ingest runs)
+    """
+    session = get_session(index_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if session.is_processing or session.is_appending:
+        raise HTTPException(status_code=409, detail=f"Session {index_id} is still processing. Please wait and try again.")
+    if session.processing_error:
+        raise HTTPException(status_code=409, detail=f"Session {index_id} failed processing and cannot be extended: {session.processing_error}")
+    
+    existing = set(session.sources)
+    duplicates = [f.filename for f in files if f.filename in existing]
+    if duplicates:
+        raise HTTPException(status_code=409, detail=f"Already in session: {', '.join(duplicates)}")
+    
+    trace = get_pipeline_tracker().start_trace('append', index_id)
+    file_contents = await read_traced_uploads(files, trace)
+    
+    session.is_appending = True
+    for _, filename in file_contents:
+        session.update_document_status(filename, 'uploaded', 0)
+    
+    if background_tasks:
+        # Starlette runs sync background tasks in its thread pool
+        background_tasks.add_task(process_append_sync, session, file_contents, trace)
+    else:
+        await asyncio.get_event_loop().run_in_executor(
+            None, process_append_sync, session, file_contents, trace
+        )
+    
+    return UploadResponse(
+        status="success",
+        index_id=index_id,
+        chunks_count=sum(session.documents_metadata[filename]['chunks_count'] for _, filename in file_contents),
+        message=f"Appending {len(file_contents)} documents to session {index_id} in background."
+    )
+
+
+@app.delete("/documents/{index_id}/{filename:path}")
+async def delete_document(index_id: str, filename: str, background_tasks: BackgroundTasks = None):
+    """
+    Remove a document from an existing session without rebuilding the whole index.
+    
+    Args:
+        index_id: Session / index ID
+        filename: Name of the uploaded document to remove
+        background_tasks: Background task queue (used for index compaction)
+        
+    Returns:
+        Remaining chunk, entity and edge counts
+    """
+    session = get_session(index_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if session.is_processing or session.is_appending:
+        raise HTTPException(status_code=409, detail=f"Session {index_id} is still processing. Please wait and try again.")
+    if filename not in session.sources and filename not in session.documents_metadata:
+        raise HTTPException(status_code=404, detail=f"Document not found in session: {filename}")
+    
+    session.is_processing = True
+    await asyncio.get_event_loop().run_in_executor(None, remove_document_sync, session, filename)
+    
+    compacting = session.retriever.needs_compaction()
+    if compacting:
+        session.is_processing = True
+        if background_tasks:
+            background_tasks.add_task(compact_index_sync, session)
+        else:
+            await asyncio.get_event_loop().run_in_executor(None, compact_index_sync, session)
+    
+    return {
+        "status": "success",
+        "message": f"Removed {filename} from session {index_id}",
+        "index_id": index_id,
+        "chunks_count": len(session.chunks),
+        "entities_count": session.total_entities,
+        "graph_edges_count": session.total_graph_edges,
+        "compacting": compacting
+    }
+
+
 # PHASE 1: Export endpoints for indexed data
 @app.post("/export/chunks/{session_id}")
 async def export_chunks(session_id: str):
     """Export indexed chunks as JSON (PHASE 1)."""
-    if session_id not in sessions:
+    session = get_session(session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
-    
-    session = sessions[session_id]
     if not session.chunks:
         raise HTTPException(status_code=400, detail="No chunks available for export")
     
@@ -393,10 +946,9 @@ async def export_chunks(session_id: str):
 @app.post("/export/entities/{session_id}")
 async def export_entities(session_id: str, format: str = "json"):
     """Export extracted entities as JSON or CSV (PHASE 1)."""
-    if session_id not in sessions:
+    session = get_session(session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
-    
-    session = sessions[session_id]
     if not session.entities:
         raise HTTPException(status_code=400, detail="No entities available for export")
     
@@ -471,10 +1023,9 @@ async def export_entities(session_id: str, format: str = "json"):
 @app.post("/export/graph/{session_id}")
 async def export_graph(session_id: str):
     """Export knowledge graph as JSON (PHASE 1)."""
-    if session_id not in sessions:
+    session = get_session(session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
-    
-    session = sessions[session_id]
     if not session.graph_builder or not session.graph_builder.graph:
         raise HTTPException(status_code=400, detail="No graph available for export")
     
@@ -508,11 +1059,10 @@ async def export_graph(session_id: str):
 @app.post("/export/trace/{session_id}")
 async def export_reasoning_trace(session_id: str, query_index: int = 0):
     """Export full reasoning trace with answer, sources, and entities (PHASE 1)."""
-    if session_id not in sessions:
+    session = get_session(session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    session = sessions[session_id]
-    
     export_data = {
         "session_id": session_id,
         "pipeline": {
@@ -540,129 +1090,193 @@ async def export_reasoning_trace(session_id: str, query_index: int = 0):
     }
 
 
-@app.post("/query", response_model=QueryResponse)
-async def query(request: QueryRequest):
+def get_queryable_session(session_id: str) -> RAGSession:
+    """Look up a session for querying, raising an HTTP error if it cannot serve queries yet."""
+    session = get_session(session_id) if session_id else None
+    if session is None:
+        raise HTTPException(status_code=404, detail="Index not found. Please upload documents first.")
+    
+    # Check if session is still processing
+    if session.is_processing:
+        raise HTTPException(status_code=503, detail=f"Session {session_id} is still processing. Please wait a moment and try again.")
+    
+    if session.processing_error:
+        raise HTTPException(status_code=500, detail=f"Session {session_id} encountered an error during processing: {session.processing_error}")
+    
+    if not session.retriever.is_indexed():
+        raise HTTPException(status_code=400, detail="Index not properly initialized")
+    return session
+
+
+def reconstruct_retrieved_chunks(session: RAGSession, retrieved_chunk_indices: List[int]) -> List[str]:
+    """Clean up retrieved chunks for answer generation, raising 404 if nothing was retrieved."""
+    # Chunks are reconstructed at ingest; only stale or partial sessions reconstruct here
+    display_chunks = session.display_chunks
+    if session.reconstruction_version == RECONSTRUCTION_VERSION and len(display_chunks) == len(session.chunks):
+        retrieved_chunks = [display_chunks[idx] for idx in retrieved_chunk_indices]
+    else:
+        reconstructor = TextReconstructor()
+        retrieved_chunks = [reconstructor.reconstruct(session.chunks[idx]) for idx in retrieved_chunk_indices]
+    
+    if not retrieved_chunks:
+        raise HTTPException(status_code=404, detail="No relevant documents found")
+    return retrieved_chunks
+
+
+async def build_query_response(session: RAGSession, query: str, retrieved_chunk_indices: List[int], retrieval_scores: List[float]) -> QueryResponse:
     """
-    Process query and return answer with traceability and explanations.
+    Generate and explain an answer from already retrieved chunks.
     
-    Implements:
-    - Answer citations to source chunks
-    - Entity extraction from retrieved context only
-    - Query-focused knowledge graph
-    - Confidence scoring
-    - Entity-answer linking
-    - Automatic text reconstruction for clean output
+    Shared by /query and /query-batch. Responses are served from the answer cache when
+    the same (or a sufficiently similar) question was answered from the same chunks. The
+    LLM call is awaited on the event loop; the CPU-bound explanation (citations, entity
+    linking, context graph, confidence) runs in the thread pool.
     
     Args:
-        request: Query request with query text and session ID
+        session: Queryable RAG session
+        query: Query text
+        retrieved_chunk_indices: Retrieved chunk positions, best first
+        retrieval_scores: Similarity of each retrieved chunk
         
     Returns:
         Query response with answer, entities, relationships, graph, and traceability
     """
-    try:
-        # Initialize text reconstructor for clean output
-        reconstructor = TextReconstructor()
-        
-        # Get session
-        session_id = request.index_id
-        if not session_id or session_id not in sessions:
-            raise HTTPException(status_code=404, detail="Index not found. Please upload documents first.")
-        
-        session = sessions[session_id]
-        
-        # Check if session is still processing
-        if session.is_processing:
-            raise HTTPException(status_code=503, detail=f"Session {session_id} is still processing. Please wait a moment and try again.")
-        
-        if session.processing_error:
-            raise HTTPException(status_code=500, detail=f"Session {session_id} encountered an error during processing: {session.processing_error}")
-        
-        if not session.retriever.is_indexed():
-            raise HTTPException(status_code=400, detail="Index not properly initialized")
-        
-        # PHASE 3: Retrieve with chunk indices for filtering
-        print(f"[Query] Processing: {request.query}")
-        retrieved_chunk_indices, retrieval_scores = session.retriever.get_retrieved_indices(
-            request.query,
-            k=request.top_k
+    with trace_span('reconstruct', chunks=len(retrieved_chunk_indices)):
+        retrieved_chunks = reconstruct_retrieved_chunks(session, retrieved_chunk_indices)
+    
+    print(f"[Query] Retrieved {len(retrieved_chunks)} chunks with mean similarity {sum(retrieval_scores)/len(retrieval_scores):.3f}")
+    
+    with trace_span('answer_cache'):
+        cache_key = answer_cache_key(session, query, retrieved_chunk_indices, select_answer_generator())
+        cached = answer_cache.get(**cache_key)
+        annotate(hit=cached is not None)
+    if cached is not None:
+        print("[Query] Served answer from cache")
+        return cached
+    
+    with trace_span('llm'):
+        answer = await generate_answer(query, retrieved_chunks)
+        annotate(answer_chars=len(answer))
+    
+    # The copied context carries the active trace span into the worker thread
+    with trace_span('explain'):
+        response = await asyncio.get_event_loop().run_in_executor(
+            None, contextvars.copy_context().run,
+            explain_answer, session, answer, retrieved_chunks, retrieved_chunk_indices, retrieval_scores
         )
-        retrieved_chunk_indices_set = set(retrieved_chunk_indices)
-        
-        # Get actual chunks for answer generation and reconstruct them
-        retrieved_chunks = [session.chunks[idx] for idx in retrieved_chunk_indices]
-        retrieved_chunks = [reconstructor.reconstruct(chunk) for chunk in retrieved_chunks]
-        retrieved_sources = [session.sources[idx] for idx in retrieved_chunk_indices]
-        
-        if not retrieved_chunks:
-            raise HTTPException(status_code=404, detail="No relevant documents found")
-        
-        print(f"[Query] Retrieved {len(retrieved_chunks)} chunks with mean similarity {sum(retrieval_scores)/len(retrieval_scores):.3f}")
-        
-        # PHASE 2: Generate answer with citation instructions
-        use_enhanced = os.getenv("USE_ENHANCED_ANSWER", "true").lower() in ("1", "true", "yes", "on")
-        answer_generator = get_answer_generator()
-        answer = ""
-
-        if use_enhanced:
-            enhanced = get_enhanced_answer_generator()
-            if enhanced.client:
-                answer_data = enhanced.generate_detailed(request.query, retrieved_chunks)
-                key_points = answer_data.get("key_points", [])
-                key_points_block = "\n".join(f"- {p}" for p in key_points if p)
-                summary = answer_data.get("summary", "").strip()
-                main_answer = answer_data.get("main_answer", "").strip()
-
-                answer_sections = [main_answer]
-                if summary:
-                    answer_sections.append("Summary:\n" + summary)
-                if key_points_block:
-                    answer_sections.append("Key Points:\n" + key_points_block)
-                answer = "\n\n".join(section for section in answer_sections if section)
-            else:
-                answer = answer_generator.generate(request.query, retrieved_chunks)
-        else:
-            answer = answer_generator.generate(request.query, retrieved_chunks)
+    answer_cache.put(value=response, **cache_key)
+    return response
 
-        print(f"[Query] Generated answer ({len(answer)} chars)")
-        
-        # PHASE 2: Extract citations from answer
+
+def answer_cache_key(session: RAGSession, query: str, retrieved_chunk_indices: List[int], generator) -> dict:
+    """Answer-cache lookup arguments for a query answered from the given chunks."""
+    return {
+        "session_id": session.session_id,
+        "chunk_ids": [session.retriever.chunk_ids[idx] for idx in retrieved_chunk_indices],
+        "generator_key": generator_cache_key(generator),
+        "query": query,
+        "query_embedding": session.retriever.embed_query(query) if answer_cache.enabled else None,
+    }
+
+
+def select_answer_generator():
+    """The generator /query uses: the enhanced one when enabled and an LLM is configured."""
+    use_enhanced = os.getenv("USE_ENHANCED_ANSWER", "true").lower() in ("1", "true", "yes", "on")
+    if use_enhanced:
+        enhanced = get_enhanced_answer_generator()
+        if enhanced.client:
+            return enhanced
+    return get_answer_generator()
+
+
+def generator_cache_key(generator) -> tuple:
+    """Answer-cache key component identifying generator type, model and prompt version."""
+    model = generator.model if generator.client else "fallback"
+    return (type(generator).__name__, model, generator.PROMPT_VERSION)
+
+
+def collect_context_entities(session: RAGSession, retrieved_chunk_indices: List[int], retrieval_scores: List[float]):
+    """
+    Entities of the retrieved chunks, read from the per-chunk map built at ingest.
+    
+    Returns:
+        Tuple of (entity dicts with the retrieval score of their chunk, de-duplicated Entity
+        models in retrieval order)
+    """
+    retrieved_entities = []
+    for chunk_idx, score in zip(retrieved_chunk_indices, retrieval_scores):
+        for ent in session.entity_chunk_map.get(chunk_idx, ()):
+            retrieved_entities.append({
+                'name': ent['name'],
+                'type': ent['type'],
+                'source_chunk_id': chunk_idx,
+                'retrieval_score': float(score)
+            })
+    
+    # Remove duplicates while preserving retrieval scores
+    seen = set()
+    unique_entities = []
+    for ent in retrieved_entities:
+        key = (ent['name'].lower(), ent['type'])
+        if key not in seen:
+            unique_entities.append(Entity(**ent))
+            seen.add(key)
+    return retrieved_entities, unique_entities
+
+
+async def generate_answer(query: str, retrieved_chunks: List[str]) -> str:
+    """Generate an answer with citation instructions (enhanced format when enabled)."""
+    # PHASE 2: Generate answer with citation instructions
+    generator = select_answer_generator()
+    answer = ""
+    
+    if isinstance(generator, EnhancedAnswerGenerator):
+        answer_data = await generator.generate_detailed(query, retrieved_chunks)
+        key_points = answer_data.get("key_points", [])
+        key_points_block = "\n".join(f"- {p}" for p in key_points if p)
+        summary = answer_data.get("summary", "").strip()
+        main_answer = answer_data.get("main_answer", "").strip()
+        
+        answer_sections = [main_answer]
+        if summary:
+            answer_sections.append("Summary:\n" + summary)
+        if key_points_block:
+            answer_sections.append("Key Points:\n" + key_points_block)
+        answer = "\n\n".join(section for section in answer_sections if section)
+    else:
+        answer = await generator.generate(query, retrieved_chunks)
+    
+    print(f"[Query] Generated answer ({len(answer)} chars)")
+    return answer
+
+
+def explain_answer(session: RAGSession, answer: str, retrieved_chunks: List[str], retrieved_chunk_indices: List[int], retrieval_scores: List[float]) -> QueryResponse:
+    """Attach citations, entities, context graph and confidence to a generated answer (blocking)."""
+    retrieved_chunk_indices_set = set(retrieved_chunk_indices)
+    
+    # PHASE 2: Extract citations from answer
+    with trace_span('citations'):
         citations_list, unsupported_segments = find_answer_citations(answer, retrieved_chunks, retrieval_scores)
-        print(f"[Query] Found {len(citations_list)} citations, {len(unsupported_segments)} unsupported segments")
-        
-        # Convert to Citation objects
-        citations = [Citation(**c) for c in citations_list]
-        
-        # PHASE 3: Extract entities ONLY from retrieved context
-        retrieved_entities = []
-        entity_extractor_instance = get_entity_extractor()
-        for chunk_idx in retrieved_chunk_indices:
-            chunk = session.chunks[chunk_idx]
-            entities = entity_extractor_instance.extract_entities(chunk)
-            for ent in entities:
-                retrieved_entities.append({
-                    'name': ent['name'],
-                    'type': ent['type'],
-                    'source_chunk_id': chunk_idx,
-                    'retrieval_score': float(retrieval_scores[retrieved_chunk_indices.index(chunk_idx)])
-                })
-        
-        # Remove duplicates while preserving retrieval scores
-        seen = {}
-        unique_entities = []
-        for ent in retrieved_entities:
-            key = (ent['name'].lower(), ent['type'])
-            if key not in seen:
-                unique_entities.append(Entity(**ent))
-                seen[key] = ent
+        annotate(citations=len(citations_list), unsupported_segments=len(unsupported_segments))
+    print(f"[Query] Found {len(citations_list)} citations, {len(unsupported_segments)} unsupported segments")
+    
+    # Convert to Citation objects
+    citations = [Citation(**c) for c in citations_list]
+    
+    # PHASE 3: Entities ONLY from retrieved context (precomputed at ingest)
+    with trace_span('entities'):
+        retrieved_entities, unique_entities = collect_context_entities(session, retrieved_chunk_indices, retrieval_scores)
         
         print(f"[Query] Extracted {len(unique_entities)} unique entities from context")
         
         # PHASE 4: Extract entities mentioned in answer
         answer_entities_list = extract_answer_entities(answer, retrieved_entities)
-        answer_entities = [AnswerEntity(**e) for e in answer_entities_list]
-        print(f"[Query] Found {len(answer_entities)} entities mentioned in answer")
-        
-        # PHASE 3: Build context-focused knowledge graph
+        annotate(entities=len(unique_entities), answer_entities=len(answer_entities_list))
+    answer_entities = [AnswerEntity(**e) for e in answer_entities_list]
+    print(f"[Query] Found {len(answer_entities)} entities mentioned in answer")
+    
+    # PHASE 3: Build context-focused knowledge graph
+    with trace_span('graph'):
         context_graph_builder = ContextualGraphBuilder()
         context_graph = context_graph_builder.build_context_graph(
             retrieved_entities,
@@ -670,62 +1284,101 @@ async def query(request: QueryRequest):
             session.chunks,
             session.entity_chunk_map
         )
-        
-        # Get relationships from context graph
-        relationships = [
-            Relationship(
-                from_entity=rel['from_entity'],
-                to_entity=rel['to_entity'],
-                relation=rel['relation']
-            )
-            for rel in context_graph_builder.get_relationships()
-        ]
-        
-        print(f"[Query] Built context graph with {len(context_graph.nodes())} entities, {len(relationships)} relationships")
-        
-        # Get graph data for visualization
-        graph_data_dict = context_graph_builder.get_graph_data()
-        graph_nodes = [GraphNode(**node) for node in graph_data_dict['nodes']]
-        graph_edges = [GraphEdge(**edge) for edge in graph_data_dict['edges']]
-        graph_data = GraphData(nodes=graph_nodes, edges=graph_edges)
-        
-        # PHASE 6: Calculate confidence score
-        answer_sentence_count = len(extract_sentences(answer))
-        confidence_score = calculate_answer_confidence(
-            citations_list,
-            retrieval_scores,
-            answer_sentence_count
+        annotate(nodes=context_graph.number_of_nodes(), edges=context_graph.number_of_edges())
+    
+    # Get relationships from context graph
+    relationships = [
+        Relationship(
+            from_entity=rel['from_entity'],
+            to_entity=rel['to_entity'],
+            relation=rel['relation']
         )
-        print(f"[Query] Confidence score: {confidence_score:.3f}")
-        
-        # Create chunk references for attribution
-        chunk_references = [
-            ChunkReference(
-                index=idx,
-                filename=session.sources[idx],
-                relevance_score=float(retrieval_scores[retrieved_chunk_indices.index(idx)])
-            )
-            for idx in retrieved_chunk_indices
-        ]
-        
-        # Build and return comprehensive response
-        response = QueryResponse(
-            answer=answer,
-            entities=unique_entities,
-            answer_entities=answer_entities,
-            relationships=relationships,
-            graph_data=graph_data,
-            citations=citations,
-            confidence_score=confidence_score,
-            unsupported_segments=unsupported_segments,
-            retrieval_scores=retrieval_scores,
-            chunk_references=chunk_references,
-            snippets=retrieved_chunks,
-            status="success"
+        for rel in context_graph_builder.get_relationships()
+    ]
+    
+    print(f"[Query] Built context graph with {len(context_graph.nodes())} entities, {len(relationships)} relationships")
+    
+    # Get graph data for visualization
+    graph_data_dict = context_graph_builder.get_graph_data()
+    graph_nodes = [GraphNode(**node) for node in graph_data_dict['nodes']]
+    graph_edges = [GraphEdge(**edge) for edge in graph_data_dict['edges']]
+    graph_data = GraphData(nodes=graph_nodes, edges=graph_edges)
+    
+    # PHASE 6: Calculate confidence score
+    answer_sentence_count = len(extract_sentences(answer))
+    confidence_score = calculate_answer_confidence(
+        citations_list,
+        retrieval_scores,
+        answer_sentence_count
+    )
+    print(f"[Query] Confidence score: {confidence_score:.3f}")
+    
+    # Create chunk references for attribution
+    chunk_references = [
+        ChunkReference(
+            index=idx,
+            filename=session.sources[idx],
+            relevance_score=float(score)
         )
+        for idx, score in zip(retrieved_chunk_indices, retrieval_scores)
+    ]
+    
+    # Build and return comprehensive response
+    response = QueryResponse(
+        answer=answer,
+        entities=unique_entities,
+        answer_entities=answer_entities,
+        relationships=relationships,
+        graph_data=graph_data,
+        citations=citations,
+        confidence_score=confidence_score,
+        unsupported_segments=unsupported_segments,
+        retrieval_scores=retrieval_scores,
+        chunk_references=chunk_references,
+        snippets=retrieved_chunks,
+        status="success"
+    )
+    
+    print(f"[Query] Response complete - {len(answer)} char answer, {len(citations)} citations, confidence {confidence_score:.2%}")
+    return response
+
+
+@app.post("/query", response_model=QueryResponse)
+async def query(request: QueryRequest):
+    """
+    Process query and return answer with traceability and explanations.
+    
+    Implements:
+    - Answer citations to source chunks
+    - Entity extraction from retrieved context only
+    - Query-focused knowledge graph
+    - Confidence scoring
+    - Entity-answer linking
+    - Automatic text reconstruction for clean output
+    
+    Args:
+        request: Query request with query text and session ID
         
-        print(f"[Query] Response complete - {len(answer)} char answer, {len(citations)} citations, confidence {confidence_score:.2%}")
-        return response
+    Returns:
+        Query response with answer, entities, relationships, graph, and traceability
+    """
+    try:
+        session = get_queryable_session(request.index_id)
+        
+        with get_pipeline_tracker().trace('query', session.session_id, query=request.query, top_k=request.top_k):
+            # PHASE 3: Retrieve with chunk indices for filtering
+            print(f"[Query] Processing: {request.query}")
+            with trace_span('retrieve'):
+                retrieved_chunk_indices, retrieval_scores = session.retriever.get_retrieved_indices(
+                    request.query,
+                    k=request.top_k,
+                    nprobe=request.nprobe,
+                    ef_search=request.ef_search,
+                    min_score=request.min_score
+                )
+                annotate(chunks=len(retrieved_chunk_indices))
+            
+            return await build_query_response(session, request.query, retrieved_chunk_indices, retrieval_scores)
         
     except HTTPException:
         raise
@@ -736,6 +1389,123 @@ async def query(request: QueryRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/query-batch", response_model=BatchQueryResponse)
+async def query_batch(request: BatchQueryRequest):
+    """
+    Answer many queries against one session in a single request.
+    
+    All queries are encoded in one batched forward pass and searched with one multi-row
+    FAISS search; answer generation then fans out concurrently (QUERY_BATCH_CONCURRENCY).
+    A failing query is reported in its own result without failing the batch.
+    
+    Args:
+        request: Batch query request with query texts and session ID
+        
+    Returns:
+        One result per query, in request order
+    """
+    session = get_queryable_session(request.index_id)
+    loop = asyncio.get_event_loop()
+    
+    print(f"[Query] Processing batch of {len(request.queries)} queries")
+    retrieved = await loop.run_in_executor(
+        None,
+        lambda: session.retriever.search_batch(
+            request.queries,
+            k=request.top_k,
+            nprobe=request.nprobe,
+            ef_search=request.ef_search,
+            min_score=request.min_score
+        )
+    )
+    
+    semaphore = asyncio.Semaphore(QUERY_BATCH_CONCURRENCY)
+    
+    async def answer_one(query_text: str, indices: List[int], scores: List[float]) -> BatchQueryResult:
+        async with semaphore:
+            try:
+                response = await build_query_response(session, query_text, indices, scores)
+                return BatchQueryResult(query=query_text, response=response)
+            except HTTPException as e:
+                return BatchQueryResult(query=query_text, error=str(e.detail))
+            except Exception as e:
+                print(f"[Query] Error in batch query '{query_text}': {e}")
+                return BatchQueryResult(query=query_text, error=str(e))
+    
+    results = await asyncio.gather(*[
+        answer_one(query_text, indices, scores)
+        for query_text, (indices, scores) in zip(request.queries, retrieved)
+    ])
+    return BatchQueryResponse(results=list(results))
+
+
+def sse_event(event: str, data) -> str:
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/query-stream")
+async def query_stream(request: QueryRequest):
+    """
+    Stream a query answer as Server-Sent Events.
+    
+    Events, in order:
+    - retrieval: chunk references, scores and snippets as soon as search finishes
+    - token: answer text deltas as the LLM produces them
+    - final: the full QueryResponse (citations, entities, graph, confidence)
+    - error: emitted instead of the remaining events if generation fails midway
+    
+    Args:
+        request: Query request with query text and session ID
+        
+    Returns:
+        text/event-stream response
+    """
+    session = get_queryable_session(request.index_id)
+    
+    print(f"[Query] Streaming: {request.query}")
+    retrieved_chunk_indices, retrieval_scores = session.retriever.get_retrieved_indices(
+        request.query,
+        k=request.top_k,
+        nprobe=request.nprobe,
+        ef_search=request.ef_search,
+        min_score=request.min_score
+    )
+    retrieved_chunks = reconstruct_retrieved_chunks(session, retrieved_chunk_indices)
+    
+    async def events():
+        yield sse_event("retrieval", {
+            "chunk_references": [
+                {"index": idx, "filename": session.sources[idx], "relevance_score": float(score)}
+                for idx, score in zip(retrieved_chunk_indices, retrieval_scores)
+            ],
+            "retrieval_scores": retrieval_scores,
+            "snippets": retrieved_chunks
+        })
+        
+        try:
+            parts = []
+            async for delta in get_answer_generator().stream(request.query, retrieved_chunks):
+                parts.append(delta)
+                yield sse_event("token", {"text": delta})
+            answer = "".join(parts).strip()
+            print(f"[Query] Streamed answer ({len(answer)} chars)")
+            
+            response = await asyncio.get_event_loop().run_in_executor(
+                None, explain_answer, session, answer, retrieved_chunks, retrieved_chunk_indices, retrieval_scores
+            )
+            yield sse_event("final", response.model_dump(mode="json"))
+        except Exception as e:
+            print(f"[Query] Streaming error: {e}")
+            yield sse_event("error", {"detail": str(e)})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # PHASE 2: Entity-focused query endpoint
 @app.post("/query-entity-focus", response_model=QueryResponse)
 async def query_with_entity_focus(request: QueryRequest):
@@ -746,11 +1516,10 @@ async def query_with_entity_focus(request: QueryRequest):
     try:
         # Get basic session and validation (same as regular query)
         session_id = request.index_id
-        if not session_id or session_id not in sessions:
+        session = get_session(session_id) if session_id else None
+        if session is None:
             raise HTTPException(status_code=404, detail="Index not found. Please upload documents first.")
         
-        session = sessions[session_id]
-        
         if session.is_processing:
             raise HTTPException(status_code=503, detail=f"Session {session_id} is still processing.")
         
@@ -782,11 +1551,10 @@ async def query_with_excluded_entity(request: QueryRequest):
     """
     try:
         session_id = request.index_id
-        if not session_id or session_id not in sessions:
+        session = get_session(session_id) if session_id else None
+        if session is None:
             raise HTTPException(status_code=404, detail="Index not found. Please upload documents first.")
         
-        session = sessions[session_id]
-        
         if session.is_processing:
             raise HTTPException(status_code=503, detail=f"Session {session_id} is still processing.")
         
@@ -813,15 +1581,17 @@ async def debug_retrieve(request: QueryRequest):
     """Debug endpoint to show retrieval results with similarities."""
     try:
         session_id = request.index_id
-        if not session_id or session_id not in sessions:
+        session = get_session(session_id) if session_id else None
+        if session is None:
             raise HTTPException(status_code=404, detail="Index not found")
         
-        session = sessions[session_id]
-        
         # Retrieve with details
         retrieved_chunks, retrieved_sources, similarities = session.retriever.retrieve(
             request.query,
-            k=request.top_k
+            k=request.top_k,
+            nprobe=request.nprobe,
+            ef_search=request.ef_search,
+            min_score=request.min_score
         )
         
         return {
@@ -842,9 +1612,13 @@ async def debug_retrieve(request: QueryRequest):
 
 @app.post("/clear")
 async def clear_session(index_id: str):
-    """Clear a session."""
-    if index_id in sessions:
-        del sessions[index_id]
+    """Clear a session from memory and from the session store."""
+    found = sessions.pop(index_id, None) is not None
+    answer_cache.invalidate_session(index_id)
+    store = get_session_store()
+    if store is not None:
+        found = store.delete(index_id) or found
+    if found:
         return {"status": "success", "message": "Session cleared"}
     raise HTTPException(status_code=404, detail="Session not found")
 
@@ -856,11 +1630,10 @@ async def query_enhanced(request: QueryRequest):
     """
     try:
         session_id = request.index_id
-        if not session_id or session_id not in sessions:
+        session = get_session(session_id) if session_id else None
+        if session is None:
             raise HTTPException(status_code=404, detail="Index not found. Please upload documents first.")
         
-        session = sessions[session_id]
-        
         if session.is_processing:
             raise HTTPException(status_code=503, detail=f"Session {session_id} is still processing.")
         
@@ -875,7 +1648,10 @@ async def query_enhanced(request: QueryRequest):
         # Retrieve chunks
         retrieved_chunk_indices, retrieval_scores = session.retriever.get_retrieved_indices(
             request.query,
-            k=request.top_k
+            k=request.top_k,
+            nprobe=request.nprobe,
+            ef_search=request.ef_search,
+            min_score=request.min_score
         )
         retrieved_chunks = [session.chunks[idx] for idx in retrieved_chunk_indices]
         retrieved_sources = [session.sources[idx] for idx in retrieved_chunk_indices]
@@ -885,34 +1661,20 @@ async def query_enhanced(request: QueryRequest):
         
         print(f"[Enhanced Query] Retrieved {len(retrieved_chunks)} chunks")
         
-        # Generate enhanced answer
         enhanced_gen = get_enhanced_answer_generator()
-        answer_data = enhanced_gen.generate_detailed(request.query, retrieved_chunks)
+        cache_key = answer_cache_key(session, request.query, retrieved_chunk_indices, enhanced_gen)
+        cached = answer_cache.get(**cache_key)
+        if cached is not None:
+            print("[Enhanced Query] Served answer from cache")
+            return cached
+        
+        # Generate enhanced answer
+        answer_data = await enhanced_gen.generate_detailed(request.query, retrieved_chunks)
         
         print(f"[Enhanced Query] Answer generated")
         
-        # Extract entities from retrieved context
-        retrieved_entities = []
-        entity_extractor_instance = get_entity_extractor()
-        for chunk_idx in retrieved_chunk_indices:
-            chunk = session.chunks[chunk_idx]
-            entities = entity_extractor_instance.extract_entities(chunk)
-            for ent in entities:
-                retrieved_entities.append({
-                    'name': ent['name'],
-                    'type': ent['type'],
-                    'source_chunk_id': chunk_idx,
-                    'retrieval_score': float(retrieval_scores[retrieved_chunk_indices.index(chunk_idx)])
-                })
-        
-        # Remove duplicates
-        seen = {}
-        unique_entities = []
-        for ent in retrieved_entities:
-            key = (ent['name'].lower(), ent['type'])
-            if key not in seen:
-                unique_entities.append(Entity(**ent))
-                seen[key] = ent
+        # Entities from retrieved context (precomputed at ingest)
+        retrieved_entities, unique_entities = collect_context_entities(session, retrieved_chunk_indices, retrieval_scores)
         
         print(f"[Enhanced Query] Extracted {len(unique_entities)} entities")
         
@@ -953,9 +1715,9 @@ async def query_enhanced(request: QueryRequest):
             ChunkReference(
                 index=idx,
                 filename=session.sources[idx],
-                relevance_score=float(retrieval_scores[retrieved_chunk_indices.index(idx)])
+                relevance_score=float(score)
             )
-            for idx in retrieved_chunk_indices
+            for idx, score in zip(retrieved_chunk_indices, retrieval_scores)
         ]
         
         # Prepare PDF export data
@@ -981,7 +1743,7 @@ async def query_enhanced(request: QueryRequest):
             pipeline_data=pipeline_data
         )
         
-        return {
+        response = {
             "answer": answer_data.get("main_answer", ""),
             "summary": answer_data.get("summary", ""),
             "key_points": answer_data.get("key_points", []),
@@ -1006,6 +1768,8 @@ async def query_enhanced(request: QueryRequest):
             "pdf_html": pdf_html,
             "pipeline_data": pipeline_data
         }
+        answer_cache.put(value=response, **cache_key)
+        return response
         
     except HTTPException:
         raise
@@ -1023,30 +1787,28 @@ async def get_pipeline_info():
 
 
 @app.get("/pipeline-visualization/{session_id}")
-async def get_pipeline_visualization(session_id: str):
-    """Get pipeline visualization for a session."""
-    if session_id not in sessions:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    session = sessions[session_id]
-    tracker = get_pipeline_tracker()
-    
-    # Log session information
-    tracker.log_stage("upload", {
-        "files": len(set(session.sources)),
-        "chunks": len(session.chunks)
-    })
+async def get_pipeline_visualization(session_id: str, limit: int = 10):
+    """
+    Get pipeline visualization for a session.
     
-    return tracker.get_pipeline_visualization()
+    Stage data comes from the measured spans of the session's latest upload and query;
+    the most recent traces (up to limit) are included in full.
+    """
+    session = get_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    visualization = get_pipeline_tracker().get_pipeline_visualization(session_id, limit=limit)
+    upload_stage = visualization["stages"][0]
+    upload_stage["data"].update(files=len(set(session.sources)), chunks=len(session.chunks))
+    return visualization
 
 
 @app.post("/entity-context/{session_id}")
 async def get_entity_context(session_id: str, entity_name: str):
     """Get detailed context for an entity."""
-    if session_id not in sessions:
+    session = get_session(session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
-    
-    session = sessions[session_id]
     entity_name_lower = entity_name.lower()
     
     # Find chunks containing this entity
@@ -1073,10 +1835,9 @@ async def download_documents(session_id: str):
     """
     Download original uploaded documents as JSON.
     """
-    if session_id not in sessions:
+    session = get_session(session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
-    
-    session = sessions[session_id]
     return {
         "session_id": session_id,
         "chunks": session.chunks,
@@ -1086,86 +1847,71 @@ async def download_documents(session_id: str):
     }
 
 
+def format_duration(milliseconds: float) -> str:
+    """Human-readable duration ("850.2ms", "1.23s")."""
+    return f"{milliseconds / 1000:.2f}s" if milliseconds >= 1000 else f"{milliseconds:.1f}ms"
+
+
 @app.get("/pipeline/status/{session_id}")
 async def get_pipeline_status(session_id: str):
     """
     Get detailed pipeline processing status and visualization data.
+    
+    Durations are measured spans of the session's latest upload (or append) and query;
+    stages without a recorded span (e.g. sessions reloaded from disk) have no duration.
     """
-    if session_id not in sessions:
+    session = get_session(session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    session = sessions[session_id]
+    tracker = get_pipeline_tracker()
+    ingest_trace = tracker.latest(session_id, INGEST_KINDS)
+    query_trace = tracker.latest(session_id, ('query',))
+    
+    def stage(name, trace, path, input_text, output_text):
+        span = trace.find(*path) if trace is not None else None
+        if span is not None:
+            status = {'complete': 'completed'}.get(span.status, span.status)
+        else:
+            status = 'running' if trace is not None and not trace.finished else 'pending'
+        return {
+            "stage": name,
+            "status": status,
+            "duration": format_duration(span.duration_ms) if span is not None else None,
+            "duration_ms": round(span.duration_ms, 3) if span is not None else None,
+            "input": input_text,
+            "output": output_text
+        }
     
-    # Build pipeline visualization data
+    file_count = len(set(session.sources))
+    chunk_count = len(session.chunks)
     pipeline_stages = [
-        {
-            "stage": "Document Upload",
-            "status": "completed",
-            "duration": "0.5s",
-            "input": f"{len(set(session.sources))} files",
-            "output": f"{len(session.chunks)} chunks"
-        },
-        {
-            "stage": "Preprocessing",
-            "status": "completed",
-            "duration": "0.2s",
-            "input": f"{len(session.chunks)} raw chunks",
-            "output": f"{len(session.chunks)} cleaned chunks"
-        },
-        {
-            "stage": "Embedding",
-            "status": "completed",
-            "duration": "1.2s",
-            "input": f"{len(session.chunks)} chunks",
-            "output": f"{len(session.chunks)} embeddings"
-        },
-        {
-            "stage": "Indexing (FAISS)",
-            "status": "completed",
-            "duration": "0.3s",
-            "input": f"{len(session.chunks)} embeddings",
-            "output": "FAISS index"
-        }
+        stage("Document Upload", ingest_trace, ("read",), f"{file_count} files", f"{file_count} files read"),
+        stage("Preprocessing", ingest_trace, ("ingest", "extract"), f"{file_count} files", f"{chunk_count} chunks"),
+        stage("Embedding", ingest_trace, ("ingest", "embed"), f"{chunk_count} chunks", f"{chunk_count} embeddings"),
+        stage("Indexing (FAISS)", ingest_trace, ("ingest", "index"), f"{chunk_count} embeddings", "FAISS index"),
     ]
     
-    if hasattr(session, 'last_query_result'):
-        result = session.last_query_result
+    if query_trace is not None:
+        retrieve = query_trace.find("retrieve")
+        entities = query_trace.find("explain", "entities")
+        retrieved = retrieve.data.get("chunks", 0) if retrieve is not None else 0
+        entity_count = entities.data.get("entities", 0) if entities is not None else 0
         pipeline_stages.extend([
-            {
-                "stage": "Retrieval",
-                "status": "completed",
-                "duration": "0.1s",
-                "input": result.get("query", ""),
-                "output": f"{len(result.get('snippets', []))} relevant chunks"
-            },
-            {
-                "stage": "Entity Extraction",
-                "status": "completed",
-                "duration": "0.3s",
-                "input": f"{len(result.get('snippets', []))} chunks",
-                "output": f"{len(result.get('entities', []))} entities"
-            },
-            {
-                "stage": "Graph Construction",
-                "status": "completed",
-                "duration": "0.2s",
-                "input": f"{len(result.get('entities', []))} entities",
-                "output": "Knowledge graph"
-            },
-            {
-                "stage": "Answer Generation",
-                "status": "completed",
-                "duration": "2.1s",
-                "input": "Query + context",
-                "output": "Final answer"
-            }
+            stage("Retrieval", query_trace, ("retrieve",), query_trace.root.data.get("query", ""), f"{retrieved} relevant chunks"),
+            stage("Entity Extraction", query_trace, ("explain", "entities"), f"{retrieved} chunks", f"{entity_count} entities"),
+            stage("Graph Construction", query_trace, ("explain", "graph"), f"{entity_count} entities", "Knowledge graph"),
+            stage("Answer Generation", query_trace, ("llm",), "Query + context", "Final answer"),
         ])
     
+    traces = [trace for trace in (ingest_trace, query_trace) if trace is not None]
+    total_ms = sum(trace.root.duration_ms for trace in traces)
     return {
         "session_id": session_id,
         "pipeline_stages": pipeline_stages,
-        "total_duration": "4.9s",
-        "status": "completed"
+        "total_duration": format_duration(total_ms) if traces else None,
+        "total_duration_ms": round(total_ms, 3),
+        "status": "processing" if session.is_processing or session.is_appending else ("error" if session.processing_error else "completed")
     }
 
 
@@ -2,7 +2,7 @@
 Pydantic models for request/response validation.
 """
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from typing import Annotated, List, Dict, Any, Optional
 
 
 class QueryRequest(BaseModel):
@@ -10,6 +10,9 @@ class QueryRequest(BaseModel):
     query: str = Field(..., min_length=1, max_length=1000)
     index_id: Optional[str] = None
     top_k: int = Field(default=5, ge=1, le=20)
+    nprobe: Optional[int] = Field(default=None, ge=1)  # IVF lists probed (ANN indexes only)
+    ef_search: Optional[int] = Field(default=None, ge=1)  # HNSW search breadth
+    min_score: float = Field(default=0.0, ge=0.0, le=1.0)  # Drop chunks below this similarity
 
 
 class Entity(BaseModel):
@@ -85,6 +88,29 @@ class QueryResponse(BaseModel):
     status: str = "success"
 
 
+class BatchQueryRequest(BaseModel):
+    """Request model for batch query endpoint (many queries against one session)."""
+    queries: List[Annotated[str, Field(min_length=1, max_length=1000)]] = Field(..., min_length=1, max_length=256)
+    index_id: Optional[str] = None
+    top_k: int = Field(default=5, ge=1, le=20)
+    nprobe: Optional[int] = Field(default=None, ge=1)
+    ef_search: Optional[int] = Field(default=None, ge=1)
+    min_score: float = Field(default=0.0, ge=0.0, le=1.0)
+
+
+class BatchQueryResult(BaseModel):
+    """Outcome of one query in a batch; failed queries carry an error instead of a response."""
+    query: str
+    response: Optional[QueryResponse] = None
+    error: Optional[str] = None
+
+
+class BatchQueryResponse(BaseModel):
+    """Response model for batch query endpoint."""
+    results: List[BatchQueryResult]
+    status: str = "success"
+
+
 class UploadResponse(BaseModel):
     """Response model for upload endpoint."""
     status: str
@@ -102,10 +128,29 @@ class StatusResponse(BaseModel):
 class DocumentProcessingStatus(BaseModel):
     """Status of a document in the pipeline."""
     filename: str
-    status: str  # 'uploaded', 'chunking', 'embedding', 'indexed'
+    status: str  # 'uploaded', 'chunking', 'embedding', 'indexing', 'indexed', 'error'
     progress: int  # 0-100
     chunks_count: int = 0
     error: Optional[str] = None
+    pages_parsed: Optional[int] = None  # PDFs only
+    total_pages: Optional[int] = None
+    chunks_embedded: int = 0
+    entities_count: int = 0  # New entities first found in this document
+    chunks_per_sec: float = 0.0
+    eta_seconds: Optional[float] = None
+
+
+class PipelineStageStatus(BaseModel):
+    """Throughput and backlog of one ingest pipeline stage."""
+    name: str  # 'extract', 'embed', 'index', 'entities', 'graph', 'reconstruct'
+    status: str  # 'pending', 'running', 'done', 'error'
+    batches: int = 0
+    chunks: int = 0
+    busy_seconds: float = 0.0
+    chunks_per_sec: float = 0.0
+    queue_depth: int = 0  # Batches waiting in front of the stage
+    max_queue_depth: int = 0
+    error: Optional[str] = None
 
 
 class SessionProcessingStatus(BaseModel):
@@ -118,6 +163,11 @@ class SessionProcessingStatus(BaseModel):
     total_graph_edges: int = 0
     current_stage: str = ""
     error_message: Optional[str] = None
+    pipeline_stages: List[PipelineStageStatus] = []
+    progress: float = 0.0  # 0-100, documents weighted by size
+    chunks_per_sec: float = 0.0  # Embedding throughput of the running ingest
+    eta_seconds: Optional[float] = None
+    poll_after_seconds: Optional[float] = None  # Suggested delay before the next status request; None when idle
 
 
 class ExportData(BaseModel):
@@ -0,0 +1,187 @@
+"""
+Semantic answer cache.
+Caches generated query responses per (session, retrieved chunk ids, generator key) so repeated
+or near-identical questions answered from the same evidence skip the LLM and explanation steps.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+import numpy as np
+
+
+class _Entry:
+    __slots__ = ("query_embedding", "value", "expires_at")
+
+    def __init__(self, query_embedding: Optional[np.ndarray], value: Any, expires_at: float):
+        self.query_embedding = query_embedding
+        self.value = value
+        self.expires_at = expires_at
+
+
+class AnswerCache:
+    """
+    LRU + TTL cache of query responses.
+
+    Entries are grouped into buckets keyed by (session id, ordered retrieved chunk ids,
+    generator key), so a hit always shares the evidence the answer was generated from.
+    Within a bucket a query matches on its normalized text, or, when a similarity threshold
+    is set, on the cosine similarity of its (L2-normalized) embedding.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 3600, similarity_threshold: float = 0.0):
+        """
+        Initialize answer cache.
+
+        Args:
+            max_entries: Maximum cached responses across all sessions (0 disables the cache)
+            ttl_seconds: Entry lifetime (0 keeps entries until evicted)
+            similarity_threshold: Minimum query cosine similarity for a semantic hit
+                (0 requires the same normalized query text)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+
+        self._entries: "OrderedDict[Tuple[Tuple, str], _Entry]" = OrderedDict()
+        self._buckets: Dict[Tuple, Dict[str, None]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    def get(
+        self,
+        session_id: str,
+        chunk_ids: Iterable[int],
+        generator_key: Hashable,
+        query: str,
+        query_embedding: Optional[np.ndarray] = None
+    ) -> Optional[Any]:
+        """
+        Look up a cached response.
+
+        Args:
+            session_id: Session the query ran against
+            chunk_ids: Retrieved chunk ids, in rank order
+            generator_key: Identifies the generator, model and prompt version
+            query: Query text
+            query_embedding: Normalized query embedding for semantic matching
+
+        Returns:
+            Cached response or None
+        """
+        if not self.enabled:
+            return None
+        bucket = (session_id, tuple(chunk_ids), generator_key)
+        query_key = self._normalize_query(query)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._live_entry((bucket, query_key), now)
+            if entry is None and self.similarity_threshold > 0 and query_embedding is not None:
+                entry_key = self._most_similar(bucket, np.asarray(query_embedding).ravel(), now)
+                if entry_key is not None:
+                    entry = self._entries[entry_key]
+                    self._entries.move_to_end(entry_key)
+                    self.semantic_hits += 1
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry.value
+
+    def put(
+        self,
+        session_id: str,
+        chunk_ids: Iterable[int],
+        generator_key: Hashable,
+        query: str,
+        value: Any,
+        query_embedding: Optional[np.ndarray] = None
+    ) -> None:
+        """Store a response, evicting the least recently used entries beyond max_entries."""
+        if not self.enabled:
+            return
+        bucket = (session_id, tuple(chunk_ids), generator_key)
+        entry_key = (bucket, self._normalize_query(query))
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else float("inf")
+        embedding = None if query_embedding is None else np.array(query_embedding, dtype=np.float32).ravel()
+
+        with self._lock:
+            self._entries[entry_key] = _Entry(embedding, value, expires_at)
+            self._entries.move_to_end(entry_key)
+            self._buckets.setdefault(bucket, {})[entry_key[1]] = None
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_session(self, session_id: str) -> int:
+        """
+        Drop every entry of a session (its chunks changed, so cached answers may be stale).
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            stale = [key for key in self._entries if key[0][0] == session_id]
+            for key in stale:
+                self._remove(key)
+            return len(stale)
+
+    def stats(self) -> Dict:
+        """Cache size and hit/miss counters."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "similarity_threshold": self.similarity_threshold,
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def _live_entry(self, entry_key: Tuple[Tuple, str], now: float) -> Optional[_Entry]:
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            self._remove(entry_key)
+            return None
+        self._entries.move_to_end(entry_key)
+        return entry
+
+    def _most_similar(self, bucket: Tuple, query_embedding: np.ndarray, now: float) -> Optional[Tuple[Tuple, str]]:
+        best_key, best_score = None, self.similarity_threshold
+        for query_key in list(self._buckets.get(bucket, ())):
+            entry_key = (bucket, query_key)
+            entry = self._entries[entry_key]
+            if entry.expires_at <= now:
+                self._remove(entry_key)
+                continue
+            if entry.query_embedding is None:
+                continue
+            score = float(np.dot(entry.query_embedding, query_embedding))
+            if score >= best_score:
+                best_key, best_score = entry_key, score
+        return best_key
+
+    def _remove(self, entry_key: Tuple[Tuple, str]) -> None:
+        self._entries.pop(entry_key, None)
+        bucket, query_key = entry_key
+        queries = self._buckets.get(bucket)
+        if queries is not None:
+            queries.pop(query_key, None)
+            if not queries:
+                del self._buckets[bucket]
@@ -1,16 +1,20 @@
 """
 Answer generation module with LLM integration.
 """
-from typing import List, Optional, Tuple, Dict
+from typing import AsyncIterator, List, Optional, Tuple, Dict
 import os
 import re
-from openai import OpenAI, APIError
+from openai import APIError
 from app.modules.llm_config import resolve_llm_config
+from app.modules.llm_integration import get_llm_pool
 
 
 class AnswerGenerator:
     """Generate answers using LLM with retrieved context."""
     
+    # Bump when the prompt changes so cached answers from the old prompt are not reused
+    PROMPT_VERSION = 1
+    
     def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4o-mini"):
         """
         Initialize answer generator.
@@ -22,15 +26,10 @@ class AnswerGenerator:
         config = resolve_llm_config(default_model=model)
         self.api_key = api_key or config.api_key
         self.model = config.model
-        self.client = None
-        
-        if self.api_key:
-            if config.base_url:
-                self.client = OpenAI(api_key=self.api_key, base_url=config.base_url)
-            else:
-                self.client = OpenAI(api_key=self.api_key)
+        # Shared pooled async client for this provider (None without an API key)
+        self.client = get_llm_pool(config, api_key=self.api_key)
     
-    def generate(self, query: str, context_chunks: List[str], max_tokens: int = 500) -> str:
+    async def generate(self, query: str, context_chunks: List[str], max_tokens: int = 500) -> str:
         """
         Generate answer from query and context.
         
@@ -45,6 +44,65 @@ class AnswerGenerator:
         if not self.client:
             return self._generate_fallback(query, context_chunks)
         
+        messages = self._build_messages(query, context_chunks)
+        
+        try:
+            response = await self.client.chat_completion(
+                model=self.model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=0.3
+            )
+            
+            if response.choices and response.choices[0].message and response.choices[0].message.content:
+                answer = response.choices[0].message.content.strip()
+                return answer
+            else:
+                return self._generate_fallback(query, context_chunks)
+            
+        except APIError as e:
+            print(f"OpenAI API error: {e}")
+            return self._generate_fallback(query, context_chunks)
+    
+    async def stream(self, query: str, context_chunks: List[str], max_tokens: int = 500) -> AsyncIterator[str]:
+        """
+        Stream an answer token by token.
+        
+        Uses the same prompt as generate. Without an LLM client, or if the request fails
+        before any token arrives, the fallback answer is yielded as a single piece.
+        
+        Args:
+            query: User query
+            context_chunks: Retrieved context chunks
+            max_tokens: Maximum tokens in response
+            
+        Yields:
+            Answer text deltas
+        """
+        if not self.client:
+            yield self._generate_fallback(query, context_chunks)
+            return
+        
+        streamed_any = False
+        try:
+            async for delta in self.client.stream_chat_completion(
+                model=self.model,
+                messages=self._build_messages(query, context_chunks),
+                max_tokens=max_tokens,
+                temperature=0.3
+            ):
+                streamed_any = True
+                yield delta
+        except APIError as e:
+            print(f"OpenAI API error: {e}")
+            if streamed_any:
+                raise
+        
+        if not streamed_any:
+            yield self._generate_fallback(query, context_chunks)
+    
+    def _build_messages(self, query: str, context_chunks: List[str]) -> List[Dict[str, str]]:
+        """Build the chat messages for a query, with chunk markers for citation."""
         # Prepare context with chunk markers for citation
         context_lines = []
         for idx, chunk in enumerate(context_chunks):
@@ -69,26 +127,10 @@ Question: {query}
 
 Answer (cite chunks used): """
         
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=0.3
-            )
-            
-            if response.choices and response.choices[0].message and response.choices[0].message.content:
-                answer = response.choices[0].message.content.strip()
-                return answer
-            else:
-                return self._generate_fallback(query, context_chunks)
-            
-        except APIError as e:
-            print(f"OpenAI API error: {e}")
-            return self._generate_fallback(query, context_chunks)
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
     
     def extract_cited_chunks(self, answer: str) -> List[int]:
         """
@@ -0,0 +1,172 @@
+"""
+Content-addressed embedding cache.
+Maps (model name, SHA-256 of normalized chunk text) to float32 vectors kept in an
+append-only, memory-mapped file so repeated uploads skip the transformer forward pass.
+"""
+import hashlib
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: rely on the in-process lock only
+    fcntl = None
+
+
+def normalize_chunk_text(text: str) -> str:
+    """Collapse whitespace so formatting-only differences share a cache entry."""
+    return " ".join(text.split())
+
+
+def chunk_key(text: str) -> str:
+    """SHA-256 hex digest of normalized chunk text."""
+    return hashlib.sha256(normalize_chunk_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Disk-backed embedding cache for a single embedding model."""
+
+    VECTORS_FILE = "vectors.f32"
+    KEYS_FILE = "keys.txt"
+    LOCK_FILE = ".lock"
+
+    def __init__(self, root_dir: str, model_name: str, dimension: int):
+        """
+        Open (or create) the cache for one model.
+
+        Args:
+            root_dir: Cache root; each model gets its own sub-directory
+            model_name: Embedding model identifier, part of the cache key
+            dimension: Embedding dimension
+        """
+        self.model_name = model_name
+        self.dimension = dimension
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+        self.cache_dir = Path(root_dir) / f"{safe_name}-{dimension}"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._vectors_path = self.cache_dir / self.VECTORS_FILE
+        self._keys_path = self.cache_dir / self.KEYS_FILE
+        self._lock_path = self.cache_dir / self.LOCK_FILE
+        self._keys_path.touch(exist_ok=True)
+        self._vectors_path.touch(exist_ok=True)
+
+        self._rows: Dict[str, int] = {}
+        self._keys_offset = 0
+        self._line_count = 0
+        self._vectors = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        with self._lock:
+            self._refresh()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def lookup(self, texts: List[str]) -> Tuple[np.ndarray, List[int]]:
+        """
+        Look up embeddings for a batch of texts.
+
+        Args:
+            texts: Chunk texts
+
+        Returns:
+            Tuple of (array with cached rows filled in, positions of cache misses)
+        """
+        keys = [chunk_key(t) for t in texts]
+        embeddings = np.zeros((len(texts), self.dimension), dtype=np.float32)
+
+        with self._lock:
+            if any(k not in self._rows for k in keys):
+                # Another worker may have appended since we last looked
+                self._refresh()
+            missing = []
+            for pos, key in enumerate(keys):
+                row = self._rows.get(key)
+                if row is None or row >= self._vectors.shape[0]:
+                    missing.append(pos)
+                else:
+                    embeddings[pos] = self._vectors[row]
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        return embeddings, missing
+
+    def put(self, texts: List[str], embeddings: np.ndarray) -> None:
+        """
+        Append embeddings for texts that are not cached yet.
+
+        Args:
+            texts: Chunk texts
+            embeddings: Matching float32 array of shape (len(texts), dimension)
+        """
+        if len(texts) == 0:
+            return
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+
+        with self._lock, open(self._lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                new_keys = []
+                new_rows = []
+                for key, vector in zip((chunk_key(t) for t in texts), embeddings):
+                    if key in self._rows or key in new_keys:
+                        continue
+                    new_keys.append(key)
+                    new_rows.append(vector)
+                if not new_keys:
+                    return
+
+                # Vectors first, keys second: a key line never points past written data
+                with open(self._vectors_path, "r+b") as f:
+                    # Drop orphaned rows left by a writer that died before recording its keys
+                    f.truncate(self._line_count * self.dimension * 4)
+                    f.seek(0, os.SEEK_END)
+                    f.write(np.stack(new_rows).tobytes())
+                with open(self._keys_path, "a", encoding="ascii") as f:
+                    f.write("".join(f"{k}\n" for k in new_keys))
+                self._refresh()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def stats(self) -> Dict:
+        """Cache size and hit/miss counters."""
+        return {
+            "model": self.model_name,
+            "entries": len(self._rows),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _refresh(self) -> None:
+        """Pick up key lines appended since the last refresh and remap the vector file."""
+        with open(self._keys_path, "r", encoding="ascii") as f:
+            f.seek(self._keys_offset)
+            new_data = f.read()
+        # Ignore a trailing partial line from a concurrent writer
+        complete = new_data[:new_data.rfind("\n") + 1]
+        self._keys_offset += len(complete)
+        for key in complete.splitlines():
+            # Row number is the key's line number in the keys file
+            self._rows.setdefault(key, self._line_count)
+            self._line_count += 1
+
+        row_bytes = self.dimension * 4
+        rows = min(self._line_count, os.path.getsize(self._vectors_path) // row_bytes)
+
+        if rows == 0:
+            self._vectors = np.zeros((0, self.dimension), dtype=np.float32)
+        elif self._vectors is None or self._vectors.shape[0] != rows:
+            self._vectors = np.memmap(
+                self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dimension)
+            )
@@ -3,27 +3,26 @@ Enhanced answer generation with better quality and formatting.
 """
 from typing import List, Optional, Dict
 import os
-from openai import OpenAI, APIError
+from openai import APIError
 from app.modules.llm_config import resolve_llm_config
+from app.modules.llm_integration import get_llm_pool
 
 
 class EnhancedAnswerGenerator:
     """Generate comprehensive, well-formatted answers with citations."""
     
+    # Bump when the prompt changes so cached answers from the old prompt are not reused
+    PROMPT_VERSION = 1
+    
     def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4o-mini"):
         """Initialize enhanced answer generator."""
         config = resolve_llm_config(default_model=model)
         self.api_key = api_key or config.api_key
         self.model = config.model
-        self.client = None
-        
-        if self.api_key:
-            if config.base_url:
-                self.client = OpenAI(api_key=self.api_key, base_url=config.base_url)
-            else:
-                self.client = OpenAI(api_key=self.api_key)
+        # Shared pooled async client for this provider (None without an API key)
+        self.client = get_llm_pool(config, api_key=self.api_key)
     
-    def generate_detailed(self, query: str, context_chunks: List[str]) -> Dict:
+    async def generate_detailed(self, query: str, context_chunks: List[str]) -> Dict:
         """
         Generate detailed, comprehensive answer.
         
@@ -76,7 +75,7 @@ User Question: {query}
 Provide a COMPREHENSIVE answer using the format specified above. Make sure the answer is detailed and informative."""
         
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat_completion(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -1,10 +1,15 @@
 """
 Entity extraction module using spaCy.
 """
-from typing import List, Dict, Tuple, Set
+from typing import List, Dict, Tuple, Set, Optional
 import re
 
 
+def entity_key(entity: Dict) -> Tuple[str, str]:
+    """Key under which entities are deduplicated: (lowercased name, type)."""
+    return entity['name'].lower(), entity['type']
+
+
 class EntityExtractor:
     """Extract entities from text using spaCy NER (with fallback)."""
     
@@ -79,26 +84,37 @@ class EntityExtractor:
         
         return unique_entities
     
-    def extract_from_chunks(self, chunks: List[str]) -> Tuple[List[Dict], Dict]:
+    def extract_from_chunks(
+        self,
+        chunks: List[str],
+        start_idx: int = 0,
+        known_entities: List[Dict] = None,
+        seen_entities: Optional[Set[Tuple[str, str]]] = None
+    ) -> Tuple[List[Dict], Dict]:
         """
         Extract entities from multiple chunks.
         
         Args:
             chunks: List of text chunks
+            start_idx: Session-wide index of the first chunk (for appending to a session)
+            known_entities: Entities already in the session; these are not returned again
+            seen_entities: Keys (see entity_key) of entities already found, used instead of
+                known_entities and updated in place, so batch-by-batch callers keep one set
             
         Returns:
-            Tuple of (entities list, chunk_entity_mapping dict)
+            Tuple of (new entities list, chunk_entity_mapping dict)
         """
         all_entities = []
         entity_map = {}  # Maps chunk index to entities
-        seen_entities: Set[Tuple[str, str]] = set()
+        if seen_entities is None:
+            seen_entities = {entity_key(ent) for ent in (known_entities or [])}
         
-        for chunk_idx, chunk in enumerate(chunks):
+        for chunk_idx, chunk in enumerate(chunks, start=start_idx):
             entities = self.extract_entities(chunk)
             entity_map[chunk_idx] = entities
             
             for ent in entities:
-                key = (ent['name'].lower(), ent['type'])
+                key = entity_key(ent)
                 if key not in seen_entities:
                     all_entities.append({
                         'name': ent['name'],
@@ -109,6 +125,33 @@ class EntityExtractor:
         
         return all_entities, entity_map
     
+    @staticmethod
+    def prune_entities(entities: List[Dict], entity_chunk_map: Dict) -> List[Dict]:
+        """
+        Drop entities no longer mentioned in any chunk after chunks were removed.
+        
+        Surviving entities whose first mention was removed are re-pointed at their
+        earliest remaining chunk.
+        
+        Args:
+            entities: Session entity list
+            entity_chunk_map: Mapping of remaining chunk indices to entities
+            
+        Returns:
+            Pruned entity list
+        """
+        first_chunk: Dict[Tuple[str, str], int] = {}
+        for chunk_idx in sorted(entity_chunk_map):
+            for ent in entity_chunk_map[chunk_idx]:
+                first_chunk.setdefault((ent['name'].lower(), ent['type']), chunk_idx)
+        
+        pruned = []
+        for ent in entities:
+            chunk_idx = first_chunk.get((ent['name'].lower(), ent['type']))
+            if chunk_idx is not None:
+                pruned.append({**ent, 'source_chunk_id': chunk_idx})
+        return pruned
+    
     def extract_noun_phrases(self, text: str) -> List[str]:
         """
         Extract noun phrases from text (fallback method without spaCy).
@@ -1,7 +1,7 @@
 """
 Knowledge graph construction module using NetworkX.
 """
-from typing import List, Dict, Tuple, Set
+from typing import List, Dict, Tuple, Set, Optional
 import networkx as nx
 from collections import defaultdict
 
@@ -13,9 +13,24 @@ except Exception as e:
     print(f"Warning: spaCy not available ({e}). Graph builder will work with basic features.")
     SPACY_AVAILABLE = False
 
+COOCCURRENCE_RELATION = 'co-occurs-in-chunk'
+COOCCURRENCE_WEIGHT = 1.0
+DEPENDENCY_WEIGHT = 2.0
+
+
+def relation_weight(relation: str) -> float:
+    """Edge weight of a relation: verb relations outweigh co-occurrence."""
+    return COOCCURRENCE_WEIGHT if relation == COOCCURRENCE_RELATION else DEPENDENCY_WEIGHT
+
 
 class KnowledgeGraphBuilder:
-    """Build knowledge graphs from extracted entities."""
+    """
+    Build knowledge graphs from extracted entities.
+    
+    Every edge records the chunks supporting it in a ``support`` attribute (relation ->
+    chunk indices), so removing documents can drop relations no remaining chunk contains.
+    An edge shows its strongest supported relation.
+    """
     
     def __init__(self):
         """Initialize knowledge graph builder."""
@@ -45,7 +60,27 @@ class KnowledgeGraphBuilder:
             NetworkX graph
         """
         self.graph = nx.Graph()
+        return self.add_to_graph(entities, entity_chunk_map, chunks)
+    
+    def add_to_graph(
+        self,
+        entities: List[Dict[str, str]],
+        entity_chunk_map: Dict,
+        chunks: List[str],
+        start_idx: int = 0
+    ) -> nx.Graph:
+        """
+        Incrementally extend the graph with newly ingested chunks.
         
+        Args:
+            entities: Entities not yet in the graph
+            entity_chunk_map: Mapping of the new chunk indices to their entities
+            chunks: The new text chunks
+            start_idx: Session-wide index of the first new chunk
+            
+        Returns:
+            NetworkX graph
+        """
         # Add entity nodes
         for entity in entities:
             self.graph.add_node(
@@ -59,7 +94,75 @@ class KnowledgeGraphBuilder:
         
         # Add edges for dependencies (if spaCy available)
         if self.nlp:
-            self._add_dependency_edges(chunks, entities)
+            self._add_dependency_edges(chunks, entities, start_idx)
+        
+        return self.graph
+    
+    def prune_graph(
+        self,
+        entities: List[Dict],
+        entity_chunk_map: Dict,
+        remap: Optional[Dict[int, int]] = None
+    ) -> nx.Graph:
+        """
+        Bring the graph in line with the remaining chunks after documents were removed.
+        
+        Nodes for entities that are no longer mentioned are removed, edge support is
+        remapped to the surviving chunk indices, and edges no remaining chunk supports are
+        dropped. Node source chunks are updated to the remapped chunk indices.
+        
+        Args:
+            entities: Pruned entity list (with remapped source_chunk_id)
+            entity_chunk_map: Mapping of remaining chunk indices to entities
+            remap: Mapping of old to new chunk indices for the chunks that remain; without it
+                the support of dependency edges is left unchanged
+            
+        Returns:
+            NetworkX graph
+        """
+        mentioned: Set[str] = set()
+        cooccurring: Dict[Tuple[str, str], List[int]] = {}
+        for chunk_idx in sorted(entity_chunk_map):
+            names = sorted({ent['name'] for ent in entity_chunk_map[chunk_idx]})
+            mentioned.update(names)
+            for i, name1 in enumerate(names):
+                for name2 in names[i+1:]:
+                    cooccurring.setdefault((name1, name2), []).append(chunk_idx)
+        
+        self.graph.remove_nodes_from([node for node in self.graph if node not in mentioned])
+        
+        stale_edges = []
+        for u, v, data in self.graph.edges(data=True):
+            pair = tuple(sorted((u, v)))
+            support = data.get('support')
+            if support is None:
+                # Edges saved before support was recorded: only co-occurrence can be checked
+                if data.get('relation') == COOCCURRENCE_RELATION and pair not in cooccurring:
+                    stale_edges.append((u, v))
+                continue
+            
+            remaining = {}
+            for relation, chunk_ids in support.items():
+                if relation == COOCCURRENCE_RELATION:
+                    kept = cooccurring.get(pair, [])
+                elif remap is not None:
+                    kept = [remap[chunk_idx] for chunk_idx in chunk_ids if chunk_idx in remap]
+                else:
+                    kept = chunk_ids
+                if kept:
+                    remaining[relation] = kept
+            if not remaining:
+                stale_edges.append((u, v))
+                continue
+            data['support'] = remaining
+            if data.get('relation') not in remaining:
+                relation = max(remaining, key=relation_weight)
+                data.update(relation=relation, weight=relation_weight(relation))
+        self.graph.remove_edges_from(stale_edges)
+        
+        for entity in entities:
+            if entity['name'] in self.graph:
+                self.graph.nodes[entity['name']]['source_chunk'] = entity['source_chunk_id']
         
         return self.graph
     
@@ -70,31 +173,44 @@ class KnowledgeGraphBuilder:
         entities: List[Dict]
     ):
         """Add edges for entities that co-occur in same chunk."""
-        entity_names = {ent['name'] for ent in entities}
-        
         for chunk_idx, chunk_entities in entity_chunk_map.items():
-            # Get entity names in this chunk
-            names_in_chunk = [ent['name'] for ent in chunk_entities if ent['name'] in entity_names]
+            # Get entity names in this chunk that are graph nodes (new or previously added)
+            names_in_chunk = [ent['name'] for ent in chunk_entities if ent['name'] in self.graph]
             
             # Create edges between all pairs
             for i, name1 in enumerate(names_in_chunk):
                 for name2 in names_in_chunk[i+1:]:
                     if name1 != name2:
-                        self.graph.add_edge(
-                            name1,
-                            name2,
-                            relation='co-occurs-in-chunk',
-                            weight=1.0
-                        )
+                        self._add_edge(name1, name2, COOCCURRENCE_RELATION, chunk_idx)
+    
+    def _add_edge(self, source: str, target: str, relation: str, chunk_idx: int):
+        """Add an edge or extend its support; the strongest supported relation is shown."""
+        data = self.graph.get_edge_data(source, target)
+        if data is None:
+            self.graph.add_edge(
+                source,
+                target,
+                relation=relation,
+                weight=relation_weight(relation),
+                support={relation: [chunk_idx]}
+            )
+            return
+        
+        chunk_ids = data.setdefault('support', {}).setdefault(relation, [])
+        # Chunks arrive in corpus order, so a repeat can only be the last entry
+        if chunk_ids[-1:] != [chunk_idx]:
+            chunk_ids.append(chunk_idx)
+        if relation_weight(relation) >= data.get('weight', 0):
+            data.update(relation=relation, weight=relation_weight(relation))
     
-    def _add_dependency_edges(self, chunks: List[str], entities: List[Dict]):
+    def _add_dependency_edges(self, chunks: List[str], entities: List[Dict], start_idx: int = 0):
         """Add edges based on syntactic dependencies."""
         if not self.nlp:
             return
         
-        entity_names = {ent['name'].lower() for ent in entities}
+        entity_names = {str(node).lower() for node in self.graph.nodes()}
         
-        for chunk in chunks:
+        for chunk_idx, chunk in enumerate(chunks, start=start_idx):
             doc = self.nlp(chunk)
             
             # Find verb dependencies between entities
@@ -116,12 +232,7 @@ class KnowledgeGraphBuilder:
                     
                     # Add edge with verb as relation
                     if subj and obj and subj in self.graph and obj in self.graph:
-                        self.graph.add_edge(
-                            subj,
-                            obj,
-                            relation=token.lemma_,
-                            weight=2.0
-                        )
+                        self._add_edge(subj, obj, token.lemma_, chunk_idx)
     
     def get_graph_data(self) -> Dict:
         """
@@ -0,0 +1,535 @@
+"""
+Pipelined document ingest.
+Chunks stream out of extraction in batches and are passed through bounded queues to stages
+running in their own threads, so regex-heavy work (entity extraction, graph building,
+reconstruction) overlaps the transformer forward pass, which releases the GIL:
+
+    extract/chunk --> embed --> index
+                  +-> entities --> graph
+                  +-> reconstruct
+"""
+import queue
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.modules.entity_extraction import entity_key
+from app.modules.pipeline_tracker import Span
+
+# Chunks per batch passed between stages
+DEFAULT_BATCH_SIZE = 64
+# Batches buffered in front of a stage before its producer blocks
+DEFAULT_QUEUE_SIZE = 4
+
+# End-of-stream marker
+_DONE = object()
+
+
+class ChunkBatch(NamedTuple):
+    start: int  # Corpus-wide index of the first chunk
+    chunks: List[str]
+    sources: List[str]
+
+
+class IngestResult(NamedTuple):
+    chunks: List[str]
+    sources: List[str]
+    entities: List[Dict]
+    entity_chunk_map: Dict
+    display_chunks: List[str]
+
+
+class StageStats:
+    """Counters of one stage, written by its thread and read by status requests."""
+
+    def __init__(self, name: str, inbox: Optional[queue.Queue] = None, span: Optional[Span] = None):
+        self.name = name
+        self.inbox = inbox
+        self.span = span  # Trace span receiving every timed interval
+        self.status = 'pending'
+        self.batches = 0
+        self.chunks = 0
+        self.busy_seconds = 0.0
+        self.max_queue_depth = 0
+        self.error: Optional[str] = None
+
+    def record(self, chunks: int, began_ns: int, ended_ns: int) -> None:
+        self.batches += 1
+        self.chunks += chunks
+        self.record_busy(began_ns, ended_ns)
+        if self.span is not None:
+            self.span.set(batches=self.batches, chunks=self.chunks)
+
+    def record_busy(self, began_ns: int, ended_ns: int) -> None:
+        self.busy_seconds += (ended_ns - began_ns) / 1e9
+        if self.span is not None:
+            self.span.add(began_ns, ended_ns)
+
+    def snapshot(self) -> Dict:
+        """JSON-friendly view; throughput is measured over the stage's busy time."""
+        return {
+            'name': self.name,
+            'status': self.status,
+            'batches': self.batches,
+            'chunks': self.chunks,
+            'busy_seconds': round(self.busy_seconds, 4),
+            'chunks_per_sec': round(self.chunks / self.busy_seconds, 2) if self.busy_seconds > 0 else 0.0,
+            'queue_depth': self.inbox.qsize() if self.inbox is not None else 0,
+            'max_queue_depth': self.max_queue_depth,
+            'error': self.error
+        }
+
+
+class _Stage:
+    """A worker thread applying one function to every batch of its input queue."""
+
+    def __init__(
+        self,
+        pipeline: "IngestPipeline",
+        name: str,
+        work: Callable[[Any], Any],
+        outputs: Sequence["_Stage"] = (),
+        finish: Optional[Callable[[], None]] = None,
+        queue_size: int = DEFAULT_QUEUE_SIZE
+    ):
+        self.pipeline = pipeline
+        self.work = work
+        self.outputs = outputs
+        self.finish = finish
+        self.inbox: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.stats = StageStats(name, self.inbox, pipeline.stage_span(name))
+        self.thread = threading.Thread(target=self._run, name=f"ingest-{name}", daemon=True)
+
+    def put(self, item: Any) -> None:
+        self.inbox.put(item)
+        self.stats.max_queue_depth = max(self.stats.max_queue_depth, self.inbox.qsize())
+
+    def _run(self) -> None:
+        self.stats.status = 'running'
+        try:
+            # A failed pipeline keeps draining its queues so no producer stays blocked
+            for item in iter(self.inbox.get, _DONE):
+                if self.pipeline.failed:
+                    continue
+                began = time.perf_counter_ns()
+                try:
+                    result = self.work(item)
+                except Exception as e:
+                    self.pipeline.fail(self.stats, e)
+                    continue
+                self.stats.record(len(_batch_of(item).chunks), began, time.perf_counter_ns())
+                self.pipeline.notify(self.stats.name, _batch_of(item), result)
+                for stage in self.outputs:
+                    stage.put(result)
+
+            if self.finish is not None and not self.pipeline.failed:
+                began = time.perf_counter_ns()
+                try:
+                    self.finish()
+                except Exception as e:
+                    self.pipeline.fail(self.stats, e)
+                self.stats.record_busy(began, time.perf_counter_ns())
+        finally:
+            for stage in self.outputs:
+                stage.put(_DONE)
+            if self.stats.status == 'running':
+                self.stats.status = 'done'
+
+
+def _batch_of(item: Any) -> ChunkBatch:
+    """Stage results are (batch, ...) tuples; the first stages receive the batch itself."""
+    return item if isinstance(item, ChunkBatch) else item[0]
+
+
+class IngestPipeline:
+    """
+    Runs one ingest: chunk stream in, chunks, embeddings, entities, graph and display chunks out.
+
+    Stages are given as callables so the pipeline does not depend on concrete models.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[List[str]], np.ndarray],
+        index: Callable[[List[str], List[str], np.ndarray], None],
+        extract_entities: Callable[[List[str], int, Set[Tuple[str, str]]], Tuple[List[Dict], Dict]],
+        add_to_graph: Callable[[List[Dict], Dict, List[str], int], Any],
+        reconstruct: Callable[[List[str]], List[str]],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        on_batch: Optional[Callable[[str, ChunkBatch, Any], None]] = None,
+        span: Optional[Span] = None
+    ):
+        """
+        Initialize pipeline.
+
+        Args:
+            embed: Encodes chunk texts to an (n, d) array
+            index: Called once with every chunk, source and embedding when embedding is done
+            extract_entities: (chunks, start_idx, seen entity keys) -> (new entities, chunk entity map);
+                adds the keys of the entities it returns to the set
+            add_to_graph: (new entities, chunk entity map, chunks, start_idx), applied batch by batch
+            reconstruct: Display text for a list of chunks
+            batch_size: Chunks per batch
+            queue_size: Batches buffered in front of each stage
+            on_batch: Called with (stage name, batch, stage result) whenever a stage finishes
+                a batch, from that stage's thread (see IngestProgress)
+            span: Trace span receiving one child span per stage; spans opened while the chunk
+                stream is read (extraction, chunking) nest under the 'extract' span
+        """
+        self.batch_size = max(1, batch_size)
+        self._on_batch = on_batch
+        self._span = span
+        self._embed = embed
+        self._index = index
+        self._extract_entities = extract_entities
+        self._add_to_graph = add_to_graph
+        self._reconstruct = reconstruct
+
+        self.error: Optional[Exception] = None
+        self._error_lock = threading.Lock()
+        self._chunks: List[str] = []
+        self._sources: List[str] = []
+        self._embeddings: List[np.ndarray] = []
+        self._entities: List[Dict] = []
+        self._entity_chunk_map: Dict = {}
+        self._display_chunks: List[str] = []
+        # Keys of the session's and this run's entities, kept across batches
+        self._seen_entities: Set[Tuple[str, str]] = set()
+
+        index_stage = _Stage(self, 'index', self._collect_embeddings, finish=self._build_index, queue_size=queue_size)
+        graph_stage = _Stage(self, 'graph', self._graph_batch, queue_size=queue_size)
+        self._stages = [
+            _Stage(self, 'embed', self._embed_batch, outputs=[index_stage], queue_size=queue_size),
+            index_stage,
+            _Stage(self, 'entities', self._entity_batch, outputs=[graph_stage], queue_size=queue_size),
+            graph_stage,
+            _Stage(self, 'reconstruct', self._reconstruct_batch, queue_size=queue_size),
+        ]
+        self._consumers = [self._stages[0], self._stages[2], self._stages[4]]
+        self.extract_stats = StageStats('extract', span=self.stage_span('extract'))
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+    def fail(self, stats: StageStats, error: Exception) -> None:
+        """Record a stage failure; the first error is re-raised by run()."""
+        with self._error_lock:
+            if self.error is None:
+                self.error = error
+        stats.status = 'error'
+        stats.error = str(error)
+        if stats.span is not None:
+            stats.span.status, stats.span.error = 'error', str(error)
+        print(f"[PIPELINE] Stage {stats.name} failed: {error}")
+
+    def notify(self, stage: str, batch: ChunkBatch, result: Any) -> None:
+        """Report a finished batch to the listener; listener errors never fail the ingest."""
+        if self._on_batch is None:
+            return
+        try:
+            self._on_batch(stage, batch, result)
+        except Exception as e:
+            print(f"[PIPELINE] Progress listener failed on {stage}: {e}")
+
+    def stage_span(self, name: str) -> Optional[Span]:
+        return self._span.child(name) if self._span is not None else None
+
+    def stage_stats(self) -> List[Dict]:
+        """Snapshot of every stage, in pipeline order."""
+        return [self.extract_stats.snapshot()] + [stage.stats.snapshot() for stage in self._stages]
+
+    def run(self, chunk_stream: Iterable[Tuple[str, str]], start_idx: int = 0, known_entities: Optional[List[Dict]] = None) -> IngestResult:
+        """
+        Ingest a stream of chunks.
+
+        Args:
+            chunk_stream: (chunk, source filename) tuples, typically produced lazily
+            start_idx: Corpus-wide index of the first new chunk (appending to a session)
+            known_entities: Entities already in the session; these are not returned again
+
+        Returns:
+            Chunks, sources, new entities, chunk entity map and display chunks
+
+        Raises:
+            The first exception raised by the chunk stream or a stage
+        """
+        self._seen_entities = {entity_key(ent) for ent in known_entities or []}
+
+        for stage in self._stages:
+            stage.thread.start()
+
+        began = time.perf_counter()
+        self.extract_stats.status = 'running'
+        chunk_stream = iter(chunk_stream)
+        extract_span = self.extract_stats.span
+        try:
+            start = start_idx
+            batch_chunks, batch_sources = [], []
+            batch_began = time.perf_counter_ns()
+            with extract_span.activate() if extract_span is not None else nullcontext():
+                for chunk, source in chunk_stream:
+                    batch_chunks.append(chunk)
+                    batch_sources.append(source)
+                    if len(batch_chunks) == self.batch_size:
+                        start = self._dispatch(ChunkBatch(start, batch_chunks, batch_sources), batch_began)
+                        if self.failed:
+                            break
+                        batch_chunks, batch_sources = [], []
+                        batch_began = time.perf_counter_ns()
+            if batch_chunks and not self.failed:
+                self._dispatch(ChunkBatch(start, batch_chunks, batch_sources), batch_began)
+            self.extract_stats.status = 'done'
+        except Exception as e:
+            self.fail(self.extract_stats, e)
+        finally:
+            # Stops PDF workers and releases shared memory when the stream is abandoned early
+            close = getattr(chunk_stream, 'close', None)
+            if close is not None:
+                close()
+            for stage in self._consumers:
+                stage.put(_DONE)
+            for stage in self._stages:
+                stage.thread.join()
+
+        result = IngestResult(
+            self._chunks, self._sources, self._entities, self._entity_chunk_map, self._display_chunks
+        )
+        # Only the stage counters outlive the run (status requests keep reading them)
+        self._chunks, self._sources, self._embeddings = [], [], []
+        self._entities, self._entity_chunk_map, self._display_chunks = [], {}, []
+        self._seen_entities = set()
+
+        if self.error is not None:
+            raise self.error
+        busy = ', '.join(f"{stats['name']}: {stats['busy_seconds']:.2f}s" for stats in self.stage_stats())
+        print(f"[PIPELINE] Ingested {len(result.chunks)} chunks in {time.perf_counter() - began:.2f}s ({busy} busy)")
+        return result
+
+    def _dispatch(self, batch: ChunkBatch, batch_began: int) -> int:
+        """Hand a batch to every branch; time spent blocked on full queues is not counted as work."""
+        self.extract_stats.record(len(batch.chunks), batch_began, time.perf_counter_ns())
+        self._chunks.extend(batch.chunks)
+        self._sources.extend(batch.sources)
+        self.notify('extract', batch, None)
+        for stage in self._consumers:
+            stage.put(batch)
+        return batch.start + len(batch.chunks)
+
+    def _embed_batch(self, batch: ChunkBatch):
+        return batch, self._embed(batch.chunks)
+
+    def _collect_embeddings(self, item) -> None:
+        self._embeddings.append(item[1])
+
+    def _build_index(self) -> None:
+        if self._chunks:
+            self._index(self._chunks, self._sources, np.vstack(self._embeddings))
+
+    def _entity_batch(self, batch: ChunkBatch):
+        entities, entity_map = self._extract_entities(
+            batch.chunks, batch.start, self._seen_entities
+        )
+        self._entities.extend(entities)
+        self._entity_chunk_map.update(entity_map)
+        return batch, entities, entity_map
+
+    def _graph_batch(self, item) -> None:
+        batch, entities, entity_map = item
+        self._add_to_graph(entities, entity_map, batch.chunks, batch.start)
+
+    def _reconstruct_batch(self, batch: ChunkBatch) -> None:
+        self._display_chunks.extend(self._reconstruct(batch.chunks))
+
+
+# Share of a document's progress credited to each phase
+PROGRESS_WEIGHTS = {'extract': 0.3, 'embed': 0.5, 'entities': 0.2}
+# Bounds of the poll interval suggested to status clients, in seconds
+MIN_POLL_SECONDS = 0.5
+MAX_POLL_SECONDS = 5.0
+DEFAULT_POLL_SECONDS = 1.0
+
+
+class _DocumentProgress:
+    """Counters of one document; guarded by the IngestProgress lock."""
+
+    def __init__(self, filename: str, size: int):
+        self.filename = filename
+        self.size = max(size, 1)
+        self.status = 'uploaded'
+        self.unit: Optional[str] = None  # 'pages' or 'bytes'
+        self.done = 0
+        self.total = 0
+        self.extracted = False
+        self.chunks = 0
+        self.embedded = 0
+        self.scanned = 0
+        self.entities = 0
+        self.started: Optional[float] = None
+
+    def extract_fraction(self) -> float:
+        if self.extracted:
+            return 1.0
+        return min(self.done / self.total, 1.0) if self.total else 0.0
+
+    def expected_chunks(self) -> Optional[float]:
+        """Final chunk count, extrapolated from the extracted share while extraction runs."""
+        if self.extracted:
+            return self.chunks
+        fraction = self.extract_fraction()
+        return self.chunks / fraction if fraction > 0 and self.chunks else None
+
+    def fraction(self) -> float:
+        expected = self.expected_chunks()
+        if expected == 0:
+            embedded = scanned = 1.0
+        elif expected is None:
+            embedded = scanned = 0.0
+        else:
+            embedded = min(self.embedded / expected, 1.0)
+            scanned = min(self.scanned / expected, 1.0)
+        return (
+            PROGRESS_WEIGHTS['extract'] * self.extract_fraction()
+            + PROGRESS_WEIGHTS['embed'] * embedded
+            + PROGRESS_WEIGHTS['entities'] * scanned
+        )
+
+
+def _eta(elapsed: float, fraction: float) -> Optional[float]:
+    """Remaining seconds assuming the rate observed so far holds."""
+    if fraction <= 0:
+        return None
+    return round(elapsed * (1.0 - fraction) / fraction, 1)
+
+
+class IngestProgress:
+    """
+    Per-document progress of one ingest, fed by extraction callbacks and pipeline batch events.
+
+    Every change is published as a document status update (pages parsed, chunks created,
+    embedded and scanned for entities); overall() aggregates the documents weighted by size
+    into progress, throughput, ETA and a suggested poll interval.
+    """
+
+    def __init__(self, documents: Sequence[Tuple[str, int]], publish: Callable[..., None]):
+        """
+        Initialize progress tracking.
+
+        Args:
+            documents: (filename, size in bytes) of every document, in ingest order
+            publish: Called as publish(filename, status, progress, chunks, **details) on changes
+        """
+        self._documents: Dict[str, _DocumentProgress] = {}
+        for filename, size in documents:
+            # Files uploaded twice under one name are tracked (and reported) as one document
+            if filename in self._documents:
+                self._documents[filename].size += size
+            else:
+                self._documents[filename] = _DocumentProgress(filename, size)
+        self._order = list(self._documents)
+        self._publish = publish
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._current = 0
+
+    def extraction_progress(self, filename: str, done: int, total: int, unit: str) -> None:
+        """Extraction callback (see iter_document_chunks): done of total pages or bytes."""
+        with self._lock:
+            doc = self._documents[filename]
+            self._advance_to(filename)
+            doc.unit, doc.done, doc.total = unit, done, total
+            self._publish_document(doc)
+
+    def chunks(self, chunk_stream: Iterable[Tuple[str, str]]) -> Iterator[Tuple[str, str]]:
+        """Pass a (chunk, source) stream through, counting the chunks created per document."""
+        chunk_stream = iter(chunk_stream)
+        try:
+            for chunk, source in chunk_stream:
+                with self._lock:
+                    doc = self._documents[source]
+                    self._advance_to(source)
+                    doc.chunks += 1
+                    self._publish_document(doc)
+                yield chunk, source
+            with self._lock:
+                for filename in self._order[self._current:]:
+                    self._documents[filename].extracted = True
+                    self._publish_document(self._documents[filename])
+        finally:
+            close = getattr(chunk_stream, 'close', None)
+            if close is not None:
+                close()
+
+    def batch_done(self, stage: str, batch: ChunkBatch, result: Any) -> None:
+        """IngestPipeline listener: counts embedded chunks and entity scans per document."""
+        if stage not in ('embed', 'entities'):
+            return
+        with self._lock:
+            touched = {}
+            for source in batch.sources:
+                doc = touched[source] = self._documents[source]
+                if stage == 'embed':
+                    doc.embedded += 1
+                else:
+                    doc.scanned += 1
+            if stage == 'entities':
+                for entity in result[1]:
+                    offset = entity.get('source_chunk_id', batch.start) - batch.start
+                    if 0 <= offset < len(batch.sources):
+                        self._documents[batch.sources[offset]].entities += 1
+            for doc in touched.values():
+                self._publish_document(doc)
+
+    def overall(self) -> Dict:
+        """Session-wide progress (0-100), embedding throughput, ETA and next poll interval."""
+        with self._lock:
+            elapsed = time.perf_counter() - self._started
+            documents = self._documents.values()
+            total_size = sum(doc.size for doc in documents)
+            fraction = sum(doc.size * doc.fraction() for doc in documents) / total_size if documents else 0.0
+            embedded = sum(doc.embedded for doc in documents)
+        eta = _eta(elapsed, fraction)
+        return {
+            'progress': round(min(fraction * 100, 99.0), 1),
+            'chunks_per_sec': round(embedded / elapsed, 2) if elapsed > 0 else 0.0,
+            'eta_seconds': eta,
+            'poll_after_seconds': DEFAULT_POLL_SECONDS if eta is None
+                else round(min(max(eta / 20, MIN_POLL_SECONDS), MAX_POLL_SECONDS), 1)
+        }
+
+    def _advance_to(self, filename: str) -> None:
+        """Documents are extracted in order: reaching one finishes every document before it."""
+        pending = self._order[self._current:]
+        if filename in pending:
+            position = self._current + pending.index(filename)
+            for previous in self._order[self._current:position]:
+                self._documents[previous].extracted = True
+                self._publish_document(self._documents[previous])
+            self._current = position
+        doc = self._documents[filename]
+        if doc.started is None:
+            doc.started = time.perf_counter()
+
+    def _publish_document(self, doc: _DocumentProgress) -> None:
+        """Publish a document's status; called with the lock held so updates stay ordered."""
+        fraction = doc.fraction()
+        if doc.extracted and doc.embedded >= doc.chunks and doc.scanned >= doc.chunks:
+            doc.status = 'indexing'
+        elif doc.embedded:
+            doc.status = 'embedding'
+        elif doc.started is not None:
+            doc.status = 'chunking'
+        elapsed = time.perf_counter() - doc.started if doc.started is not None else 0.0
+        details = {
+            'chunks_embedded': doc.embedded,
+            'entities_count': doc.entities,
+            'chunks_per_sec': round(doc.embedded / elapsed, 2) if elapsed > 0 else 0.0,
+            'eta_seconds': _eta(elapsed, fraction),
+        }
+        if doc.unit == 'pages':
+            details.update(pages_parsed=doc.done, total_pages=doc.total)
+        self._publish(doc.filename, doc.status, int(min(fraction * 100, 99)), doc.chunks, **details)
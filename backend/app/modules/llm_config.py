@@ -12,6 +12,8 @@ class LLMConfig:
     api_key: Optional[str]
     base_url: Optional[str]
     model: str
+    max_concurrency: int = 8
+    timeout: float = 60.0
 
 
 def resolve_llm_config(default_model: str = "gpt-4o-mini") -> LLMConfig:
@@ -26,6 +28,8 @@ def resolve_llm_config(default_model: str = "gpt-4o-mini") -> LLMConfig:
     Optional env vars:
     - LLM_PROVIDER: openai | groq | openrouter
     - LLM_MODEL: model override
+    - LLM_MAX_CONCURRENCY: in-flight completions allowed per provider
+    - LLM_TIMEOUT_SECONDS: per-request timeout for completions
     """
     provider_env = (os.getenv("LLM_PROVIDER") or "").strip().lower()
 
@@ -59,4 +63,14 @@ def resolve_llm_config(default_model: str = "gpt-4o-mini") -> LLMConfig:
     else:
         model = model_override or default_model
 
-    return LLMConfig(provider=provider, api_key=api_key, base_url=base_url, model=model)
+    max_concurrency = max(1, int(os.getenv("LLM_MAX_CONCURRENCY", "8")))
+    timeout = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+
+    return LLMConfig(
+        provider=provider,
+        api_key=api_key,
+        base_url=base_url,
+        model=model,
+        max_concurrency=max_concurrency,
+        timeout=timeout,
+    )
@@ -0,0 +1,171 @@
+"""
+Shared asynchronous LLM client.
+One pooled AsyncOpenAI client per provider (and event loop), with a semaphore bounding in-flight completions
+so concurrent queries share connections instead of serialising on the event loop.
+"""
+import asyncio
+import threading
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI
+
+from app.modules.llm_config import LLMConfig
+
+# Idle keep-alive connections kept per provider beyond the concurrency limit
+KEEPALIVE_CONNECTIONS = 4
+CONNECT_TIMEOUT_SECONDS = 10.0
+
+
+class LLMClientPool:
+    """
+    Pooled AsyncOpenAI client plus an in-flight completion limit for one provider.
+
+    Connections and semaphores belong to one event loop, so each loop using the pool gets
+    its own client. A client is closed on its loop when that loop shuts down (asyncio.run
+    cancels the loop's remaining tasks) or by ``aclose``.
+    """
+
+    def __init__(self, config: LLMConfig):
+        """
+        Initialize client pool.
+
+        Args:
+            config: Resolved provider configuration (must carry an API key)
+        """
+        self.config = config
+        self._clients: Dict[asyncio.AbstractEventLoop, Tuple[AsyncOpenAI, asyncio.Semaphore]] = {}
+        self._closers: Dict[asyncio.AbstractEventLoop, asyncio.Task] = {}
+        self._lock = threading.Lock()
+
+    def _ensure_client(self) -> Tuple[AsyncOpenAI, asyncio.Semaphore]:
+        """Return the client and semaphore of the running event loop, creating them on first use."""
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(loop)
+        if entry is not None:
+            return entry
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.config.max_concurrency + KEEPALIVE_CONNECTIONS,
+                max_keepalive_connections=self.config.max_concurrency
+            ),
+            timeout=httpx.Timeout(self.config.timeout, connect=CONNECT_TIMEOUT_SECONDS)
+        )
+        options = {"api_key": self.config.api_key, "http_client": http_client, "max_retries": 2}
+        if self.config.base_url:
+            options["base_url"] = self.config.base_url
+        entry = (AsyncOpenAI(**options), asyncio.Semaphore(self.config.max_concurrency))
+        with self._lock:
+            # Loops closed without cancelling their tasks can no longer close their clients
+            for stale in [other for other in self._clients if other.is_closed()]:
+                del self._clients[stale]
+                self._closers.pop(stale, None)
+            self._clients[loop] = entry
+            self._closers[loop] = loop.create_task(self._close_on_shutdown(loop))
+        return entry
+
+    async def _close_on_shutdown(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Wait until cancelled by the loop's shutdown, then close the loop's client."""
+        try:
+            await loop.create_future()
+        except asyncio.CancelledError:
+            await self._close_loop_client(loop)
+            raise
+
+    async def _close_loop_client(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Close the client of a loop; must run on that loop."""
+        with self._lock:
+            entry = self._clients.pop(loop, None)
+            closer = self._closers.pop(loop, None)
+        if closer is not None and closer is not asyncio.current_task():
+            closer.cancel()
+        if entry is not None:
+            await entry[0].close()
+
+    async def chat_completion(self, **kwargs):
+        """
+        Create a chat completion, waiting for a free slot when the provider limit is reached.
+
+        Args:
+            **kwargs: Arguments for ``chat.completions.create``
+
+        Returns:
+            OpenAI chat completion response (or stream when ``stream=True``)
+        """
+        client, semaphore = self._ensure_client()
+        async with semaphore:
+            return await client.chat.completions.create(**kwargs)
+
+    async def stream_chat_completion(self, **kwargs) -> AsyncIterator[str]:
+        """
+        Stream a chat completion as text deltas.
+
+        The concurrency slot is held until the stream is exhausted or closed.
+
+        Args:
+            **kwargs: Arguments for ``chat.completions.create`` (``stream`` is forced on)
+
+        Yields:
+            Non-empty content deltas in arrival order
+        """
+        client, semaphore = self._ensure_client()
+        async with semaphore:
+            stream = await client.chat.completions.create(stream=True, **kwargs)
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    async def aclose(self) -> None:
+        """Close the clients of every loop; those of other running loops are closed on their loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            loops = list(self._clients)
+        for other in loops:
+            if other is loop:
+                await self._close_loop_client(loop)
+            elif other.is_closed():
+                with self._lock:
+                    self._clients.pop(other, None)
+                    self._closers.pop(other, None)
+            else:
+                await asyncio.wrap_future(
+                    asyncio.run_coroutine_threadsafe(self._close_loop_client(other), other)
+                )
+
+
+_pools: Dict[Tuple[str, Optional[str], str], LLMClientPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_llm_pool(config: LLMConfig, api_key: Optional[str] = None) -> Optional[LLMClientPool]:
+    """
+    Return the shared client pool for a provider, or None when no API key is configured.
+
+    Generators for the same provider and key share one pool, so the concurrency limit
+    applies across all of them.
+
+    Args:
+        config: Resolved provider configuration
+        api_key: Explicit API key overriding the configured one
+    """
+    api_key = api_key or config.api_key
+    if not api_key:
+        return None
+    key = (config.provider, config.base_url, api_key)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            if api_key != config.api_key:
+                config = LLMConfig(**{**config.__dict__, "api_key": api_key})
+            pool = LLMClientPool(config)
+            _pools[key] = pool
+        return pool
+
+
+async def close_llm_pools() -> None:
+    """Close the clients of every pool (application shutdown)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        await pool.aclose()
+
@@ -0,0 +1,205 @@
+"""
+Pluggable PDF text extraction.
+Pages are read with a fast text backend (PyMuPDF when installed, otherwise pypdf); only pages
+whose text looks broken are re-extracted with pdfplumber's character layout analysis.
+PDFs are parsed from a path, from in-memory bytes, or from a shared-memory block handed to
+worker processes.
+"""
+import io
+import re
+import time
+from multiprocessing import shared_memory
+from typing import List, NamedTuple, Union
+
+import pdfplumber
+import pypdf
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+# Alphabetic runs longer than this are almost always several words glued together
+MAX_WORD_LENGTH = 20
+
+_SUSPICIOUS_WORD = re.compile(r'[A-Za-z]{%d,}|[a-z][A-Z]|\ufffd|\(cid:\d+\)' % (MAX_WORD_LENGTH + 1))
+
+
+class ExtractedPage(NamedTuple):
+    text: str
+    seconds: float
+    backend: str
+
+
+class SharedPdf(NamedTuple):
+    """PDF bytes published in a shared-memory block (picklable handle for worker processes)."""
+    name: str
+    size: int
+
+
+# File path, raw PDF bytes, or a shared-memory handle
+PdfSource = Union[str, bytes, SharedPdf]
+
+
+def read_source(source: PdfSource) -> Union[str, bytes]:
+    """Resolve a shared-memory handle to bytes; paths and bytes are returned unchanged."""
+    if not isinstance(source, SharedPdf):
+        return source
+    shm = shared_memory.SharedMemory(name=source.name)
+    try:
+        return bytes(shm.buf[:source.size])
+    finally:
+        shm.close()
+
+
+def _as_file(source: Union[str, bytes]):
+    """Path as-is, bytes wrapped in a file-like buffer (BytesIO shares the bytes object)."""
+    return source if isinstance(source, str) else io.BytesIO(source)
+
+
+def text_quality(text: str) -> float:
+    """
+    Heuristic extraction quality of a page.
+
+    Args:
+        text: Extracted page text
+
+    Returns:
+        Share of words that do not look concatenated or garbled (0.0 for empty text)
+    """
+    words = text.split()
+    if not words:
+        return 0.0
+    suspicious = sum(1 for word in words if _SUSPICIOUS_WORD.search(word))
+    return 1.0 - suspicious / len(words)
+
+
+class _PyMuPdfDocument:
+    def __init__(self, source: Union[str, bytes]):
+        self._doc = fitz.open(source) if isinstance(source, str) else fitz.open(stream=source, filetype="pdf")
+
+    def __len__(self) -> int:
+        return self._doc.page_count
+
+    def page_text(self, index: int) -> str:
+        return self._doc.load_page(index).get_text("text")
+
+    def close(self) -> None:
+        self._doc.close()
+
+
+class _PyPdfDocument:
+    def __init__(self, source: Union[str, bytes]):
+        self._reader = pypdf.PdfReader(_as_file(source))
+
+    def __len__(self) -> int:
+        return len(self._reader.pages)
+
+    def page_text(self, index: int) -> str:
+        return self._reader.pages[index].extract_text() or ""
+
+    def close(self) -> None:
+        pass
+
+
+class _PdfPlumberDocument:
+    def __init__(self, source: Union[str, bytes]):
+        self._pdf = pdfplumber.open(_as_file(source))
+
+    def __len__(self) -> int:
+        return len(self._pdf.pages)
+
+    def page_text(self, index: int) -> str:
+        page = self._pdf.pages[index]
+        try:
+            text = page.extract_text(layout=False, x_tolerance=3, y_tolerance=3) or ""
+        except Exception:
+            text = page.extract_text() or ""
+        # Drop the page's parsed objects; long reports otherwise keep every page in memory
+        page.close()
+        return text
+
+    def close(self) -> None:
+        self._pdf.close()
+
+
+BACKENDS = {
+    'pymupdf': _PyMuPdfDocument,
+    'pypdf': _PyPdfDocument,
+    'pdfplumber': _PdfPlumberDocument,
+}
+
+
+def available_backends() -> List[str]:
+    """Backends usable in this environment."""
+    return [name for name in BACKENDS if name != 'pymupdf' or fitz is not None]
+
+
+class PdfExtractor:
+    """Per-page extraction with a fast backend and pdfplumber as the layout-aware fallback."""
+
+    FALLBACK_BACKEND = 'pdfplumber'
+
+    def __init__(self, backend: str = "auto", min_quality: float = 0.9):
+        """
+        Initialize extractor.
+
+        Args:
+            backend: 'auto' (PyMuPDF if installed, else pypdf), 'pymupdf', 'pypdf' or 'pdfplumber'
+            min_quality: Pages scoring below this text_quality are re-extracted with pdfplumber
+                (0 never falls back)
+        """
+        if backend == "auto":
+            backend = 'pymupdf' if fitz is not None else 'pypdf'
+        if backend not in available_backends():
+            raise ValueError(f"Unknown or unavailable PDF backend: {backend!r} (available: {available_backends()})")
+        self.backend = backend
+        self.min_quality = min_quality
+
+    def page_count(self, source: PdfSource) -> int:
+        """Number of pages in a PDF."""
+        doc = BACKENDS[self.backend](read_source(source))
+        try:
+            return len(doc)
+        finally:
+            doc.close()
+
+    def extract_range(self, source: PdfSource, start: int, end: int) -> List[ExtractedPage]:
+        """
+        Extract pages [start, end) of a PDF.
+
+        Args:
+            source: PDF file path, bytes or shared-memory handle
+            start: First page index
+            end: Page index after the last page
+
+        Returns:
+            Raw page texts with extraction time and the backend that produced them
+        """
+        source = read_source(source)
+        doc = BACKENDS[self.backend](source)
+        layout_doc = None
+        pages = []
+        try:
+            for index in range(start, end):
+                began = time.perf_counter()
+                backend = self.backend
+                try:
+                    text = doc.page_text(index)
+                except Exception as e:
+                    print(f"[PDF] {self.backend} failed on page {index + 1}: {e}")
+                    text = ""
+
+                if backend != self.FALLBACK_BACKEND and text_quality(text) < self.min_quality:
+                    if layout_doc is None:
+                        layout_doc = BACKENDS[self.FALLBACK_BACKEND](source)
+                    layout_text = layout_doc.page_text(index)
+                    if layout_text.strip():
+                        text, backend = layout_text, self.FALLBACK_BACKEND
+
+                pages.append(ExtractedPage(text, time.perf_counter() - began, backend))
+        finally:
+            doc.close()
+            if layout_doc is not None:
+                layout_doc.close()
+        return pages
@@ -1,110 +1,320 @@
 """
 Data pipeline visualization and tracking.
+Every upload and query records a trace: a tree of spans timed with the monotonic
+perf_counter_ns clock. Code opens spans with trace_span(), which nests under whichever span is
+active in the current thread or task (and does nothing outside a trace). Recent traces are
+kept in a ring buffer and back the pipeline visualization.
 """
-from typing import Dict, List, Any
+import contextvars
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
 
+# Traces kept in the ring buffer (oldest are dropped first)
+DEFAULT_TRACE_CAPACITY = 200
 
-class PipelineTracker:
-    """Track and visualize data pipeline flow."""
-    
-    def __init__(self):
-        """Initialize pipeline tracker."""
-        self.stages = {}
-        self.start_time = datetime.now()
-    
-    def log_stage(self, stage_name: str, data: Dict[str, Any]):
-        """Log a pipeline stage with its data."""
-        self.stages[stage_name] = {
-            "timestamp": datetime.now(),
-            "data": data
+_active_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("active_span", default=None)
+
+# End-of-iteration marker for Span.timed
+_END = object()
+
+
+class Span:
+    """
+    A named, timed step of a trace.
+    
+    A span opened several times (once per batch or per chunk) accumulates: duration is the
+    total time spent inside it, calls the number of timed intervals, and start/end the
+    first entry and last exit.
+    """
+    
+    def __init__(self, name: str, lock: Optional[threading.Lock] = None, **data):
+        self.name = name
+        self.data: Dict[str, Any] = dict(data)
+        self.children: Dict[str, "Span"] = {}
+        self.start_ns: Optional[int] = None
+        self.end_ns: Optional[int] = None
+        self.duration_ns = 0
+        self.calls = 0
+        self.status = 'pending'
+        self.error: Optional[str] = None
+        self._lock = lock or threading.Lock()
+    
+    def child(self, name: str, **data) -> "Span":
+        """Get or create the child span of this name."""
+        span = self.children.get(name)
+        if span is None:
+            with self._lock:
+                span = self.children.setdefault(name, Span(name, self._lock))
+        if data:
+            span.set(**data)
+        return span
+    
+    def set(self, **data) -> "Span":
+        """Attach attributes (counts, sizes, parameters) to the span."""
+        self.data.update(data)
+        return self
+    
+    def add(self, start_ns: int, end_ns: int) -> None:
+        """Record an interval measured elsewhere (e.g. by a worker thread)."""
+        with self._lock:
+            if self.start_ns is None or start_ns < self.start_ns:
+                self.start_ns = start_ns
+            if self.end_ns is None or end_ns > self.end_ns:
+                self.end_ns = end_ns
+            self.duration_ns += end_ns - start_ns
+            self.calls += 1
+            if self.status in ('pending', 'running'):
+                self.status = 'complete'
+    
+    @contextmanager
+    def activate(self) -> Iterator["Span"]:
+        """Make this the parent of spans opened with trace_span(), without timing it."""
+        token = _active_span.set(self)
+        try:
+            yield self
+        finally:
+            _active_span.reset(token)
+    
+    @contextmanager
+    def time(self) -> Iterator["Span"]:
+        """Time one interval of this span; it is the active span meanwhile."""
+        token = _active_span.set(self)
+        if self.status == 'pending':
+            self.status = 'running'
+        began = time.perf_counter_ns()
+        try:
+            yield self
+        except BaseException as e:
+            self.status = 'error'
+            self.error = str(e) or type(e).__name__
+            raise
+        finally:
+            self.add(began, time.perf_counter_ns())
+            _active_span.reset(token)
+    
+    def span(self, name: str, **data):
+        """Open (and time) a child span: ``with parent.span("encode"): ...``."""
+        return self.child(name, **data).time()
+    
+    def timed(self, iterable: Iterable) -> Iterator:
+        """Iterate, timing each step of the underlying iterator as one interval of this span."""
+        iterator = iter(iterable)
+        try:
+            while True:
+                with self.time():
+                    item = next(iterator, _END)
+                if item is _END:
+                    return
+                yield item
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+    
+    def find(self, path: Sequence[str]) -> Optional["Span"]:
+        """Descendant span at a path of names, or None."""
+        span = self
+        for name in path:
+            span = span.children.get(name)
+            if span is None:
+                return None
+        return span
+    
+    @property
+    def duration_ms(self) -> float:
+        return self.duration_ns / 1e6
+    
+    def to_dict(self, origin_ns: int) -> Dict:
+        """
+        JSON-friendly view with times in milliseconds, children in start order.
+        
+        self_ms is the span's time not covered by its children (children running in parallel
+        threads can cover more than their parent, so it is clamped at 0).
+        """
+        children = sorted(
+            self.children.values(), key=lambda child: (child.start_ns is None, child.start_ns or 0)
+        )
+        child_ns = sum(child.duration_ns for child in children)
+        return {
+            'name': self.name,
+            'status': self.status,
+            'start_ms': round((self.start_ns - origin_ns) / 1e6, 3) if self.start_ns is not None else None,
+            'duration_ms': round(self.duration_ms, 3),
+            'self_ms': round(max(self.duration_ns - child_ns, 0) / 1e6, 3),
+            'calls': self.calls,
+            'data': dict(self.data),
+            'error': self.error,
+            'children': [child.to_dict(origin_ns) for child in children]
+        }
+
+
+class Trace:
+    """Spans of one request (an upload, append or query), rooted at a span named after its kind."""
+    
+    def __init__(self, kind: str, session_id: Optional[str] = None, **data):
+        self.trace_id = uuid.uuid4().hex
+        self.kind = kind
+        self.session_id = session_id
+        self.started_at = datetime.now()
+        self.root = Span(kind, **data)
+        self.root.status = 'running'
+        self.root.start_ns = time.perf_counter_ns()
+    
+    @property
+    def finished(self) -> bool:
+        return self.root.end_ns is not None
+    
+    def span(self, name: str, **data):
+        """Open (and time) a top-level span of the trace."""
+        return self.root.span(name, **data)
+    
+    def find(self, *path: str) -> Optional[Span]:
+        return self.root.find(path)
+    
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """Close the trace; the root span covers the whole request."""
+        if self.finished:
+            return
+        self.root.end_ns = time.perf_counter_ns()
+        self.root.duration_ns = self.root.end_ns - self.root.start_ns
+        self.root.calls = 1
+        if error is not None:
+            self.root.status = 'error'
+            self.root.error = str(error) or type(error).__name__
+        else:
+            self.root.status = 'complete'
+    
+    def to_dict(self) -> Dict:
+        return {
+            'trace_id': self.trace_id,
+            'kind': self.kind,
+            'session_id': self.session_id,
+            'started_at': self.started_at.isoformat(),
+            'finished': self.finished,
+            'root': self.root.to_dict(self.root.start_ns)
         }
+
+
+def current_span() -> Optional[Span]:
+    """The span code runs under in this thread or task, if any."""
+    return _active_span.get()
+
+
+def trace_span(name: str, **data):
+    """Open a child of the active span; a no-op context manager outside a trace."""
+    parent = _active_span.get()
+    return parent.span(name, **data) if parent is not None else nullcontext()
+
+
+def annotate(**data) -> None:
+    """Attach attributes to the active span (ignored outside a trace)."""
+    span = _active_span.get()
+    if span is not None:
+        span.set(**data)
+
+
+def traced(name: str, iterable: Iterable) -> Iterator:
+    """
+    Time iteration as a child span of the span active when iteration starts (so stacked
+    generators nest the way they call each other); untimed outside a trace.
+    """
+    parent = _active_span.get()
+    if parent is None:
+        yield from iterable
+    else:
+        yield from parent.child(name).timed(iterable)
+
+
+# Visualization stages: (id, name, icon, description, span path in the ingest or query trace)
+DOCUMENT_STAGES = [
+    ("upload", "Document Upload", "📤", "Parse and read uploaded files", ("read",)),
+    ("preprocessing", "Preprocessing & Chunking", "✂️", "Clean text and split into chunks", ("ingest", "extract")),
+    ("embedding", "Embedding Generation", "🔢", "Generate vector embeddings for each chunk", ("ingest", "embed")),
+    ("indexing", "Vector Indexing (FAISS)", "🗂️", "Build searchable FAISS index", ("ingest", "index")),
+    ("entity_extraction", "Entity Extraction", "🏷️", "Extract named entities from chunks", ("ingest", "entities")),
+    ("graph_building", "Knowledge Graph Construction", "🔗", "Build entity relationships graph", ("ingest", "graph")),
+]
+QUERY_STAGES = [
+    ("retrieval", "Semantic Retrieval", "🔍", "Find most relevant document chunks", ("retrieve",)),
+    ("answer_generation", "Answer Generation", "💡", "Generate answer using LLM with context", ("llm",)),
+    ("citation", "Citation Extraction", "📌", "Link answer to source documents", ("explain", "citations")),
+]
+INGEST_KINDS = ('upload', 'append')
+
+
+class PipelineTracker:
+    """Track and visualize data pipeline flow from the traces of recent requests."""
+    
+    def __init__(self, capacity: int = DEFAULT_TRACE_CAPACITY):
+        """
+        Initialize pipeline tracker.
+        
+        Args:
+            capacity: Traces kept in the ring buffer (across all sessions)
+        """
+        self._traces: deque = deque(maxlen=max(1, capacity))
+        self._lock = threading.Lock()
+    
+    def start_trace(self, kind: str, session_id: Optional[str] = None, **data) -> Trace:
+        """Start a trace and add it to the ring buffer."""
+        trace = Trace(kind, session_id, **data)
+        with self._lock:
+            self._traces.append(trace)
+        return trace
     
-    def get_pipeline_visualization(self) -> Dict:
+    @contextmanager
+    def trace(self, kind: str, session_id: Optional[str] = None, **data) -> Iterator[Trace]:
+        """Trace a block: spans opened inside nest under the trace's root span."""
+        trace = self.start_trace(kind, session_id, **data)
+        try:
+            with trace.root.activate():
+                yield trace
+        except BaseException as e:
+            trace.finish(e)
+            raise
+        trace.finish()
+    
+    def traces(self, session_id: Optional[str] = None, kinds: Optional[Sequence[str]] = None, limit: Optional[int] = None) -> List[Trace]:
+        """Buffered traces, newest first, optionally filtered by session and kind."""
+        with self._lock:
+            traces = list(self._traces)
+        selected = [
+            trace for trace in reversed(traces)
+            if (session_id is None or trace.session_id == session_id) and (kinds is None or trace.kind in kinds)
+        ]
+        return selected[:limit] if limit is not None else selected
+    
+    def latest(self, session_id: str, kinds: Sequence[str]) -> Optional[Trace]:
+        """Most recent trace of a session among the given kinds."""
+        traces = self.traces(session_id, kinds, limit=1)
+        return traces[0] if traces else None
+    
+    def get_pipeline_visualization(self, session_id: str, limit: int = 10) -> Dict:
         """
         Get complete pipeline visualization data.
         
+        Stage timings come from the session's latest ingest and query traces; stages that
+        have not run are 'pending'.
+        
+        Args:
+            session_id: Session whose traces are shown
+            limit: Recent traces included in full
+        
         Returns:
-            Dict with pipeline flow and metadata
+            Dict with pipeline flow, measured stage data and recent traces
         """
+        ingest = self.latest(session_id, INGEST_KINDS)
+        query = self.latest(session_id, ('query',))
         return {
-            "stages": [
-                {
-                    "id": "upload",
-                    "name": "Document Upload",
-                    "icon": "📤",
-                    "description": "Parse and read uploaded files",
-                    "status": "complete",
-                    "data": self.stages.get("upload", {}).get("data", {})
-                },
-                {
-                    "id": "preprocessing",
-                    "name": "Preprocessing & Chunking",
-                    "icon": "✂️",
-                    "description": "Clean text and split into chunks",
-                    "status": "complete",
-                    "data": self.stages.get("preprocessing", {}).get("data", {})
-                },
-                {
-                    "id": "embedding",
-                    "name": "Embedding Generation",
-                    "icon": "🔢",
-                    "description": "Generate vector embeddings for each chunk",
-                    "status": "complete",
-                    "data": self.stages.get("embedding", {}).get("data", {})
-                },
-                {
-                    "id": "indexing",
-                    "name": "Vector Indexing (FAISS)",
-                    "icon": "🗂️",
-                    "description": "Build searchable FAISS index",
-                    "status": "complete",
-                    "data": self.stages.get("indexing", {}).get("data", {})
-                },
-                {
-                    "id": "entity_extraction",
-                    "name": "Entity Extraction",
-                    "icon": "🏷️",
-                    "description": "Extract named entities from chunks",
-                    "status": "complete",
-                    "data": self.stages.get("entity_extraction", {}).get("data", {})
-                },
-                {
-                    "id": "graph_building",
-                    "name": "Knowledge Graph Construction",
-                    "icon": "🔗",
-                    "description": "Build entity relationships graph",
-                    "status": "complete",
-                    "data": self.stages.get("graph_building", {}).get("data", {})
-                }
-            ],
-            "query_stages": [
-                {
-                    "id": "retrieval",
-                    "name": "Semantic Retrieval",
-                    "icon": "🔍",
-                    "description": "Find most relevant document chunks",
-                    "status": "complete",
-                    "data": self.stages.get("retrieval", {}).get("data", {})
-                },
-                {
-                    "id": "answer_generation",
-                    "name": "Answer Generation",
-                    "icon": "💡",
-                    "description": "Generate answer using LLM with context",
-                    "status": "complete",
-                    "data": self.stages.get("answer_generation", {}).get("data", {})
-                },
-                {
-                    "id": "citation",
-                    "name": "Citation Extraction",
-                    "icon": "📌",
-                    "description": "Link answer to source documents",
-                    "status": "complete",
-                    "data": self.stages.get("citation", {}).get("data", {})
-                }
-            ],
-            "total_time": (datetime.now() - self.start_time).total_seconds()
+            "stages": [_stage_view(stage, ingest) for stage in DOCUMENT_STAGES],
+            "query_stages": [_stage_view(stage, query) for stage in QUERY_STAGES],
+            "total_time": sum(trace.root.duration_ns for trace in (ingest, query) if trace is not None) / 1e9,
+            "traces": [trace.to_dict() for trace in self.traces(session_id, limit=limit)]
         }
     
     @staticmethod
@@ -151,3 +361,22 @@ class PipelineTracker:
                 }
             }
         }
+
+
+def _stage_view(stage, trace: Optional[Trace]) -> Dict:
+    stage_id, name, icon, description, path = stage
+    span = trace.find(*path) if trace is not None else None
+    if span is None:
+        status = 'running' if trace is not None and not trace.finished else 'pending'
+        data = {}
+    else:
+        status = span.status
+        data = {**span.data, 'duration_ms': round(span.duration_ms, 3), 'calls': span.calls}
+    return {
+        "id": stage_id,
+        "name": name,
+        "icon": icon,
+        "description": description,
+        "status": status,
+        "data": data
+    }
@@ -1,122 +1,318 @@
 """
 Document preprocessing and chunking module.
 """
+import codecs
+import math
+import multiprocessing
 import re
-from typing import List, Tuple
-import pdfplumber
-import pypdf
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
 from pathlib import Path
 import tempfile
 import os
+from app.modules.pdf_extraction import ExtractedPage, PdfExtractor, PdfSource, SharedPdf
+from app.modules.pipeline_tracker import trace_span, traced
 from app.modules.text_reconstructor import TextReconstructor
+from app.modules.word_segmentation import configure_segmenter, get_segmenter
+
+# Text files are decoded in blocks of this many bytes (small enough that extraction progress
+# tracks what the chunker has consumed)
+TEXT_BLOCK_SIZE = 1 << 16
+
+# Longest stretch of text without a sentence end that is carried between pieces
+MAX_SEGMENT_CHARS = 1 << 20
+
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+# Sentence-ending punctuation followed by whitespace and the next word: text up to it is a
+# complete segment (whitespace before punctuation is still joined up by reconstruction).
+# Judged on raw text, so the whitespace must include a character clean_text keeps (it drops
+# vertical tab, form feed and \x1c-\x1f) and the next character must survive cleaning too.
+_SENTENCE_END = re.compile(
+    r'[.!?](?=[\x0b\x0c\x1c-\x1f]*[^\S\x0b\x0c\x1c-\x1f]\s*[a-zA-Z0-9"\'()\-/@#$%&*+=])'
+)
+
+# PDFs up to this many pages are extracted in-process; larger ones are split into page
+# ranges of at least this size and extracted in worker processes
+PDF_PAGES_PER_TASK = 8
 
 
 def insert_spaces_in_concatenated_text(text: str) -> str:
     """
     Intelligently insert spaces in text where words are concatenated without spaces.
-    Handles patterns like "Thatis" -> "That is", "eachdimension" -> "each dimension"
-    """
-    common_words = [
-        'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'her', 'was', 'one',
-        'our', 'out', 'had', 'has', 'his', 'how', 'its', 'may', 'new', 'now', 'old', 'see',
-        'two', 'way', 'who', 'boy', 'did', 'get', 'got', 'let', 'put', 'say', 'she', 'too',
-        'use', 'each', 'that', 'this', 'with', 'from', 'have', 'been', 'them', 'than', 'more',
-        'also', 'over', 'both', 'same', 'such', 'only', 'like', 'what', 'when', 'where', 'which',
-        'will', 'would', 'could', 'should', 'first', 'other', 'these', 'those', 'about', 'after',
-        'model', 'data', 'time', 'work', 'part', 'year', 'make', 'take', 'come', 'know', 'good',
-        'find', 'give', 'hand', 'tell', 'call', 'turn', 'feel', 'fact', 'head', 'keep', 'seem'
-    ]
-    
-    result = []
-    i = 0
-    while i < len(text):
-        if i > 0 and text[i].isupper() and text[i-1].islower():
-            # Check if previous chars form a real word
-            for word_len in range(3, min(10, i+1)):
-                potential_word = text[i-word_len:i].lower()
-                if potential_word in common_words:
-                    result.append(' ')
-                    break
-        result.append(text[i])
-        i += 1
+    Handles patterns like "ThatIs" -> "That Is", "eachDimension" -> "each Dimension"
+    """
+    # Only words of 3+ letters count, so short fragments like "is" never trigger a split
+    return get_segmenter().split(text, min_length=3, max_length=9)
+
+
+def fix_page_spacing(page_text: str) -> str:
+    """
+    Apply spacing fixes to the raw text of one PDF page.
+    
+    Args:
+        page_text: Text as returned by the extraction backend
+        
+    Returns:
+        Page text on a single line (empty if the page has no text)
+    """
+    if page_text:
+        # First pass: insert spaces in concatenated words
+        page_text = insert_spaces_in_concatenated_text(page_text)
+        
+        # Fix spacing patterns
+        page_text = re.sub(r'([a-z])([A-Z])', r'\1 \2', page_text)
+        page_text = re.sub(r'([a-z])([A-Z][a-z])', r'\1 \2', page_text)
+        page_text = re.sub(r'(\.)([A-Z])', r'\1 \2', page_text)
+        page_text = re.sub(r'([a-z]{2,})([A-Z][a-z]{2,})', r'\1 \2', page_text)
+        # Normalize whitespace
+        page_text = re.sub(r'\s+', ' ', page_text)
+    return page_text
+
+
+def extract_page_range(source: PdfSource, start: int, end: int, extractor: Optional[PdfExtractor] = None) -> List[ExtractedPage]:
+    """
+    Extract pages [start, end) of a PDF (runs in a worker process for large PDFs).
+    
+    Args:
+        source: PDF file path, bytes or shared-memory handle
+        start: First page index
+        end: Page index after the last page
+        extractor: Backend configuration (defaults to the fast backend with pdfplumber fallback)
+        
+    Returns:
+        Spacing-fixed pages with extraction time and backend, in page order
+    """
+    pages = (extractor or PdfExtractor()).extract_range(source, start, end)
+    return [page._replace(text=fix_page_spacing(page.text)) for page in pages]
+
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_workers = 0
+_pdf_pool_lock = threading.Lock()
+
+
+def get_pdf_pool(workers: int) -> ProcessPoolExecutor:
+    """Shared process pool for PDF page extraction, recreated if the worker count changes."""
+    global _pdf_pool, _pdf_pool_workers
+    with _pdf_pool_lock:
+        if _pdf_pool is None or _pdf_pool_workers != workers:
+            if _pdf_pool is not None:
+                _pdf_pool.shutdown(wait=False)
+            # Spawned workers (forking a process that already runs threads can deadlock)
+            # start clean, so they are handed the configured segmentation vocabulary
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=configure_segmenter,
+                initargs=(get_segmenter().words,)
+            )
+            _pdf_pool_workers = workers
+        return _pdf_pool
+
+
+def shutdown_pdf_pool():
+    """Stop the PDF extraction workers (application shutdown)."""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is not None:
+            _pdf_pool.shutdown(wait=False, cancel_futures=True)
+            _pdf_pool = None
+
+
+@contextmanager
+def worker_pdf_source(source: Union[str, bytes]):
+    """
+    Make a PDF readable by worker processes without pickling its bytes into every task.
+    
+    In-memory PDFs are published once in shared memory; a temp file is only used when
+    shared memory is unavailable.
+    """
+    if isinstance(source, str):
+        yield source
+        return
+    
+    try:
+        shm = shared_memory.SharedMemory(create=True, size=max(len(source), 1))
+    except OSError as e:
+        print(f"[PDF] Shared memory unavailable ({e}); handing the PDF to workers through a temp file")
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
+            temp_file.write(source)
+        try:
+            yield temp_file.name
+        finally:
+            try:
+                os.unlink(temp_file.name)
+            except OSError:
+                pass
+        return
     
-    return ''.join(result)
+    try:
+        shm.buf[:len(source)] = source
+        yield SharedPdf(shm.name, len(source))
+    finally:
+        shm.close()
+        shm.unlink()
 
 
-def extract_text_from_pdf(file_path: str) -> str:
+def iter_pdf_pages(
+    source: Union[str, bytes],
+    workers: Optional[int] = None,
+    extractor: Optional[PdfExtractor] = None,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> Iterator[ExtractedPage]:
+    """
+    Extract every page of a PDF, in parallel page ranges when the PDF is large enough.
+    
+    Pages are yielded in order as soon as their range is done; at most two ranges per
+    worker are in flight, so a long PDF is never held in memory as a whole.
+    
+    Args:
+        source: PDF file path or PDF bytes
+        workers: Worker processes (None uses every core, 1 extracts in-process)
+        extractor: Backend configuration (defaults to the fast backend with pdfplumber fallback)
+        progress: Called with (pages done, page count) once counted and whenever the caller
+            is done with a page
+        
+    Yields:
+        Pages with extraction time and backend, in page order
+    """
+    extractor = extractor or PdfExtractor()
+    page_count = extractor.page_count(source)
+    if progress is not None:
+        progress(0, page_count)
+    pages = _extract_pages(source, page_count, workers, extractor)
+    try:
+        for done, page in enumerate(pages, 1):
+            yield page
+            if progress is not None:
+                progress(done, page_count)
+    finally:
+        # Cancels outstanding ranges when the caller stops early
+        pages.close()
+
+
+def _extract_pages(source: Union[str, bytes], page_count: int, workers: Optional[int], extractor: PdfExtractor) -> Iterator[ExtractedPage]:
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or page_count <= PDF_PAGES_PER_TASK:
+        yield from extract_page_range(source, 0, page_count, extractor)
+        return
+    
+    # Several ranges per worker so a slow range (scanned figures, big tables) does not stall the rest
+    pages_per_task = max(PDF_PAGES_PER_TASK, math.ceil(page_count / (workers * 4)))
+    ranges = ((start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task))
+    done = 0
+    try:
+        pool = get_pdf_pool(workers)
+        with worker_pdf_source(source) as task_source:
+            pending = deque(
+                pool.submit(extract_page_range, task_source, start, end, extractor)
+                for start, end in islice(ranges, workers * 2)
+            )
+            try:
+                while pending:
+                    pages = pending.popleft().result()
+                    for start, end in islice(ranges, 1):
+                        pending.append(pool.submit(extract_page_range, task_source, start, end, extractor))
+                    for page in pages:
+                        yield page
+                        done += 1
+            finally:
+                for future in pending:
+                    future.cancel()
+    except BrokenProcessPool as e:
+        print(f"[PDF] Worker pool failed ({e}); extracting in-process")
+        shutdown_pdf_pool()
+        yield from extract_page_range(source, done, page_count, extractor)
+
+
+def extract_pdf_pages(source: Union[str, bytes], workers: Optional[int] = None, extractor: Optional[PdfExtractor] = None) -> List[ExtractedPage]:
+    """
+    Extract every page of a PDF (see iter_pdf_pages).
+    
+    Returns:
+        Pages with extraction time and backend, in page order
+    """
+    return list(iter_pdf_pages(source, workers, extractor))
+
+
+def log_pdf_pages(pages: Iterable[ExtractedPage]) -> Iterator[ExtractedPage]:
+    """Pass pages through and print extraction timing and backend counts once they are exhausted."""
+    began = time.perf_counter()
+    count = 0
+    page_seconds = 0.0
+    slowest_page, slowest_seconds = 0, 0.0
+    backends = Counter()
+    for page in pages:
+        count += 1
+        page_seconds += page.seconds
+        if count == 1 or page.seconds > slowest_seconds:
+            slowest_page, slowest_seconds = count, page.seconds
+        backends[page.backend] += 1
+        yield page
+    if count:
+        print(f"[PDF] Extracted {count} pages in {time.perf_counter() - began:.2f}s "
+              f"({page_seconds / count * 1000:.0f} ms/page, "
+              f"slowest page {slowest_page}: {slowest_seconds:.2f}s; "
+              f"{', '.join(f'{name}: {count}' for name, count in backends.items())})")
+
+
+def extract_text_from_pdf(source: Union[str, bytes], workers: Optional[int] = None, extractor: Optional[PdfExtractor] = None) -> str:
     """
     Extract text from PDF file with proper spacing and layout preservation.
     
     Args:
-        file_path: Path to PDF file
+        source: PDF file path or PDF bytes
+        workers: Worker processes for page extraction (None uses every core)
+        extractor: Backend configuration (defaults to the fast backend with pdfplumber fallback)
         
     Returns:
         Extracted text
     """
-    text = ""
     try:
-        with pdfplumber.open(file_path) as pdf:
-            for page_num, page in enumerate(pdf.pages):
-                try:
-                    page_text = page.extract_text(layout=False, x_tolerance=3, y_tolerance=3) or ""
-                except:
-                    page_text = page.extract_text() or ""
-                
-                if page_text:
-                    # First pass: insert spaces in concatenated words
-                    page_text = insert_spaces_in_concatenated_text(page_text)
-                    
-                    # Fix spacing patterns
-                    page_text = re.sub(r'([a-z])([A-Z])', r'\1 \2', page_text)
-                    page_text = re.sub(r'([a-z])([A-Z][a-z])', r'\1 \2', page_text)
-                    page_text = re.sub(r'(\.)([A-Z])', r'\1 \2', page_text)
-                    page_text = re.sub(r'([a-z]{2,})([A-Z][a-z]{2,})', r'\1 \2', page_text)
-                    # Normalize whitespace
-                    page_text = re.sub(r'\s+', ' ', page_text)
-                    text += page_text + "\n\n"
+        pages = list(log_pdf_pages(iter_pdf_pages(source, workers, extractor)))
     except Exception as e:
         print(f"Error extracting PDF: {e}")
-    return text.strip()
+        return ""
+    return "\n\n".join(page.text for page in pages if page.text).strip()
 
 
-def extract_text_from_file(file_content: bytes, filename: str) -> str:
+def extract_text_from_file(file_content: bytes, filename: str, pdf_workers: Optional[int] = None, pdf_extractor: Optional[PdfExtractor] = None) -> str:
     """
     Extract text from uploaded file (PDF or text).
     
     Args:
         file_content: File content as bytes
         filename: Filename to determine type
+        pdf_workers: Worker processes for PDF page extraction (None uses every core)
+        pdf_extractor: PDF backend configuration
         
     Returns:
         Extracted text
     """
     if filename.lower().endswith('.pdf'):
-        # Save to temp file and read - use proper temp directory for cross-platform compatibility
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            temp_path = temp_file.name
-            temp_file.write(file_content)
-        
-        try:
-            text = extract_text_from_pdf(temp_path)
-        finally:
-            # Clean up temp file
-            try:
-                os.unlink(temp_path)
-            except Exception:
-                pass
-        return text
+        # Parsed straight from the upload buffer; no temp file round-trip
+        return extract_text_from_pdf(bytes(file_content), pdf_workers, pdf_extractor)
     elif filename.lower().endswith(('.txt', '.md')):
         return file_content.decode('utf-8', errors='ignore')
     else:
         return ""
 
 
-def clean_text(text: str) -> str:
+def clean_text(text: str, strip: bool = True) -> str:
     """
     Clean and normalize text while preserving readability and structure.
     
     Args:
         text: Raw text
+        strip: Trim surrounding whitespace (off for segments of a larger text)
         
     Returns:
         Cleaned text
@@ -130,7 +326,50 @@ def clean_text(text: str) -> str:
     # Keep: letters, numbers, spaces, common punctuation, parentheses, colons, semicolons, hyphens
     # This preserves mathematical notation and structured text
     text = re.sub(r'[^a-zA-Z0-9\s\.\"\,\!\?\-\'\(\)\:\;\n\/\@\#\$\%\&\*\+\=]', '', text)
-    return text.strip()
+    return text.strip() if strip else text
+
+
+def iter_chunks(sentences: Iterable[str], chunk_size: int = 300, overlap: int = 50) -> Iterator[str]:
+    """
+    Group a stream of sentences into overlapping chunks.
+    
+    Only the sentences of the chunk being built are held; word counts are kept alongside
+    them so the overlap window is never re-counted.
+    
+    Args:
+        sentences: Sentences in document order
+        chunk_size: Approximate words per chunk
+        overlap: Words to overlap between chunks (one sentence is kept per 10 words)
+        
+    Yields:
+        Text chunks
+    """
+    overlap_sentences = overlap // 10
+    window = deque()  # (sentence, word count)
+    window_size = 0
+    
+    for sentence in sentences:
+        sentence_size = len(sentence.split())
+        
+        if window and window_size + sentence_size > chunk_size:
+            chunk = ' '.join(s for s, _ in window).strip()
+            if chunk:
+                yield chunk
+            # Keep overlap
+            while len(window) > overlap_sentences:
+                window_size -= window.popleft()[1]
+        window.append((sentence, sentence_size))
+        window_size += sentence_size
+    
+    if window:
+        chunk = ' '.join(s for s, _ in window).strip()
+        if chunk:
+            yield chunk
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text after sentence-ending punctuation."""
+    return _SENTENCE_BREAK.split(text)
 
 
 def chunk_text(text: str, chunk_size: int = 300, overlap: int = 50) -> List[str]:
@@ -145,57 +384,310 @@ def chunk_text(text: str, chunk_size: int = 300, overlap: int = 50) -> List[str]
     Returns:
         List of text chunks
     """
-    sentences = re.split(r'(?<=[.!?])\s+', text)
-    chunks = []
-    current_chunk = []
-    current_size = 0
+    return list(iter_chunks(split_sentences(text), chunk_size, overlap))
+
+
+class TokenChunker:
+    """
+    Chunker that measures chunks in the embedding model's tokens.
     
-    for sentence in sentences:
-        words = sentence.split()
-        sentence_size = len(words)
+    Sentences are packed into chunks that always fit the model's max sequence length, and
+    every chunk starts with the last overlap_tokens tokens of the previous one. Sentences
+    are tokenized in batches with a fast tokenizer's offset mapping; text is only cut where
+    a word starts, so a cut-out span tokenizes exactly as it did in context.
+    """
+    
+    def __init__(
+        self,
+        tokenizer,
+        max_seq_length: int,
+        overlap_tokens: int = 32,
+        max_tokens: Optional[int] = None,
+        batch_size: int = 64
+    ):
+        """
+        Initialize chunker.
         
-        if current_size + sentence_size <= chunk_size:
-            current_chunk.append(sentence)
-            current_size += sentence_size
-        else:
-            if current_chunk:
-                chunks.append(' '.join(current_chunk))
-                # Keep overlap
-                current_chunk = current_chunk[-(overlap // 10):] if overlap else []
-                current_size = sum(len(s.split()) for s in current_chunk)
-            current_chunk.append(sentence)
-            current_size += sentence_size
+        Args:
+            tokenizer: HuggingFace fast tokenizer of the embedding model
+            max_seq_length: Model's max sequence length (special tokens included)
+            overlap_tokens: Tokens repeated from the end of the previous chunk (at most half a chunk)
+            max_tokens: Tokens per chunk (None, or more than the model accepts, uses the model limit)
+            batch_size: Sentences per tokenizer call
+        """
+        if not getattr(tokenizer, 'is_fast', False):
+            raise ValueError("Token-aware chunking needs a fast tokenizer (offset mapping)")
+        self.tokenizer = tokenizer
+        limit = max_seq_length - tokenizer.num_special_tokens_to_add()
+        self.max_tokens = min(max_tokens or limit, limit)
+        if self.max_tokens < 1:
+            raise ValueError(f"No room for text in a {max_seq_length}-token sequence")
+        self.overlap_tokens = max(0, min(overlap_tokens, self.max_tokens // 2))
+        self.batch_size = max(1, batch_size)
+    
+    def token_starts(self, texts: List[str]) -> List[List[int]]:
+        """Character offset at which each token of each text starts."""
+        encoded = self.tokenizer(
+            texts,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+            verbose=False
+        )
+        return [[start for start, _ in offsets] for offsets in encoded['offset_mapping']]
     
-    if current_chunk:
-        chunks.append(' '.join(current_chunk))
+    def count_tokens(self, text: str) -> int:
+        """Tokens in a text, special tokens excluded."""
+        return len(self.token_starts([text])[0])
     
-    return [c.strip() for c in chunks if c.strip()]
+    def chunks(self, sentences: Iterable[str]) -> Iterator[str]:
+        """
+        Group a stream of sentences into token-bounded, token-overlapping chunks.
+        
+        Args:
+            sentences: Sentences in document order
+            
+        Yields:
+            Text chunks of at most max_tokens tokens
+        """
+        window = deque()  # (text, token start offsets within text)
+        window_tokens = 0
+        fresh = False  # window holds text no chunk has covered yet
+        
+        for text, starts in self._tokenized(sentences):
+            while starts:
+                room = self.max_tokens - window_tokens
+                if len(starts) <= room:
+                    window.append((text, starts))
+                    window_tokens += len(starts)
+                    fresh = True
+                    break
+                if not fresh:
+                    # Sentence longer than a chunk: take as many whole words as fit
+                    cut = next((k for k in range(room, 0, -1) if self._word_starts_at(text, starts, k)), room)
+                    window.append((text[:starts[cut]].rstrip(), starts[:cut]))
+                    window_tokens += cut
+                    text, starts = self._tail(text, starts, cut)
+                yield ' '.join(piece for piece, _ in window).strip()
+                fresh = False
+                window_tokens = self._keep_overlap(window, window_tokens)
+        
+        if fresh:
+            yield ' '.join(piece for piece, _ in window).strip()
+    
+    def _tokenized(self, sentences: Iterable[str]) -> Iterator[Tuple[str, List[int]]]:
+        sentences = iter(sentences)
+        while True:
+            batch = list(islice(sentences, self.batch_size))
+            if not batch:
+                return
+            yield from zip(batch, self.token_starts(batch))
+    
+    def _keep_overlap(self, window: deque, window_tokens: int) -> int:
+        """Trim the window to its last overlap_tokens tokens (cut at a word start); returns the new size."""
+        while window and window_tokens - len(window[0][1]) >= self.overlap_tokens:
+            window_tokens -= len(window.popleft()[1])
+        if window_tokens > self.overlap_tokens:
+            text, starts = window[0]
+            drop = window_tokens - self.overlap_tokens
+            cut = next((k for k in range(drop, len(starts)) if self._word_starts_at(text, starts, k)), len(starts))
+            if cut < len(starts):
+                window[0] = self._tail(text, starts, cut)
+            else:
+                window.popleft()
+            window_tokens -= cut
+        return window_tokens
+    
+    @staticmethod
+    def _word_starts_at(text: str, starts: List[int], index: int) -> bool:
+        return index == 0 or text[starts[index] - 1].isspace()
+    
+    @staticmethod
+    def _tail(text: str, starts: List[int], index: int) -> Tuple[str, List[int]]:
+        offset = starts[index]
+        return text[offset:], [start - offset for start in starts[index:]]
 
 
-def preprocess_documents(file_contents: List[Tuple[bytes, str]]) -> Tuple[List[str], List[str]]:
+def iter_document_text(
+    file_content: bytes,
+    filename: str,
+    pdf_workers: Optional[int] = None,
+    pdf_extractor: Optional[PdfExtractor] = None,
+    progress: Optional[Callable[[int, int, str], None]] = None
+) -> Iterator[str]:
+    """
+    Extract text from an uploaded file piece by piece (pages of a PDF, blocks of a text file).
+    
+    Args:
+        file_content: File content as bytes
+        filename: Filename to determine type
+        pdf_workers: Worker processes for PDF page extraction (None uses every core)
+        pdf_extractor: PDF backend configuration
+        progress: Called with (done, total, unit) as pieces are consumed; unit is 'pages'
+            for PDFs and 'bytes' for text files
+        
+    Yields:
+        Text pieces whose concatenation is the text extract_text_from_file returns
+    """
+    if filename.lower().endswith('.pdf'):
+        page_progress = (lambda done, total: progress(done, total, 'pages')) if progress else None
+        try:
+            separator = ''
+            pages = iter_pdf_pages(bytes(file_content), pdf_workers, pdf_extractor, page_progress)
+            for page in log_pdf_pages(pages):
+                if page.text:
+                    yield separator + page.text
+                    separator = '\n\n'
+        except Exception as e:
+            print(f"Error extracting PDF: {e}")
+    elif filename.lower().endswith(('.txt', '.md')):
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+        view = memoryview(file_content)
+        for offset in range(0, len(view), TEXT_BLOCK_SIZE):
+            text = decoder.decode(view[offset:offset + TEXT_BLOCK_SIZE])
+            if text:
+                yield text
+            if progress is not None:
+                progress(min(offset + TEXT_BLOCK_SIZE, len(view)), len(view), 'bytes')
+        text = decoder.decode(b'', final=True)
+        if text:
+            yield text
+
+
+def iter_sentences(pieces: Iterable[str], reconstructor: Optional[TextReconstructor] = None) -> Iterator[str]:
+    """
+    Clean, reconstruct and sentence-split a document given as a stream of text pieces.
+    
+    Text is processed in segments cut after the last sentence end seen so far, so only the
+    unfinished sentence is carried from one piece to the next. Each later segment keeps its
+    leading whitespace and is reconstructed behind the punctuation that ended the previous
+    one, and a segment's last sentence is held until the next segment shows whether it
+    continues (e.g. when reconstruction joins punctuation onto it). The sentences therefore
+    match processing the whole text at once, except after a cut forced by MAX_SEGMENT_CHARS.
+    
+    Args:
+        pieces: Raw text pieces in document order
+        reconstructor: Text reconstructor (defaults to a new one)
+        
+    Yields:
+        Sentences of the cleaned, reconstructed text
+    """
+    reconstructor = reconstructor or TextReconstructor()
+    pending = ''
+    # Punctuation that ended the previous segment; '' after a forced cut, None at the start
+    context = None
+    held = None
+    
+    def segment_sentences(segment: str, final: bool) -> Iterator[str]:
+        nonlocal held
+        with trace_span('clean'):
+            if context:
+                text = clean_text(segment, strip=False)
+                text = text.rstrip() if final else text
+            else:
+                text = clean_text(segment)
+                if context is not None:
+                    # Forced cuts fall between words
+                    text = ' ' + text
+        with trace_span('reconstruct'):
+            text = reconstructor.reconstruct(context + text if context else text)
+        if context:
+            text = text[len(context):]
+        if not text:
+            return
+        
+        # Without whitespace after the previous sentence end, the first sentence continues it
+        sentences = split_sentences(text.lstrip())
+        if context and held is not None and not text[0].isspace():
+            held += sentences.pop(0)
+        for sentence in sentences:
+            if held is not None:
+                yield held
+            held = sentence
+    
+    for piece in pieces:
+        pending += piece
+        cut = 0
+        for match in _SENTENCE_END.finditer(pending):
+            cut = match.end()
+        boundary = pending[cut - 1] if cut else ''
+        if not cut and len(pending) > MAX_SEGMENT_CHARS:
+            # No sentence end in sight: cut at a word boundary to keep the carry bounded
+            cut = max(pending.rfind(' '), pending.rfind('\n')) + 1 or len(pending)
+        if cut:
+            yield from segment_sentences(pending[:cut], final=False)
+            pending = pending[cut:]
+            context = boundary
+    
+    if pending:
+        yield from segment_sentences(pending, final=True)
+    if held is not None:
+        yield held
+
+
+def iter_document_chunks(
+    file_contents: Iterable[Tuple[bytes, str]],
+    pdf_workers: Optional[int] = None,
+    pdf_extractor: Optional[PdfExtractor] = None,
+    chunk_size: int = 300,
+    overlap: int = 50,
+    chunker: Optional[TokenChunker] = None,
+    progress: Optional[Callable[[str, int, int, str], None]] = None
+) -> Iterator[Tuple[str, str]]:
+    """
+    Stream uploaded documents through extraction, cleaning, reconstruction and chunking.
+    
+    Chunks are yielded while later pages are still being extracted; memory stays bounded
+    by a few pages plus the chunk being built.
+    
+    Args:
+        file_contents: (content, filename) tuples
+        pdf_workers: Worker processes for PDF page extraction (None uses every core)
+        pdf_extractor: PDF backend configuration
+        chunk_size: Approximate words per chunk
+        overlap: Words to overlap between chunks
+        chunker: Token-aware chunker (chunk_size and overlap are then ignored)
+        progress: Called with (filename, done, total, unit) as extraction advances
+            (see iter_document_text)
+        
+    Yields:
+        (chunk, source filename) tuples in document order
+    """
+    reconstructor = TextReconstructor()
+    for content, filename in file_contents:
+        document_progress = partial(progress, filename) if progress else None
+        pieces = traced('parse', iter_document_text(content, filename, pdf_workers, pdf_extractor, document_progress))
+        sentences = iter_sentences(pieces, reconstructor)
+        chunks = chunker.chunks(sentences) if chunker else iter_chunks(sentences, chunk_size, overlap)
+        # Inside a trace: chunk (sentence splitting and chunking) > parse, clean, reconstruct
+        for chunk in traced('chunk', chunks):
+            yield chunk, filename
+
+
+def preprocess_documents(
+    file_contents: List[Tuple[bytes, str]],
+    pdf_workers: Optional[int] = None,
+    pdf_extractor: Optional[PdfExtractor] = None,
+    chunker: Optional[TokenChunker] = None
+) -> Tuple[List[str], List[str]]:
     """
     Preprocess multiple uploaded documents with full text reconstruction.
     
     Args:
         file_contents: List of (content, filename) tuples
+        pdf_workers: Worker processes for PDF page extraction (None uses every core)
+        pdf_extractor: PDF backend configuration
+        chunker: Token-aware chunker (None chunks by words)
         
     Returns:
         Tuple of (chunks, sources)
     """
-    reconstructor = TextReconstructor()
     all_chunks = []
     all_sources = []
     
-    for content, filename in file_contents:
-        # Extract text
-        text = extract_text_from_file(content, filename)
-        # Clean text
-        text = clean_text(text)
-        # Reconstruct academic text (fix spacing, equations, etc.)
-        text = reconstructor.reconstruct(text)
-        # Split into chunks
-        chunks = chunk_text(text)
-        all_chunks.extend(chunks)
-        all_sources.extend([filename] * len(chunks))
+    for chunk, filename in iter_document_chunks(file_contents, pdf_workers, pdf_extractor, chunker=chunker):
+        all_chunks.append(chunk)
+        all_sources.append(filename)
     
     return all_chunks, all_sources
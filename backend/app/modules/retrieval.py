@@ -1,79 +1,680 @@
 """
 Embedding and retrieval module using FAISS.
 """
+import time
+import threading
+from collections import OrderedDict
 import numpy as np
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Dict, Iterable
 from sentence_transformers import SentenceTransformer
 import faiss
+import torch
+from app.modules.embedding_cache import EmbeddingCache
+from app.modules.pipeline_tracker import trace_span
 
 
 class EmbeddingModel:
     """Wrapper for SentenceTransformers embedding model."""
     
-    def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
+    def __init__(
+        self,
+        model_name: str = 'all-MiniLM-L6-v2',
+        cache_dir: Optional[str] = None,
+        batch_size: int = 32,
+        num_threads: Optional[int] = None,
+        normalize: bool = False,
+        query_cache_size: int = 1024
+    ):
         """
         Initialize embedding model.
         
         Args:
             model_name: HuggingFace model identifier
+            cache_dir: Optional directory for the on-disk chunk embedding cache
+            batch_size: Texts per forward pass
+            num_threads: torch intra-op thread count (None keeps torch's default)
+            normalize: L2-normalize embeddings by default
+            query_cache_size: Max query embeddings kept in the LRU cache (0 disables)
         """
+        self.model_name = model_name
         self.model = SentenceTransformer(model_name)
         self.dimension = self.model.get_sentence_embedding_dimension()
+        self.cache = EmbeddingCache(cache_dir, model_name, self.dimension) if cache_dir else None
+        self.batch_size = max(1, batch_size)
+        self.normalize = normalize
+        self.last_encode_stats: Dict = {}
+        
+        # LRU of query embeddings shared by every retriever using this model
+        self.query_cache_size = query_cache_size
+        self.query_cache_hits = 0
+        self.query_cache_misses = 0
+        self._query_cache: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._query_cache_lock = threading.Lock()
+        self._lowercase_queries = bool(getattr(self.model.tokenizer, 'do_lower_case', False))
+        
+        if num_threads:
+            torch.set_num_threads(num_threads)
     
-    def encode(self, texts: List[str]) -> np.ndarray:
+    def encode(self, texts: List[str], normalize: Optional[bool] = None) -> np.ndarray:
         """
         Encode texts to embeddings.
         
+        Texts are sorted by token length and encoded in equally sized batches of similar
+        length, so each forward pass pads as little as possible. Results are written back
+        in input order.
+        
         Args:
             texts: List of text strings
+            normalize: L2-normalize in place (defaults to the model setting)
+            
+        Returns:
+            Numpy array of embeddings
+        """
+        if normalize is None:
+            normalize = self.normalize
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        
+        start = time.perf_counter()
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        
+        if len(texts) == 1:
+            order = np.zeros(1, dtype=np.int64)
+        else:
+            # Longest first, so an out-of-memory batch fails before any work is wasted
+            order = np.argsort(-self._token_lengths(texts), kind='stable')
+        
+        for offset in range(0, len(texts), self.batch_size):
+            bucket = order[offset:offset + self.batch_size]
+            embeddings[bucket] = self.model.encode(
+                [texts[i] for i in bucket],
+                batch_size=len(bucket),
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+        
+        if normalize:
+            faiss.normalize_L2(embeddings)
+        
+        elapsed = time.perf_counter() - start
+        self.last_encode_stats = {
+            'chunks': len(texts),
+            'seconds': elapsed,
+            'chunks_per_sec': len(texts) / elapsed if elapsed > 0 else 0.0,
+            'batch_size': self.batch_size,
+            'threads': torch.get_num_threads()
+        }
+        if len(texts) > 1:
+            print(f"[Embedding] Encoded {len(texts)} chunks in {elapsed:.2f}s "
+                  f"({self.last_encode_stats['chunks_per_sec']:.1f} chunks/sec)")
+        return embeddings
+    
+    def _token_lengths(self, texts: List[str]) -> np.ndarray:
+        """Token count per text (capped at the model's max sequence length)."""
+        tokenized = self.model.tokenizer(
+            texts,
+            add_special_tokens=False,
+            truncation=True,
+            max_length=self.model.max_seq_length,
+            return_attention_mask=False,
+            return_token_type_ids=False
+        )
+        return np.fromiter((len(ids) for ids in tokenized['input_ids']), dtype=np.int64, count=len(texts))
+    
+    def encode_query(self, query: str) -> np.ndarray:
+        """
+        Encode a single query, serving repeated queries from the LRU cache.
+        
+        Args:
+            query: Query string
+            
+        Returns:
+            Read-only numpy array of shape (1, dimension)
+        """
+        key = (self.model_name, self._normalize_query(query))
+        with self._query_cache_lock:
+            cached = self._query_cache.get(key)
+            if cached is not None:
+                self._query_cache.move_to_end(key)
+                self.query_cache_hits += 1
+                return cached
+            self.query_cache_misses += 1
+        
+        embedding = self.encode([query])
+        embedding.setflags(write=False)
+        
+        if self.query_cache_size > 0:
+            with self._query_cache_lock:
+                self._query_cache[key] = embedding
+                while len(self._query_cache) > self.query_cache_size:
+                    self._query_cache.popitem(last=False)
+        return embedding
+    
+    def encode_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Encode many queries at once: cached queries are served from the LRU and all misses
+        go through the model in a single batched call.
+        
+        Args:
+            queries: Query strings
+            
+        Returns:
+            Numpy array of shape (len(queries), dimension)
+        """
+        embeddings = np.empty((len(queries), self.dimension), dtype=np.float32)
+        keys = [(self.model_name, self._normalize_query(q)) for q in queries]
+        missing: Dict[Tuple[str, str], List[int]] = {}
+        
+        with self._query_cache_lock:
+            for pos, key in enumerate(keys):
+                cached = self._query_cache.get(key)
+                if cached is not None:
+                    self._query_cache.move_to_end(key)
+                    embeddings[pos] = cached[0]
+                else:
+                    missing.setdefault(key, []).append(pos)
+            self.query_cache_hits += len(queries) - sum(len(p) for p in missing.values())
+            self.query_cache_misses += sum(len(p) for p in missing.values())
+        
+        if missing:
+            # One forward pass per distinct uncached query
+            first_positions = [positions[0] for positions in missing.values()]
+            new_embeddings = self.encode([queries[pos] for pos in first_positions])
+            for (key, positions), embedding in zip(missing.items(), new_embeddings):
+                embeddings[positions] = embedding
+            
+            if self.query_cache_size > 0:
+                with self._query_cache_lock:
+                    for key, embedding in zip(missing.keys(), new_embeddings):
+                        cached = embedding.reshape(1, -1).copy()
+                        cached.setflags(write=False)
+                        self._query_cache[key] = cached
+                    while len(self._query_cache) > self.query_cache_size:
+                        self._query_cache.popitem(last=False)
+        return embeddings
+    
+    def query_cache_info(self) -> Dict:
+        """Query-embedding cache counters."""
+        with self._query_cache_lock:
+            total = self.query_cache_hits + self.query_cache_misses
+            return {
+                'model': self.model_name,
+                'size': len(self._query_cache),
+                'max_size': self.query_cache_size,
+                'hits': self.query_cache_hits,
+                'misses': self.query_cache_misses,
+                'hit_rate': self.query_cache_hits / total if total else 0.0
+            }
+    
+    def _normalize_query(self, query: str) -> str:
+        """Whitespace-normalize (and lowercase, for uncased models) a query cache key."""
+        query = " ".join(query.split())
+        return query.lower() if self._lowercase_queries else query
+    
+    def encode_documents(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode document chunks, reusing cached embeddings where available.
+        
+        Only cache misses go through the transformer; their embeddings are added to the cache.
+        
+        Args:
+            texts: List of chunk texts
             
         Returns:
             Numpy array of embeddings
         """
-        embeddings = self.model.encode(texts, convert_to_numpy=True)
-        return embeddings.astype(np.float32)
+        if self.cache is None or not texts:
+            return self.encode(texts)
+        
+        # The cache holds raw model output; normalization is applied after merging
+        embeddings, missing = self.cache.lookup(texts)
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            new_embeddings = self.encode(missing_texts, normalize=False)
+            embeddings[missing] = new_embeddings
+            self.cache.put(missing_texts, new_embeddings)
+        if self.normalize:
+            faiss.normalize_L2(embeddings)
+        print(f"[Embedding] {len(texts) - len(missing)}/{len(texts)} chunk embeddings served from cache")
+        return embeddings
+
+
+# Corpus-size thresholds used when the index type is chosen automatically
+FLAT_MAX_VECTORS = 20000
+IVF_FLAT_MAX_VECTORS = 200000
+# Training points per IVF list (FAISS warns below 39)
+TRAIN_POINTS_PER_LIST = 64
+# Rebuild an index once this fraction of its vectors are tombstones
+TOMBSTONE_COMPACT_RATIO = 0.2
+
+
+def choose_index_factory(num_vectors: int, dimension: int) -> str:
+    """
+    Pick a FAISS index factory string for a corpus size.
+    
+    Exact search is kept for small corpora; IVF-Flat is used for medium ones and IVF-PQ
+    bounds memory for very large ones.
+    
+    Args:
+        num_vectors: Number of vectors to index
+        dimension: Vector dimension
+        
+    Returns:
+        FAISS index factory string
+    """
+    if num_vectors <= FLAT_MAX_VECTORS:
+        return "Flat"
+    nlist = int(4 * np.sqrt(num_vectors))
+    if num_vectors <= IVF_FLAT_MAX_VECTORS:
+        return f"IVF{nlist},Flat"
+    # 8-bit sub-quantizers over 8-dimensional sub-vectors: 4 bytes/dim becomes 1 byte per 8 dims
+    pq_m = max(d for d in range(1, dimension // 8 + 1) if dimension % d == 0)
+    return f"IVF{nlist},PQ{pq_m}"
+
+
+def create_faiss_index(
+    embeddings: np.ndarray,
+    factory: str = "auto",
+    metric: str = "cosine",
+    ids: Optional[Iterable[int]] = None
+) -> faiss.Index:
+    """
+    Build and populate a FAISS index, training it on a sample when required.
+    
+    Args:
+        embeddings: float32 array of shape (n, d); must already be L2-normalized for "cosine"
+        factory: FAISS index factory string, or "auto" to choose by corpus size
+        metric: "cosine" (inner product over normalized vectors) or "l2"
+        ids: Optional stable int64 ids; IVF indexes store them natively, other types are
+            wrapped in an IndexIDMap2
+        
+    Returns:
+        Populated FAISS index
+    """
+    num_vectors, dimension = embeddings.shape
+    if factory == "auto":
+        factory = choose_index_factory(num_vectors, dimension)
+    
+    faiss_metric = faiss.METRIC_INNER_PRODUCT if metric == "cosine" else faiss.METRIC_L2
+    index = faiss.index_factory(dimension, factory, faiss_metric)
+    if not index.is_trained:
+        ivf = faiss.try_extract_index_ivf(index)
+        nlist = ivf.nlist if ivf is not None else 1
+        # PQ codebooks (256 centroids each) also need roughly 10k training points
+        sample_size = min(num_vectors, max(nlist * TRAIN_POINTS_PER_LIST, 10000))
+        sample = embeddings[np.random.default_rng(0).choice(num_vectors, sample_size, replace=False)]
+        try:
+            index.train(sample)
+        except RuntimeError as e:
+            # Too few vectors for the requested lists/codebooks: exact search is fine here
+            print(f"[Retrieval] Cannot train {factory} on {num_vectors} vectors ({e}); using Flat")
+            index = faiss.IndexFlat(dimension, faiss_metric)
+    
+    if ids is None:
+        index.add(embeddings)
+        return index
+    
+    if faiss.try_extract_index_ivf(index) is None:
+        index = faiss.IndexIDMap2(index)
+    index.add_with_ids(embeddings, np.asarray(ids, dtype=np.int64))
+    return index
+
+
+def distances_to_similarities(index: faiss.Index, distances: np.ndarray) -> np.ndarray:
+    """
+    Convert raw FAISS scores to similarities in [0, 1].
+    
+    Inner-product indexes over normalized vectors already return cosine similarity (clipped
+    at 0); legacy L2 indexes keep the 1 / (1 + d) mapping.
+    """
+    if index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        return np.clip(distances, 0.0, 1.0)
+    return 1.0 / (1.0 + distances)
+
+
+def index_kind(index: faiss.Index) -> str:
+    """Classify an index as 'ivf', 'hnsw' or 'flat' for query-time parameters."""
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        index = faiss.downcast_index(index.index)
+    else:
+        index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIVF):
+        return 'ivf'
+    if isinstance(index, faiss.IndexHNSW):
+        return 'hnsw'
+    return 'flat'
 
 
 class FAISSRetriever:
-    """Vector retrieval using FAISS."""
+    """
+    Vector retrieval using FAISS.
+    
+    Every chunk gets a stable int64 id stored in the index, so chunks can be removed
+    without renumbering the vectors of the remaining ones. ``chunks``/``sources`` stay
+    positional lists; ``chunk_ids`` maps positions to index ids. Index types without
+    ``remove_ids`` support (HNSW) tombstone removed ids until they are compacted.
+    """
     
-    def __init__(self, embedding_model: EmbeddingModel):
+    def __init__(
+        self,
+        embedding_model: EmbeddingModel,
+        index_factory: str = "auto",
+        nprobe: int = 16,
+        ef_search: int = 64,
+        metric: str = "cosine"
+    ):
         """
         Initialize retriever.
         
         Args:
             embedding_model: EmbeddingModel instance
+            index_factory: FAISS factory string (e.g. "Flat", "IVF1024,Flat", "HNSW32",
+                "IVF4096,PQ48") or "auto" to choose by corpus size
+            nprobe: Default IVF lists probed per query
+            ef_search: Default HNSW search breadth
+            metric: "cosine" (inner product over L2-normalized vectors) or "l2"
         """
+        if metric not in ("cosine", "l2"):
+            raise ValueError(f"Unsupported metric: {metric}")
         self.embedding_model = embedding_model
+        self.metric = metric
+        self.index_factory = index_factory
+        self.nprobe = nprobe
+        self.ef_search = ef_search
         self.index = None
         self.chunks = []
         self.sources = []
+        self.chunk_ids = []
+        self.tombstones = set()
+    
+    @property
+    def chunk_ids(self) -> List[int]:
+        """Stable index id of each chunk, by position."""
+        return self._chunk_ids
     
-    def build_index(self, texts: List[str], sources: List[str]):
+    @chunk_ids.setter
+    def chunk_ids(self, ids: Iterable[int]):
+        self._chunk_ids = [int(i) for i in ids]
+        self._positions = {chunk_id: pos for pos, chunk_id in enumerate(self._chunk_ids)}
+    
+    @property
+    def tombstones(self) -> set:
+        """Ids removed from the corpus but still stored in the index."""
+        return self._tombstones
+    
+    @tombstones.setter
+    def tombstones(self, ids: Iterable[int]):
+        self._tombstones = {int(i) for i in ids}
+        self._selector = None
+        if self._tombstones:
+            self._selector = faiss.IDSelectorNot(
+                faiss.IDSelectorBatch(np.fromiter(self._tombstones, dtype=np.int64))
+            )
+    
+    def _next_id(self) -> int:
+        """Smallest id above every id ever stored in the index."""
+        return max(max(self._chunk_ids, default=-1), max(self._tombstones, default=-1)) + 1
+    
+    def build_index(self, texts: List[str], sources: List[str], embeddings: Optional[np.ndarray] = None):
         """
         Build FAISS index from texts.
         
         Args:
             texts: List of text chunks
             sources: List of source filenames
+            embeddings: Embeddings of the texts when already encoded (e.g. by the ingest pipeline)
         """
         self.chunks = texts
         self.sources = sources
+        self.chunk_ids = range(len(texts))
+        self.tombstones = ()
+        
+        # Encode texts (cached chunks skip the transformer)
+        if embeddings is None:
+            embeddings = self.embedding_model.encode_documents(texts)
+        embeddings = self._prepare(embeddings)
+        
+        # Create FAISS index (exact for small corpora, ANN for large ones)
+        self.index = create_faiss_index(embeddings, self.index_factory, self.metric, ids=self.chunk_ids)
+    
+    def add_documents(self, texts: List[str], sources: List[str], embeddings: Optional[np.ndarray] = None):
+        """
+        Append chunks to an existing index without re-encoding the current corpus.
+        
+        Args:
+            texts: New text chunks
+            sources: Source filenames for the new chunks
+            embeddings: Embeddings of the new texts when already encoded
+        """
+        if self.index is None:
+            self.build_index(texts, sources, embeddings)
+            return
+        
+        if embeddings is None:
+            embeddings = self.embedding_model.encode_documents(texts)
+        embeddings = self._prepare(embeddings)
+        self._ensure_writable()
+        self._ensure_id_map()
+        first_id = self._next_id()
+        new_ids = np.arange(first_id, first_id + len(texts), dtype=np.int64)
+        self.index.add_with_ids(embeddings, new_ids)
+        
+        # New lists rather than in-place extends: sessions may share the old list objects
+        self.chunks = self.chunks + list(texts)
+        self.sources = self.sources + list(sources)
+        self.chunk_ids = self._chunk_ids + new_ids.tolist()
+    
+    def remove_documents(self, source: str) -> Dict[int, int]:
+        """
+        Remove every chunk of a source document from the index.
+        
+        Vectors are deleted with ``remove_ids`` where the index type supports it and
+        tombstoned otherwise (see ``compact``).
+        
+        Args:
+            source: Source filename
+            
+        Returns:
+            Mapping of old to new chunk positions for the chunks that remain
+        """
+        removed = [pos for pos, src in enumerate(self.sources) if src == source]
+        if not removed or self.index is None:
+            return {pos: pos for pos in range(len(self.chunks))}
+        
+        self._ensure_writable()
+        self._ensure_id_map()
+        removed_set = set(removed)
+        removed_ids = np.array([self._chunk_ids[pos] for pos in removed], dtype=np.int64)
+        
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is not None:
+            # The default array direct map only supports sequential ids
+            ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+        try:
+            self.index.remove_ids(removed_ids)
+        except RuntimeError:
+            self.tombstones = self._tombstones | set(removed_ids.tolist())
+        
+        kept = [pos for pos in range(len(self.chunks)) if pos not in removed_set]
+        self.chunks = [self.chunks[pos] for pos in kept]
+        self.sources = [self.sources[pos] for pos in kept]
+        self.chunk_ids = [self._chunk_ids[pos] for pos in kept]
+        print(f"[Retrieval] Removed {len(removed)} chunks of {source} "
+              f"({len(self._tombstones)} tombstones pending)")
+        return {old: new for new, old in enumerate(kept)}
+    
+    def needs_compaction(self) -> bool:
+        """True when tombstones make up a large share of the index."""
+        if self.index is None or not self._tombstones:
+            return False
+        return len(self._tombstones) >= TOMBSTONE_COMPACT_RATIO * max(self.index.ntotal, 1)
+    
+    def compact(self):
+        """Rebuild the index from the live chunks only, dropping tombstoned vectors."""
+        if self.index is None or not self._tombstones:
+            return
+        embeddings = self._live_embeddings()
+        self.index = create_faiss_index(embeddings, self.index_factory, self.metric, ids=self._chunk_ids)
+        self.tombstones = ()
+        print(f"[Retrieval] Compacted index to {self.index.ntotal} vectors")
+    
+    def _ensure_writable(self):
+        """
+        Copy memory-mapped inverted lists into memory before the index is modified.
+        
+        An IVF index loaded with IO_FLAG_MMAP keeps its lists on disk, read-only: adding or
+        removing vectors fails on it, so the lists are copied the first time that is needed.
+        """
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is None:
+            return
+        invlists = faiss.downcast_InvertedLists(ivf.invlists)
+        if not isinstance(invlists, faiss.OnDiskInvertedLists):
+            return
+        in_memory = faiss.ArrayInvertedLists(invlists.nlist, invlists.code_size)
+        for list_no in range(invlists.nlist):
+            size = invlists.list_size(list_no)
+            if size:
+                in_memory.add_entries(
+                    list_no, size, invlists.get_ids(list_no), invlists.get_codes(list_no)
+                )
+        ivf.replace_invlists(in_memory, True)
+        in_memory.this.disown()
+        print(f"[Retrieval] Copied {ivf.ntotal} memory-mapped vectors into memory for update")
+    
+    def _ensure_id_map(self):
+        """
+        Give an index without stable ids (built before id mapping existed) an id per chunk.
+        
+        IVF indexes already store their sequential ids, which equal chunk positions; other
+        index types are rebuilt from their stored vectors inside an IndexIDMap2.
+        """
+        if isinstance(self.index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+            return
+        if faiss.try_extract_index_ivf(self.index) is not None:
+            return
+        embeddings = self.index.reconstruct_n(0, self.index.ntotal)
+        self.index = create_faiss_index(
+            self._prepare(embeddings), self.index_factory, self.metric, ids=self._chunk_ids
+        )
+    
+    def _live_embeddings(self) -> np.ndarray:
+        """
+        Vectors of the live chunks, in position order.
+        
+        Reconstructed from the index when its storage is exact; otherwise (PQ codes) they
+        are re-derived from the chunk texts, which hits the embedding cache when enabled.
+        """
+        try:
+            ivf = faiss.try_extract_index_ivf(self.index)
+            if ivf is not None:
+                if isinstance(faiss.downcast_index(ivf), faiss.IndexIVFPQ):
+                    raise RuntimeError("PQ codes are lossy")
+                ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+            embeddings = self.index.reconstruct_batch(np.asarray(self._chunk_ids, dtype=np.int64))
+        except RuntimeError:
+            embeddings = self.embedding_model.encode_documents(self.chunks)
+        return self._prepare(embeddings)
+    
+    def _prepare(self, embeddings: np.ndarray) -> np.ndarray:
+        """L2-normalize embeddings for the cosine metric (copying read-only arrays)."""
+        if self.metric != "cosine":
+            return embeddings
+        if not embeddings.flags.writeable:
+            embeddings = embeddings.copy()
+        faiss.normalize_L2(embeddings)
+        return embeddings
+    
+    def needs_metric_migration(self) -> bool:
+        """True when a loaded index was built with a different metric than configured."""
+        if self.index is None:
+            return False
+        expected = faiss.METRIC_INNER_PRODUCT if self.metric == "cosine" else faiss.METRIC_L2
+        return self.index.metric_type != expected
+    
+    def migrate_metric(self):
+        """
+        Rebuild an index created with another metric (e.g. a legacy L2 index) for the
+        configured metric.
         
-        # Encode texts
-        embeddings = self.embedding_model.encode(texts)
+        Vectors are reconstructed from the index when its storage is exact; otherwise
+        (PQ codes) they are re-derived from the chunk texts, which hits the embedding
+        cache when it is enabled.
+        """
+        if not self.needs_metric_migration():
+            return
         
-        # Create FAISS index
-        self.index = faiss.IndexFlatL2(embeddings.shape[1])
-        self.index.add(embeddings)
+        embeddings = self._live_embeddings()
+        self.index = create_faiss_index(embeddings, self.index_factory, self.metric, ids=self._chunk_ids)
+        self.tombstones = ()
+        print(f"[Retrieval] Migrated index of {self.index.ntotal} vectors to {self.metric} metric")
     
-    def retrieve(self, query: str, k: int = 5) -> Tuple[List[str], List[str], List[float]]:
+    def _search_params(self, nprobe: Optional[int], ef_search: Optional[int]):
+        """Per-query search parameters for the current index type (excluding tombstones)."""
+        kind = index_kind(self.index)
+        selector = {'sel': self._selector} if self._selector is not None else {}
+        if kind == 'ivf':
+            return faiss.SearchParametersIVF(nprobe=nprobe or self.nprobe, **selector)
+        if kind == 'hnsw':
+            return faiss.SearchParametersHNSW(efSearch=ef_search or self.ef_search, **selector)
+        if selector:
+            return faiss.SearchParameters(**selector)
+        return None
+    
+    def _search(
+        self,
+        query_embeddings: np.ndarray,
+        k: int,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        min_score: float = 0.0
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Search the index with one or more query rows and convert scores to similarities.
+        
+        Drops the -1 padding ANN indexes return for short result lists and any hit scoring
+        below min_score, and maps index ids back to chunk positions.
+        
+        Returns:
+            One (chunk positions, similarities) tuple per query row
+        """
+        query_embeddings = self._prepare(query_embeddings)
+        k = min(k, len(self.chunks))
+        if k == 0:
+            empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+            return [empty] * len(query_embeddings)
+        params = self._search_params(nprobe, ef_search)
+        if params is not None:
+            distances, ids = self.index.search(query_embeddings, k, params=params)
+        else:
+            distances, ids = self.index.search(query_embeddings, k)
+        
+        results = []
+        for row_distances, row_ids in zip(distances, ids):
+            similarities = distances_to_similarities(self.index, row_distances)
+            positions = np.fromiter((self._positions.get(i, -1) for i in row_ids.tolist()),
+                                    dtype=np.int64, count=len(row_ids))
+            keep = (positions >= 0) & (similarities >= min_score)
+            results.append((positions[keep], similarities[keep]))
+        return results
+    
+    def retrieve(
+        self,
+        query: str,
+        k: int = 5,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        min_score: float = 0.0
+    ) -> Tuple[List[str], List[str], List[float]]:
         """
         Retrieve top-k relevant chunks.
         
         Args:
             query: Query string
             k: Number of results
+            nprobe: IVF lists to probe (overrides the retriever default)
+            ef_search: HNSW search breadth (overrides the retriever default)
+            min_score: Drop results with similarity below this threshold
             
         Returns:
             Tuple of (chunks, sources, similarities)
@@ -81,29 +682,37 @@ class FAISSRetriever:
         if self.index is None:
             return [], [], []
         
-        # Encode query
-        query_embedding = self.embedding_model.encode([query])
+        # Encode query (repeated queries hit the model's LRU cache)
+        with trace_span('encode'):
+            query_embedding = self.embedding_model.encode_query(query)
         
         # Search
-        distances, indices = self.index.search(query_embedding, min(k, len(self.chunks)))
+        with trace_span('search', k=k, index_size=self.index.ntotal):
+            indices, similarities = self._search(query_embedding, k, nprobe, ef_search, min_score)[0]
         
         # Get results
-        retrieved_chunks = [self.chunks[i] for i in indices[0]]
-        retrieved_sources = [self.sources[i] for i in indices[0]]
-        retrieved_distances = distances[0].tolist()
+        retrieved_chunks = [self.chunks[i] for i in indices]
+        retrieved_sources = [self.sources[i] for i in indices]
         
-        # Convert distances to similarities
-        similarities = [1.0 / (1.0 + d) for d in retrieved_distances]
-        
-        return retrieved_chunks, retrieved_sources, similarities
+        return retrieved_chunks, retrieved_sources, similarities.tolist()
     
-    def get_retrieved_indices(self, query: str, k: int = 5) -> Tuple[List[int], List[float]]:
+    def get_retrieved_indices(
+        self,
+        query: str,
+        k: int = 5,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        min_score: float = 0.0
+    ) -> Tuple[List[int], List[float]]:
         """
         Get indices of top-k retrieved chunks and their similarities.
         
         Args:
             query: Query string
             k: Number of results
+            nprobe: IVF lists to probe (overrides the retriever default)
+            ef_search: HNSW search breadth (overrides the retriever default)
+            min_score: Drop results with similarity below this threshold
             
         Returns:
             Tuple of (chunk_indices, similarities)
@@ -111,18 +720,52 @@ class FAISSRetriever:
         if self.index is None:
             return [], []
         
-        # Encode query
-        query_embedding = self.embedding_model.encode([query])
+        # Encode query (repeated queries hit the model's LRU cache)
+        with trace_span('encode'):
+            query_embedding = self.embedding_model.encode_query(query)
         
         # Search
-        distances, indices = self.index.search(query_embedding, min(k, len(self.chunks)))
+        with trace_span('search', k=k, index_size=self.index.ntotal):
+            indices, similarities = self._search(query_embedding, k, nprobe, ef_search, min_score)[0]
         
-        # Convert distances to similarities
-        retrieved_indices = indices[0].tolist()
-        retrieved_distances = distances[0].tolist()
-        similarities = [1.0 / (1.0 + d) for d in retrieved_distances]
+        return indices.tolist(), similarities.tolist()
+    
+    def embed_query(self, query: str) -> np.ndarray:
+        """L2-normalized query embedding (served from the model's LRU cache)."""
+        embedding = np.array(self.embedding_model.encode_query(query), dtype=np.float32)
+        faiss.normalize_L2(embedding)
+        return embedding[0]
+    
+    def search_batch(
+        self,
+        queries: List[str],
+        k: int = 5,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        min_score: float = 0.0
+    ) -> List[Tuple[List[int], List[float]]]:
+        """
+        Retrieve top-k chunk indices for many queries with one batched encode and one
+        multi-row index search.
+        
+        Args:
+            queries: Query strings
+            k: Number of results per query
+            nprobe: IVF lists to probe (overrides the retriever default)
+            ef_search: HNSW search breadth (overrides the retriever default)
+            min_score: Drop results with similarity below this threshold
+            
+        Returns:
+            One (chunk_indices, similarities) tuple per query, in input order
+        """
+        if self.index is None or not queries:
+            return [([], []) for _ in queries]
         
-        return retrieved_indices, similarities
+        query_embeddings = self.embedding_model.encode_queries(queries)
+        return [
+            (indices.tolist(), similarities.tolist())
+            for indices, similarities in self._search(query_embeddings, k, nprobe, ef_search, min_score)
+        ]
     
     def is_indexed(self) -> bool:
         """Check if index is built."""
@@ -0,0 +1,226 @@
+"""
+Memory-bounded session manager.
+Keeps live sessions in LRU order, evicting idle or least-recently-used sessions when the
+configured memory budget or idle TTL is exceeded.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# Rough per-object costs used for the memory estimate (CPython dict/str overheads)
+GRAPH_NODE_BYTES = 500
+GRAPH_EDGE_BYTES = 300
+ENTITY_BYTES = 300
+
+
+def estimate_session_bytes(session) -> int:
+    """
+    Approximate the resident memory held by a session.
+
+    Counts FAISS vector storage, chunk strings, entity records and knowledge-graph
+    nodes/edges. This is an estimate for budgeting, not an exact measurement.
+
+    Args:
+        session: RAGSession
+
+    Returns:
+        Estimated size in bytes
+    """
+    total = 0
+
+    index = getattr(session.retriever, 'index', None)
+    if index is not None:
+        total += index.ntotal * index.d * 4
+
+    total += sum(sys.getsizeof(chunk) for chunk in session.chunks)
+    total += sum(sys.getsizeof(chunk) for chunk in getattr(session, 'display_chunks', ()) if chunk)
+
+    mentions = sum(len(ents) for ents in session.entity_chunk_map.values())
+    total += (len(session.entities) + mentions) * ENTITY_BYTES
+
+    graph = session.graph_builder.graph
+    total += graph.number_of_nodes() * GRAPH_NODE_BYTES
+    total += graph.number_of_edges() * GRAPH_EDGE_BYTES
+
+    return total
+
+
+class SessionManager:
+    """Dict-like store of live sessions with LRU eviction, idle TTL and optional disk spill."""
+
+    def __init__(
+        self,
+        memory_budget_bytes: int = 0,
+        idle_ttl_seconds: float = 0,
+        store=None,
+        sweep_interval_seconds: float = 30.0
+    ):
+        """
+        Initialize session manager.
+
+        Args:
+            memory_budget_bytes: Global budget across live sessions (0 disables)
+            idle_ttl_seconds: Evict sessions not accessed for this long (0 disables)
+            store: Optional SessionStore; evicted sessions are spilled to it if not yet persisted
+            sweep_interval_seconds: Minimum time between idle-TTL sweeps
+        """
+        self.memory_budget_bytes = memory_budget_bytes
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.store = store
+        self.sweep_interval_seconds = sweep_interval_seconds
+
+        self._sessions: "OrderedDict[str, object]" = OrderedDict()
+        self._last_access: Dict[str, float] = {}
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._last_sweep = time.monotonic()
+        self._evictions = 0
+        self._lock = threading.RLock()
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._sessions
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def __getitem__(self, session_id: str):
+        session = self.get(session_id)
+        if session is None:
+            raise KeyError(session_id)
+        return session
+
+    def __setitem__(self, session_id: str, session) -> None:
+        with self._lock:
+            if session_id in self._sessions:
+                self._remove(session_id)
+            self._sessions[session_id] = session
+            self._last_access[session_id] = time.monotonic()
+            self._sizes[session_id] = estimate_session_bytes(session)
+            self._total_bytes += self._sizes[session_id]
+        self._maybe_sweep()
+        self._enforce_budget(keep=session_id)
+
+    def __delitem__(self, session_id: str) -> None:
+        if self.pop(session_id, None) is None:
+            raise KeyError(session_id)
+
+    def get(self, session_id: str, default=None):
+        """Return a live session and mark it as most recently used."""
+        self._maybe_sweep()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return default
+            self._sessions.move_to_end(session_id)
+            self._last_access[session_id] = time.monotonic()
+            return session
+
+    def pop(self, session_id: str, default=None):
+        """Remove a session from memory without spilling it."""
+        with self._lock:
+            if session_id not in self._sessions:
+                return default
+            return self._remove(session_id)
+
+    def update_size(self, session_id: str) -> None:
+        """Re-estimate a session's memory after it changed (e.g. processing finished)."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            new_size = estimate_session_bytes(session)
+            self._total_bytes += new_size - self._sizes.get(session_id, 0)
+            self._sizes[session_id] = new_size
+        self._enforce_budget(keep=session_id)
+
+    def evict_idle(self) -> List[str]:
+        """Evict every session idle for longer than the TTL."""
+        if not self.idle_ttl_seconds:
+            return []
+        with self._lock:
+            now = time.monotonic()
+            self._last_sweep = now
+            expired = [
+                sid for sid, last in self._last_access.items()
+                if now - last > self.idle_ttl_seconds
+            ]
+        return [sid for sid in expired if self._evict(sid, reason="idle")]
+
+    def stats(self) -> Dict:
+        """Memory and eviction statistics."""
+        with self._lock:
+            return {
+                "live_sessions": len(self._sessions),
+                "estimated_bytes": self._total_bytes,
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "idle_ttl_seconds": self.idle_ttl_seconds,
+                "evictions": self._evictions,
+                "sessions": [
+                    {
+                        "session_id": sid,
+                        "estimated_bytes": self._sizes.get(sid, 0),
+                        "idle_seconds": round(time.monotonic() - self._last_access[sid], 1)
+                    }
+                    for sid in self._sessions
+                ]
+            }
+
+    def _remove(self, session_id: str):
+        session = self._sessions.pop(session_id)
+        self._last_access.pop(session_id, None)
+        self._total_bytes -= self._sizes.pop(session_id, 0)
+        return session
+
+    def _maybe_sweep(self) -> None:
+        if self.idle_ttl_seconds and time.monotonic() - self._last_sweep >= self.sweep_interval_seconds:
+            self.evict_idle()
+
+    def _enforce_budget(self, keep: Optional[str] = None) -> None:
+        if not self.memory_budget_bytes:
+            return
+        # Oldest first; the session being added/updated is never evicted on its own behalf
+        with self._lock:
+            candidates = [sid for sid in self._sessions if sid != keep]
+        for sid in candidates:
+            with self._lock:
+                if self._total_bytes <= self.memory_budget_bytes:
+                    break
+            self._evict(sid, reason="memory budget")
+
+    @staticmethod
+    def _is_busy(session) -> bool:
+        return getattr(session, 'is_processing', False) or getattr(session, 'is_appending', False)
+
+    def _evict(self, session_id: str, reason: str) -> bool:
+        """
+        Spill a session to the store if needed and drop it from memory.
+
+        The spill runs outside the lock so other requests are not blocked on disk writes.
+        A session that cannot be spilled stays in memory.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is None or self._is_busy(session):
+            return False
+
+        if self.store is not None and not getattr(session, 'processing_error', None):
+            try:
+                if not self.store.exists(session_id):
+                    self.store.save(session)
+            except Exception as e:
+                print(f"[SESSIONS] Could not spill session {session_id} to disk, keeping it in memory: {e}")
+                return False
+
+        with self._lock:
+            # The session may have been replaced, removed or picked up for processing meanwhile
+            if self._sessions.get(session_id) is not session or self._is_busy(session):
+                return False
+            size = self._sizes.get(session_id, 0)
+            self._remove(session_id)
+            self._evictions += 1
+        print(f"[SESSIONS] Evicted session {session_id} ({reason}, ~{size / 1024 / 1024:.1f} MB)")
+        return True
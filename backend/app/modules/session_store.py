@@ -0,0 +1,214 @@
+"""
+On-disk session persistence.
+Stores each session's chunks, FAISS index, entities and knowledge graph in its own directory
+so that sessions survive restarts without re-embedding.
+"""
+import json
+import re
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import faiss
+import networkx as nx
+
+
+class SessionStore:
+    """Persist RAG sessions to per-session directories and reload them on demand."""
+
+    INDEX_FILE = "index.faiss"
+    DATA_FILE = "session.json"
+    GRAPH_FILE = "graph.json"
+
+    _SESSION_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]+$')
+
+    def __init__(self, root_dir: str):
+        """
+        Initialize session store.
+
+        Args:
+            root_dir: Directory under which one sub-directory per session is created
+        """
+        self.root_dir = Path(root_dir)
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _session_dir(self, session_id: str) -> Path:
+        """Resolve the directory for a session, rejecting unsafe identifiers."""
+        if not session_id or not self._SESSION_ID_PATTERN.match(session_id):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        return self.root_dir / session_id
+
+    def exists(self, session_id: str) -> bool:
+        """Check whether a session has been persisted."""
+        try:
+            session_dir = self._session_dir(session_id)
+        except ValueError:
+            return False
+        return (session_dir / self.DATA_FILE).exists()
+
+    def save(self, session) -> None:
+        """
+        Persist a session atomically.
+
+        Files are written to a temporary directory first and swapped into place, so a crash
+        mid-write never leaves a half-written session behind.
+
+        Args:
+            session: RAGSession with a built retriever index
+        """
+        session_dir = self._session_dir(session.session_id)
+        tmp_dir = self.root_dir / f".{session.session_id}.{uuid.uuid4().hex}.tmp"
+        tmp_dir.mkdir(parents=True)
+
+        try:
+            if session.retriever.index is not None:
+                faiss.write_index(session.retriever.index, str(tmp_dir / self.INDEX_FILE))
+
+            data = {
+                "session_id": session.session_id,
+                "chunks": session.chunks,
+                "display_chunks": getattr(session, 'display_chunks', []),
+                "reconstruction_version": getattr(session, 'reconstruction_version', None),
+                "sources": session.sources,
+                "entities": session.entities,
+                # JSON object keys are strings; chunk indices are restored to ints on load
+                "entity_chunk_map": {str(k): v for k, v in session.entity_chunk_map.items()},
+                "chunk_ids": list(getattr(session.retriever, 'chunk_ids', [])),
+                "tombstones": sorted(getattr(session.retriever, 'tombstones', ())),
+                "documents_metadata": session.documents_metadata,
+                "total_entities": session.total_entities,
+                "total_graph_edges": session.total_graph_edges,
+            }
+            with open(tmp_dir / self.DATA_FILE, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+
+            with open(tmp_dir / self.GRAPH_FILE, "w", encoding="utf-8") as f:
+                json.dump(self._graph_to_dict(session.graph_builder.graph), f)
+
+            with self._lock:
+                old_dir = None
+                if session_dir.exists():
+                    old_dir = self.root_dir / f".{session.session_id}.{uuid.uuid4().hex}.old"
+                    session_dir.rename(old_dir)
+                tmp_dir.rename(session_dir)
+            if old_dir is not None:
+                shutil.rmtree(old_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    def load(self, session) -> bool:
+        """
+        Populate a fresh session object from disk.
+
+        The FAISS index is opened with IO_FLAG_MMAP so large indexes are paged in lazily
+        where the index type supports it. Mapped IVF lists are read-only; the retriever
+        copies them into memory before it first adds or removes vectors.
+
+        Args:
+            session: Newly constructed RAGSession whose session_id identifies what to load
+
+        Returns:
+            True if the session was found and loaded, False otherwise
+        """
+        if not self.exists(session.session_id):
+            return False
+
+        session_dir = self._session_dir(session.session_id)
+        with open(session_dir / self.DATA_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        session.chunks = data.get("chunks", [])
+        # Sessions saved before display chunks existed are reconstructed again after loading
+        session.display_chunks = data.get("display_chunks", [])
+        session.reconstruction_version = data.get("reconstruction_version")
+        session.sources = data.get("sources", [])
+        session.entities = data.get("entities", [])
+        session.entity_chunk_map = {
+            int(k): v for k, v in data.get("entity_chunk_map", {}).items()
+        }
+        session.documents_metadata = data.get("documents_metadata", {})
+        session.total_entities = data.get("total_entities", len(session.entities))
+
+        index_path = session_dir / self.INDEX_FILE
+        if index_path.exists():
+            session.retriever.index = faiss.read_index(str(index_path), faiss.IO_FLAG_MMAP)
+        session.retriever.chunks = session.chunks
+        session.retriever.sources = session.sources
+        # Sessions saved before stable chunk ids used positions as ids
+        session.retriever.chunk_ids = data.get("chunk_ids") or range(len(session.chunks))
+        session.retriever.tombstones = data.get("tombstones", [])
+
+        graph_path = session_dir / self.GRAPH_FILE
+        if graph_path.exists():
+            with open(graph_path, "r", encoding="utf-8") as f:
+                session.graph_builder.graph = self._graph_from_dict(json.load(f))
+        session.total_graph_edges = data.get(
+            "total_graph_edges", session.graph_builder.graph.number_of_edges()
+        )
+
+        session.is_processing = False
+        session.processing_error = None
+        session.processing_stage = "completed"
+        return True
+
+    def delete(self, session_id: str) -> bool:
+        """
+        Remove a persisted session.
+
+        Returns:
+            True if something was deleted
+        """
+        try:
+            session_dir = self._session_dir(session_id)
+        except ValueError:
+            return False
+        with self._lock:
+            if not session_dir.exists():
+                return False
+            shutil.rmtree(session_dir, ignore_errors=True)
+        return True
+
+    def list_sessions(self) -> List[str]:
+        """List ids of all persisted sessions."""
+        return sorted(
+            p.name for p in self.root_dir.iterdir()
+            if p.is_dir() and not p.name.startswith('.') and (p / self.DATA_FILE).exists()
+        )
+
+    @staticmethod
+    def _graph_to_dict(graph: nx.Graph) -> Dict:
+        """Serialize a NetworkX graph to plain JSON-compatible data."""
+        return {
+            "nodes": [[node, attrs] for node, attrs in graph.nodes(data=True)],
+            "edges": [[u, v, attrs] for u, v, attrs in graph.edges(data=True)],
+        }
+
+    @staticmethod
+    def _graph_from_dict(data: Dict) -> nx.Graph:
+        """Rebuild a NetworkX graph serialized by _graph_to_dict."""
+        graph = nx.Graph()
+        for node, attrs in data.get("nodes", []):
+            graph.add_node(node, **attrs)
+        for u, v, attrs in data.get("edges", []):
+            graph.add_edge(u, v, **attrs)
+        return graph
+
+
+def open_session_store(root_dir: Optional[str]) -> Optional[SessionStore]:
+    """
+    Open a session store, returning None when persistence is disabled or unavailable.
+
+    Args:
+        root_dir: Store directory; empty or None disables persistence
+    """
+    if not root_dir:
+        return None
+    try:
+        return SessionStore(root_dir)
+    except OSError as e:
+        print(f"[STORE] Session persistence disabled, cannot use {root_dir}: {e}")
+        return None
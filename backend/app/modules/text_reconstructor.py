@@ -3,160 +3,103 @@ Advanced text reconstruction module for academic PDF extraction.
 Handles missing spaces, equations, formatting artifacts, and layout issues.
 """
 import re
-from typing import List
+from typing import List, Optional
+
+from app.modules.word_segmentation import WordSegmenter, get_segmenter
+
+# Bump whenever reconstruct() output changes; stored display chunks from an older
+# version are regenerated in the background when their session is loaded.
+RECONSTRUCTION_VERSION = 2
 
 
 class TextReconstructor:
-    """Reconstructs poorly extracted academic text into clean, readable format."""
+    """
+    Reconstructs poorly extracted academic text into clean, readable format.
+
+    All patterns are compiled once per class. Passes that cannot interact are fused into a
+    single scan (space insertion between character classes, whitespace normalization,
+    Greek letter names); order-dependent passes stay separate so the output matches running
+    each rule in sequence.
+    """
+    
+    GREEK_LETTERS = {
+        'alpha': 'α', 'beta': 'β', 'gamma': 'γ', 'delta': 'δ',
+        'epsilon': 'ε', 'zeta': 'ζ', 'eta': 'η', 'theta': 'θ',
+        'lambda': 'λ', 'mu': 'μ', 'nu': 'ν', 'xi': 'ξ',
+        'rho': 'ρ', 'sigma': 'σ', 'tau': 'τ', 'phi': 'φ',
+        'chi': 'χ', 'psi': 'ψ', 'omega': 'ω'
+    }
     
-    def __init__(self):
-        # Common academic terms and connectors
-        self.academic_words = {
-            'abstractive', 'abstract', 'algorithm', 'approach', 'architecture', 'attention',
-            'attention', 'background', 'baseline', 'batch', 'bert', 'between', 'bidirectional',
-            'bigmodel', 'bilu', 'bleu', 'building', 'bytepart', 'bytepair',
-            'computation', 'computational', 'conclusion', 'convolutional', 'crossentropy',
-            'dataset', 'decoder', 'decoding', 'dependenc', 'dimensional', 'dimension',
-            'dropout', 'during', 'efficient', 'embedding', 'encoder', 'encoding',
-            'entailment', 'equation', 'evaluation', 'experiment', 'extraction',
-            'feedforward', 'fintuning', 'function', 'furthermore', 'geometry',
-            'gradient', 'hardware', 'however', 'hyperparameter',
-            'identical', 'implementation', 'importance', 'improvement', 'indexing',
-            'inference', 'information', 'initialization', 'input', 'instance',
-            'instance', 'interaction', 'introduction', 'investigate', 'kernel',
-            'knowledge', 'language', 'layer', 'learning', 'linearization', 'linguistic',
-            'logistic', 'longrange', 'machine', 'mathematical', 'matrix', 'mechanism',
-            'memory', 'method', 'metric', 'model', 'multilayer', 'multilingual',
-            'multihead', 'native', 'network', 'neural', 'neuron', 'normalization',
-            'notonly', 'number', 'objective', 'optimization', 'optimizer', 'output',
-            'parallel', 'parameter', 'paratext', 'parsing', 'performance', 'perplexity',
-            'phrase', 'position', 'positional', 'posterior', 'prediction', 'pretraining',
-            'prior', 'probability', 'processing', 'production', 'projection',
-            'propagation', 'proposed', 'question', 'ranking', 'reasoning', 'recurrent',
-            'reduction', 'reference', 'regularization', 'regression', 'representation',
-            'result', 'retrieval', 'return', 'review', 'routine', 'sampling',
-            'scalable', 'scale', 'scaling', 'scheduling', 'scheme', 'section',
-            'segment', 'segmentation', 'selfattention', 'semantic', 'sentence',
-            'sequence', 'sequential', 'setting', 'shallow', 'significance', 'similarity',
-            'simplicity', 'simulation', 'single', 'softmax', 'source', 'space',
-            'spacy', 'sparse', 'spatial', 'specialized', 'specification', 'speed',
-            'stack', 'standard', 'state', 'stateoftheart', 'statement', 'statistics',
-            'step', 'strategy', 'structure', 'study', 'subcomponent', 'sublayer',
-            'subsequent', 'subset', 'subtask', 'success', 'summary', 'supervision',
-            'support', 'surface', 'survey', 'symbol', 'symbolic', 'symmetry',
-            'syntactic', 'syntax', 'system', 'systematic', 'target', 'task',
-            'tensor', 'test', 'testing', 'text', 'textual', 'than', 'theoretical',
-            'theory', 'therefore', 'thinking', 'though', 'thousand', 'three',
-            'threshold', 'through', 'throughput', 'time', 'timing', 'tiny',
-            'token', 'tokenization', 'topology', 'total', 'traditional', 'training',
-            'transduction', 'transfer', 'transformation', 'transformer', 'transition',
-            'translation', 'transmission', 'transparent', 'trial', 'tricky',
-            'triple', 'trivial', 'token', 'unary', 'understanding', 'unit',
-            'universal', 'unknown', 'unsupervised', 'update', 'uptraining', 'usage',
-            'useful', 'user', 'utility', 'validation', 'value', 'variable', 'variance',
-            'variant', 'variation', 'vector', 'verbosity', 'verification', 'version',
-            'vertical', 'viable', 'video', 'view', 'visualization', 'vocabulary',
-            'volume', 'voting', 'warmup', 'weight', 'weighted', 'whereby', 'whether',
-            'which', 'while', 'whitespace', 'whole', 'widely', 'wikipedia',
-            'wildcard', 'window', 'wisdom', 'within', 'without', 'wordpiece',
-            'workflow', 'working', 'workspace', 'writing', 'written'
-        }
+    # Newlines with surrounding blanks, and blank runs other than a single space
+    _WHITESPACE = re.compile(r'[ \t]*\n(?:[ \t]*\n)*[ \t]*|[ \t]{2,}|\t')
+    _ORPHAN_NUMBER = re.compile(r'\s+\d{1,2}(?:\s|$)')
+    _CID_MARKER = re.compile(r'\(cid:\d+\)')
+    _CHUNK_MARKER = re.compile(r'\[Chunk\s+\d+\]')
+    _TRANSPOSE = re.compile(r'(\w)T(\w)')
+    # The leading class lets the scanner skip positions that cannot start a letter name
+    _GREEK = re.compile(
+        r'\b(?=[' + ''.join(sorted({w[0] for w in GREEK_LETTERS})) + r'])'
+        r'(?:' + '|'.join(GREEK_LETTERS) + r')\b',
+        re.IGNORECASE
+    )
+    # Every boundary that needs a space, plus runs of spaces. The character pairs are
+    # disjoint, so one scan equals applying each rule in turn.
+    _MISSING_SPACE = re.compile(
+        r'(?<=[a-z.)\]}\d])(?=[A-Z])'    # lowercase, period, closing bracket or digit + capital
+        r'|(?<=[a-zA-Z])(?=\d)'         # letter followed by digit
+        r'|(?<=[\d)\]}])(?=[a-z])'       # digit or closing bracket + lowercase
+        r'| {2,}'                       # multiple spaces to single
+    )
+    _NUMBERED_SECTION = re.compile(r'(\d+\.\d+)\s+')
+    _HEADER = re.compile(r'([.?!])\s+([A-Z][A-Z\s]{2,})\s+')
+    _TRAILING_SPACE = re.compile(r'\s+(?=[.,!?;:])|(?P<spaces> {2,})')
+    
+    def __init__(self, segmenter: Optional[WordSegmenter] = None):
+        """
+        Initialize reconstructor.
+        
+        Args:
+            segmenter: Word segmenter for concatenated words (defaults to the shared one)
+        """
+        self.segmenter = segmenter or get_segmenter()
     
     def fix_concatenated_words(self, text: str) -> str:
         """
         Fix concatenated words by intelligently inserting spaces.
-        Examples: 'thatis' -> 'that is', 'eachdimension' -> 'each dimension'
+        Examples: 'thatIs' -> 'that Is', 'eachDimension' -> 'each Dimension'
         """
-        def should_split(prefix: str, suffix: str) -> bool:
-            """Check if we should split at this boundary."""
-            prefix_lower = prefix.lower()
-            suffix_lower = suffix.lower()
-            
-            # Check if prefix is a known word
-            if prefix_lower in self.academic_words:
-                return True
-            
-            # Check common short words
-            if len(prefix_lower) >= 2 and prefix_lower in ['is', 'at', 'by', 'in', 'of', 'or', 'as', 'to', 'be', 'we', 'it', 'on', 'do', 'so', 'no', 'up']:
-                return True
-            
-            # Check if suffix is a known word
-            if suffix_lower in self.academic_words:
-                return True
-            
-            return False
-        
-        result = []
-        i = 0
-        while i < len(text):
-            if i > 0 and text[i].isupper() and text[i-1].islower():
-                # Find potential word boundary
-                for word_len in range(2, min(12, i + 1)):
-                    prefix = text[i-word_len:i]
-                    suffix = text[i:]
-                    if should_split(prefix, suffix):
-                        result.append(' ')
-                        break
-            result.append(text[i])
-            i += 1
-        
-        return ''.join(result)
+        # Split where a known word ends at the boundary, or the rest of the text is one
+        return self.segmenter.split(text, min_length=2, max_length=11, match_suffix=True)
     
     def fix_spacing_patterns(self, text: str) -> str:
         """Fix common spacing issues from PDF extraction."""
-        # Add space after lowercase followed by uppercase
-        text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text)
-        # Add space before uppercase in camelCase
-        text = re.sub(r'([a-z])([A-Z][a-z])', r'\1 \2', text)
-        # Add space after period + capital
-        text = re.sub(r'(\.)([A-Z])', r'\1 \2', text)
-        # Add space between letters and numbers
-        text = re.sub(r'([a-zA-Z])(\d)', r'\1 \2', text)
-        text = re.sub(r'(\d)([a-zA-Z])', r'\1 \2', text)
-        # Add space after closing punctuation when missing
-        text = re.sub(r'([\)\]\}])([A-Za-z])', r'\1 \2', text)
-        # Multiple spaces to single
-        text = re.sub(r' {2,}', ' ', text)
-        return text
+        return self._MISSING_SPACE.sub(' ', text)
     
     def fix_equations(self, text: str) -> str:
         """Reconstruct broken equations and mathematical notation."""
-        # Fix subscripts/superscripts
-        text = re.sub(r'(\w)\_(\w)', r'\1_\2', text)  # word_word
-        text = re.sub(r'(\w)\^(\w)', r'\1^\2', text)  # word^word
-        
         # Fix matrix notation
-        text = re.sub(r'(\w)T(\w)', r'\1^T \2', text)  # wordTword -> word^T word
+        text = self._TRANSPOSE.sub(r'\1^T \2', text)  # wordTword -> word^T word
         
         # Fix Greek letters and math symbols
-        replacements = {
-            'alpha': 'α', 'beta': 'β', 'gamma': 'γ', 'delta': 'δ',
-            'epsilon': 'ε', 'zeta': 'ζ', 'eta': 'η', 'theta': 'θ',
-            'lambda': 'λ', 'mu': 'μ', 'nu': 'ν', 'xi': 'ξ',
-            'rho': 'ρ', 'sigma': 'σ', 'tau': 'τ', 'phi': 'φ',
-            'chi': 'χ', 'psi': 'ψ', 'omega': 'ω'
-        }
-        
-        for word, symbol in replacements.items():
-            text = re.sub(rf'\b{word}\b', symbol, text, flags=re.IGNORECASE)
-        
-        return text
+        return self._GREEK.sub(self._greek_symbol, text)
     
     def fix_section_breaks(self, text: str) -> str:
         """Restore proper section and paragraph breaks."""
         # Add line breaks before numbered sections
-        text = re.sub(r'(\d+\.\d+)\s+', r'\n\n\1 ', text)
+        text = self._NUMBERED_SECTION.sub(r'\n\n\1 ', text)
         # Add breaks before section headers (all caps or Title Case patterns)
-        text = re.sub(r'([.?!])\s+([A-Z][A-Z\s]{2,})\s+', r'\1\n\n\2 ', text)
+        text = self._HEADER.sub(r'\1\n\n\2 ', text)
         return text
     
     def remove_citation_noise(self, text: str) -> str:
         """Remove extraction artifacts from citations and tables."""
         # Remove orphaned citation numbers
-        text = re.sub(r'\s+\d{1,2}(?:\s|$)', ' ', text)
-        # Remove table markers and artifacts
-        text = re.sub(r'\(cid:\d+\)', '', text)
-        text = re.sub(r'\[Chunk\s+\d+\]', '', text)
+        text = self._ORPHAN_NUMBER.sub(' ', text)
+        # Remove table markers and artifacts (substring checks skip the scan when absent)
+        if '(cid:' in text:
+            text = self._CID_MARKER.sub('', text)
+        if '[Chunk' in text:
+            text = self._CHUNK_MARKER.sub('', text)
         return text
     
     def reconstruct(self, text: str) -> str:
@@ -171,9 +114,7 @@ class TextReconstructor:
         """
         # Normalize line breaks and whitespace (preserve paragraphs)
         text = text.replace('\r\n', '\n').replace('\r', '\n')
-        text = re.sub(r'[ \t]+', ' ', text)
-        text = re.sub(r' *\n *', '\n', text)
-        text = re.sub(r'\n{3,}', '\n\n', text)
+        text = self._WHITESPACE.sub(self._collapse_whitespace, text)
         
         # Remove citation noise
         text = self.remove_citation_noise(text)
@@ -190,12 +131,33 @@ class TextReconstructor:
         # Restore section breaks
         text = self.fix_section_breaks(text)
         
-        # Final cleanup
-        text = re.sub(r' {2,}', ' ', text)  # Multiple spaces
-        text = re.sub(r'\s+([.,!?;:])', r'\1', text)  # Space before punctuation
+        # Final cleanup: multiple spaces, space before punctuation
+        text = self._TRAILING_SPACE.sub(self._trailing_space, text)
         text = text.strip()
         
         return text
+    
+    @staticmethod
+    def _collapse_whitespace(match: re.Match) -> str:
+        # Keep at most one blank line between paragraphs
+        newlines = match.group().count('\n')
+        return '\n' * min(newlines, 2) if newlines else ' '
+    
+    @staticmethod
+    def _trailing_space(match: re.Match) -> str:
+        # Whitespace before punctuation is dropped; other runs of spaces collapse to one
+        return ' ' if match.group('spaces') else ''
+    
+    @classmethod
+    def _greek_symbol(cls, match: re.Match) -> str:
+        word = match.group()
+        symbol = cls.GREEK_LETTERS.get(word.lower())
+        if symbol is None:
+            # Case-insensitive matching also accepts a few non-ASCII letters (e.g. 'ſigma')
+            symbol = next(
+                s for w, s in cls.GREEK_LETTERS.items() if re.fullmatch(w, word, re.IGNORECASE)
+            )
+        return symbol
 
 
 def reconstruct_document_chunks(chunks: List[str]) -> List[str]:
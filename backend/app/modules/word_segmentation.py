@@ -0,0 +1,221 @@
+"""
+Dictionary-driven splitting of concatenated words.
+A reversed trie over one shared vocabulary answers "does a known word end here?" in time
+bounded by the longest word, so splitting a page is linear in its length.
+"""
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+# Frequent English words that PDF extraction glues onto the next word
+COMMON_WORDS = frozenset({
+    'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'her', 'was', 'one',
+    'our', 'out', 'had', 'has', 'his', 'how', 'its', 'may', 'new', 'now', 'old', 'see',
+    'two', 'way', 'who', 'boy', 'did', 'get', 'got', 'let', 'put', 'say', 'she', 'too',
+    'use', 'each', 'that', 'this', 'with', 'from', 'have', 'been', 'them', 'than', 'more',
+    'also', 'over', 'both', 'same', 'such', 'only', 'like', 'what', 'when', 'where', 'which',
+    'will', 'would', 'could', 'should', 'first', 'other', 'these', 'those', 'about', 'after',
+    'model', 'data', 'time', 'work', 'part', 'year', 'make', 'take', 'come', 'know', 'good',
+    'find', 'give', 'hand', 'tell', 'call', 'turn', 'feel', 'fact', 'head', 'keep', 'seem'
+})
+
+SHORT_WORDS = frozenset({
+    'is', 'at', 'by', 'in', 'of', 'or', 'as', 'to', 'be', 'we', 'it', 'on', 'do', 'so', 'no', 'up'
+})
+
+# Common academic terms and connectors
+ACADEMIC_WORDS = frozenset({
+    'abstractive', 'abstract', 'algorithm', 'approach', 'architecture', 'attention',
+    'background', 'baseline', 'batch', 'bert', 'between', 'bidirectional',
+    'bigmodel', 'bilu', 'bleu', 'building', 'bytepart', 'bytepair',
+    'computation', 'computational', 'conclusion', 'convolutional', 'crossentropy',
+    'dataset', 'decoder', 'decoding', 'dependenc', 'dimensional', 'dimension',
+    'dropout', 'during', 'efficient', 'embedding', 'encoder', 'encoding',
+    'entailment', 'equation', 'evaluation', 'experiment', 'extraction',
+    'feedforward', 'fintuning', 'function', 'furthermore', 'geometry',
+    'gradient', 'hardware', 'however', 'hyperparameter',
+    'identical', 'implementation', 'importance', 'improvement', 'indexing',
+    'inference', 'information', 'initialization', 'input', 'instance',
+    'interaction', 'introduction', 'investigate', 'kernel',
+    'knowledge', 'language', 'layer', 'learning', 'linearization', 'linguistic',
+    'logistic', 'longrange', 'machine', 'mathematical', 'matrix', 'mechanism',
+    'memory', 'method', 'metric', 'model', 'multilayer', 'multilingual',
+    'multihead', 'native', 'network', 'neural', 'neuron', 'normalization',
+    'notonly', 'number', 'objective', 'optimization', 'optimizer', 'output',
+    'parallel', 'parameter', 'paratext', 'parsing', 'performance', 'perplexity',
+    'phrase', 'position', 'positional', 'posterior', 'prediction', 'pretraining',
+    'prior', 'probability', 'processing', 'production', 'projection',
+    'propagation', 'proposed', 'question', 'ranking', 'reasoning', 'recurrent',
+    'reduction', 'reference', 'regularization', 'regression', 'representation',
+    'result', 'retrieval', 'return', 'review', 'routine', 'sampling',
+    'scalable', 'scale', 'scaling', 'scheduling', 'scheme', 'section',
+    'segment', 'segmentation', 'selfattention', 'semantic', 'sentence',
+    'sequence', 'sequential', 'setting', 'shallow', 'significance', 'similarity',
+    'simplicity', 'simulation', 'single', 'softmax', 'source', 'space',
+    'spacy', 'sparse', 'spatial', 'specialized', 'specification', 'speed',
+    'stack', 'standard', 'state', 'stateoftheart', 'statement', 'statistics',
+    'step', 'strategy', 'structure', 'study', 'subcomponent', 'sublayer',
+    'subsequent', 'subset', 'subtask', 'success', 'summary', 'supervision',
+    'support', 'surface', 'survey', 'symbol', 'symbolic', 'symmetry',
+    'syntactic', 'syntax', 'system', 'systematic', 'target', 'task',
+    'tensor', 'test', 'testing', 'text', 'textual', 'than', 'theoretical',
+    'theory', 'therefore', 'thinking', 'though', 'thousand', 'three',
+    'threshold', 'through', 'throughput', 'time', 'timing', 'tiny',
+    'token', 'tokenization', 'topology', 'total', 'traditional', 'training',
+    'transduction', 'transfer', 'transformation', 'transformer', 'transition',
+    'translation', 'transmission', 'transparent', 'trial', 'tricky',
+    'triple', 'trivial', 'unary', 'understanding', 'unit',
+    'universal', 'unknown', 'unsupervised', 'update', 'uptraining', 'usage',
+    'useful', 'user', 'utility', 'validation', 'value', 'variable', 'variance',
+    'variant', 'variation', 'vector', 'verbosity', 'verification', 'version',
+    'vertical', 'viable', 'video', 'view', 'visualization', 'vocabulary',
+    'volume', 'voting', 'warmup', 'weight', 'weighted', 'whereby', 'whether',
+    'which', 'while', 'whitespace', 'whole', 'widely', 'wikipedia',
+    'wildcard', 'window', 'wisdom', 'within', 'without', 'wordpiece',
+    'workflow', 'working', 'workspace', 'writing', 'written'
+})
+
+DEFAULT_VOCABULARY = COMMON_WORDS | SHORT_WORDS | ACADEMIC_WORDS
+
+# Trie key marking the end of a word (never a character)
+_END = ''
+
+
+class WordSegmenter:
+    """Splits words glued together at lowercase -> uppercase boundaries using a vocabulary."""
+
+    _ASCII_CASE_BOUNDARY = re.compile(r'[a-z](?=[A-Z])')
+    _NON_ASCII = re.compile(r'[^\x00-\x7f]')
+
+    def __init__(self, words: Iterable[str] = DEFAULT_VOCABULARY):
+        """
+        Build the segmenter.
+
+        Args:
+            words: Vocabulary; matching is case-insensitive
+        """
+        self.words = frozenset(w.lower() for w in words if w)
+        self.max_length = max(map(len, self.words), default=0)
+        # Words are inserted reversed so a walk backwards from a boundary finds every
+        # word ending there in one pass
+        self._trie: Dict = {}
+        for word in self.words:
+            node = self._trie
+            for ch in reversed(word):
+                node = node.setdefault(ch, {})
+            node[_END] = True
+
+    def __contains__(self, word: str) -> bool:
+        return len(word) <= self.max_length and word.lower() in self.words
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def word_ends_at(self, text: str, end: int, min_length: int = 2, max_length: int = 11) -> bool:
+        """
+        Check whether a vocabulary word of min_length..max_length characters ends at text[end].
+
+        Args:
+            text: Text to inspect
+            end: Exclusive end position of the candidate word
+            min_length: Shortest word that counts
+            max_length: Longest word that counts
+
+        Returns:
+            True if text[end - n:end] is a known word for some allowed n
+        """
+        node = self._trie
+        for length, pos in enumerate(range(end - 1, max(end - max_length, 0) - 1, -1), 1):
+            node = node.get(text[pos].lower())
+            if node is None:
+                return False
+            if length >= min_length and _END in node:
+                return True
+        return False
+
+    @classmethod
+    def case_boundaries(cls, text: str) -> List[int]:
+        """Positions i where text[i] is uppercase and text[i-1] is lowercase, in order."""
+        candidates = {m.end() for m in cls._ASCII_CASE_BOUNDARY.finditer(text)}
+        # Outside ASCII a boundary can only sit next to a non-ASCII character
+        if not text.isascii():
+            for m in cls._NON_ASCII.finditer(text):
+                candidates.update((m.start(), m.start() + 1))
+        return [
+            i for i in sorted(candidates)
+            if 0 < i < len(text) and text[i].isupper() and text[i-1].islower()
+        ]
+
+    def split(self, text: str, min_length: int = 2, max_length: int = 11, match_suffix: bool = False) -> str:
+        """
+        Insert a space at every case boundary preceded by a known word.
+
+        Args:
+            text: Text to split
+            min_length: Shortest word that justifies a split
+            max_length: Longest word considered before a boundary
+            match_suffix: Also split when the rest of the text is a known word
+
+        Returns:
+            Text with spaces inserted
+        """
+        splits = []
+        for i in self.case_boundaries(text):
+            if i < min_length:
+                continue
+            if self.word_ends_at(text, i, min_length, max_length):
+                splits.append(i)
+            # Length check first: slicing the rest of a long text at every boundary is quadratic
+            elif match_suffix and len(text) - i <= self.max_length and text[i:] in self:
+                splits.append(i)
+        if not splits:
+            return text
+
+        pieces = []
+        last = 0
+        for i in splits:
+            pieces.append(text[last:i])
+            last = i
+        pieces.append(text[last:])
+        return ' '.join(pieces)
+
+
+def load_word_list(path: str) -> List[str]:
+    """Read a domain word list: one word per line, '#' starts a comment."""
+    words = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        word = line.split('#', 1)[0].strip()
+        if word:
+            words.append(word)
+    return words
+
+
+_segmenter: Optional[WordSegmenter] = None
+_segmenter_lock = threading.Lock()
+
+
+def get_segmenter() -> WordSegmenter:
+    """Shared segmenter over the default vocabulary plus any configured domain words."""
+    global _segmenter
+    with _segmenter_lock:
+        if _segmenter is None:
+            _segmenter = WordSegmenter()
+        return _segmenter
+
+
+def configure_segmenter(domain_words: Iterable[str] = ()) -> WordSegmenter:
+    """
+    Rebuild the shared segmenter with extra domain vocabulary.
+
+    Args:
+        domain_words: Words added to the default vocabulary
+
+    Returns:
+        The new shared segmenter
+    """
+    global _segmenter
+    segmenter = WordSegmenter(DEFAULT_VOCABULARY | {w.lower() for w in domain_words})
+    with _segmenter_lock:
+        _segmenter = segmenter
+    return segmenter
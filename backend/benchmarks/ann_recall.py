@@ -0,0 +1,93 @@
+"""
+Benchmark ANN index types against exact (Flat) search.
+
+Reports build time, mean query latency and recall@k versus IndexFlatL2 for the index
+factories FAISSRetriever can use. Runs on synthetic clustered vectors by default, or on
+real chunk embeddings saved with numpy (--embeddings chunks.npy).
+
+Usage:
+    cd backend
+    python -m benchmarks.ann_recall --vectors 200000 --queries 500 --k 5
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from app.modules.retrieval import create_faiss_index, index_kind
+
+
+def synthetic_embeddings(num_vectors: int, dimension: int, clusters: int = 256) -> np.ndarray:
+    """Clustered Gaussian vectors, closer to sentence embeddings than uniform noise."""
+    rng = np.random.default_rng(42)
+    centers = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    assignment = rng.integers(0, clusters, num_vectors)
+    noise = 0.35 * rng.standard_normal((num_vectors, dimension)).astype(np.float32)
+    return centers[assignment] + noise
+
+
+def recall_at_k(ground_truth: np.ndarray, found: np.ndarray) -> float:
+    """Fraction of exact top-k neighbours recovered by the ANN search."""
+    hits = sum(len(set(gt) & set(f)) for gt, f in zip(ground_truth, found))
+    return hits / ground_truth.size
+
+
+def search(index: faiss.Index, queries: np.ndarray, k: int, param: int):
+    """Search with nprobe/efSearch set for the index type."""
+    kind = index_kind(index)
+    if kind == 'ivf':
+        params = faiss.SearchParametersIVF(nprobe=param)
+    elif kind == 'hnsw':
+        params = faiss.SearchParametersHNSW(efSearch=param)
+    else:
+        params = None
+    start = time.perf_counter()
+    if params is not None:
+        _, indices = index.search(queries, k, params=params)
+    else:
+        _, indices = index.search(queries, k)
+    return indices, (time.perf_counter() - start) / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--embeddings", help="Optional .npy file of chunk embeddings")
+    parser.add_argument(
+        "--factories", nargs="+",
+        default=["auto", "IVF1024,Flat", "HNSW32", "IVF1024,PQ48"]
+    )
+    args = parser.parse_args()
+
+    if args.embeddings:
+        data = np.load(args.embeddings).astype(np.float32)
+    else:
+        data = synthetic_embeddings(args.vectors, args.dimension)
+    queries = data[np.random.default_rng(7).choice(len(data), args.queries, replace=False)]
+    queries = queries + 0.05 * np.random.default_rng(8).standard_normal(queries.shape).astype(np.float32)
+
+    flat = faiss.IndexFlatL2(data.shape[1])
+    flat.add(data)
+    ground_truth, flat_latency = search(flat, queries, args.k, 0)
+    print(f"{len(data)} vectors x {data.shape[1]} dims, {args.queries} queries, k={args.k}")
+    print(f"{'Flat':<16} {'':>8} recall=1.000  {flat_latency * 1000:8.3f} ms/query")
+
+    for factory in args.factories:
+        start = time.perf_counter()
+        index = create_faiss_index(data, factory)
+        build_seconds = time.perf_counter() - start
+        kind = index_kind(index)
+        sweep = [1, 4, 16, 64] if kind == 'ivf' else [16, 64, 128] if kind == 'hnsw' else [0]
+        for param in sweep:
+            found, latency = search(index, queries, args.k, param)
+            label = {'ivf': f"nprobe={param}", 'hnsw': f"ef={param}"}.get(kind, "")
+            print(f"{factory:<16} {label:>8} recall={recall_at_k(ground_truth, found):.3f}  "
+                  f"{latency * 1000:8.3f} ms/query  (build {build_seconds:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Unit tests for answer cache module.
+"""
+import pytest
+import numpy as np
+from app.modules.answer_cache import AnswerCache
+
+
+def unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class TestAnswerCache:
+    @pytest.fixture
+    def cache(self):
+        return AnswerCache(max_entries=3, ttl_seconds=0, similarity_threshold=0.9)
+    
+    def test_exact_query_hit(self, cache):
+        cache.put('s1', [0, 1], 'gen', 'What is AI?', 'answer')
+        assert cache.get('s1', [0, 1], 'gen', '  what is   ai? ') == 'answer'
+    
+    def test_miss_on_different_chunks_or_generator(self, cache):
+        cache.put('s1', [0, 1], 'gen', 'What is AI?', 'answer')
+        assert cache.get('s1', [1, 0], 'gen', 'What is AI?') is None
+        assert cache.get('s1', [0, 1], 'other', 'What is AI?') is None
+        assert cache.get('s2', [0, 1], 'gen', 'What is AI?') is None
+    
+    def test_semantic_hit(self, cache):
+        cache.put('s1', [0], 'gen', 'What is AI?', 'answer', query_embedding=unit([1, 0.1]))
+        assert cache.get('s1', [0], 'gen', 'Explain AI', query_embedding=unit([1, 0.15])) == 'answer'
+        assert cache.get('s1', [0], 'gen', 'Cooking?', query_embedding=unit([0, 1])) is None
+        assert cache.stats()['semantic_hits'] == 1
+    
+    def test_lru_eviction(self, cache):
+        for i in range(4):
+            cache.put('s1', [i], 'gen', 'q', i)
+        assert cache.get('s1', [0], 'gen', 'q') is None
+        assert cache.get('s1', [3], 'gen', 'q') == 3
+    
+    def test_ttl_expiry(self, monkeypatch):
+        clock = [1000.0]
+        monkeypatch.setattr('app.modules.answer_cache.time.monotonic', lambda: clock[0])
+        cache = AnswerCache(max_entries=10, ttl_seconds=60)
+        cache.put('s1', [0], 'gen', 'q', 'answer')
+        clock[0] += 61
+        assert cache.get('s1', [0], 'gen', 'q') is None
+    
+    def test_invalidate_session(self, cache):
+        cache.put('s1', [0], 'gen', 'q', 'a')
+        cache.put('s2', [0], 'gen', 'q', 'b')
+        assert cache.invalidate_session('s1') == 1
+        assert cache.get('s1', [0], 'gen', 'q') is None
+        assert cache.get('s2', [0], 'gen', 'q') == 'b'
@@ -0,0 +1,48 @@
+"""
+Unit tests for embedding cache module.
+"""
+import pytest
+import numpy as np
+from app.modules.embedding_cache import EmbeddingCache, chunk_key
+
+
+class TestEmbeddingCache:
+    @pytest.fixture
+    def cache(self, tmp_path):
+        return EmbeddingCache(str(tmp_path), 'test-model', 4)
+
+    def test_lookup_miss_then_hit(self, cache):
+        texts = ["first chunk", "second chunk"]
+        _, missing = cache.lookup(texts)
+        assert missing == [0, 1]
+
+        vectors = np.arange(8, dtype=np.float32).reshape(2, 4)
+        cache.put(texts, vectors)
+        embeddings, missing = cache.lookup(["second chunk", "new chunk"])
+
+        assert missing == [1]
+        np.testing.assert_array_equal(embeddings[0], vectors[1])
+
+    def test_key_ignores_whitespace(self):
+        assert chunk_key("a  b\nc") == chunk_key("a b c")
+
+    def test_persists_across_instances(self, cache, tmp_path):
+        cache.put(["chunk"], np.ones((1, 4), dtype=np.float32))
+        reopened = EmbeddingCache(str(tmp_path), 'test-model', 4)
+        embeddings, missing = reopened.lookup(["chunk"])
+
+        assert missing == []
+        assert embeddings[0].sum() == 4
+
+    def test_models_do_not_share_entries(self, cache, tmp_path):
+        cache.put(["chunk"], np.ones((1, 4), dtype=np.float32))
+        other = EmbeddingCache(str(tmp_path), 'other-model', 4)
+        _, missing = other.lookup(["chunk"])
+        assert missing == [0]
+
+    def test_duplicate_put_is_ignored(self, cache):
+        cache.put(["chunk", "chunk"], np.ones((2, 4), dtype=np.float32))
+        cache.put(["chunk"], np.zeros((1, 4), dtype=np.float32))
+        embeddings, _ = cache.lookup(["chunk"])
+        assert len(cache) == 1
+        assert embeddings[0].sum() == 4
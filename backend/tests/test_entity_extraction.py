@@ -36,6 +36,40 @@ class TestEntityExtractor:
         assert isinstance(entity_map, dict)
         assert len(entity_map) == 2
     
+    def test_extract_from_chunks_offset(self, extractor):
+        chunks = ["Microsoft competes with Apple in the tech industry."]
+        known = [e for e in extractor.extract_entities(chunks[0]) if e['name'] == 'Apple']
+        entities, entity_map = extractor.extract_from_chunks(
+            chunks, start_idx=5, known_entities=known
+        )
+        
+        assert list(entity_map.keys()) == [5]
+        assert all(e['source_chunk_id'] == 5 for e in entities)
+        assert 'Apple' not in [e['name'] for e in entities]
+    
+    def test_extract_from_chunks_updates_seen_set(self, extractor):
+        apple = next(e for e in extractor.extract_entities("Apple.") if e['name'] == 'Apple')
+        seen = {('apple', apple['type'])}
+        first, _ = extractor.extract_from_chunks(["Microsoft competes with Apple."], seen_entities=seen)
+        second, _ = extractor.extract_from_chunks(
+            ["Microsoft and Apple again."], start_idx=1, seen_entities=seen
+        )
+        
+        assert 'Apple' not in [e['name'] for e in first]
+        assert ('microsoft', first[0]['type']) in seen
+        assert second == []
+    
+    def test_prune_entities(self, extractor):
+        entities = [
+            {'name': 'Apple', 'type': 'ORG', 'source_chunk_id': 0},
+            {'name': 'Microsoft', 'type': 'ORG', 'source_chunk_id': 1},
+        ]
+        entity_map = {0: [{'name': 'Microsoft', 'type': 'ORG'}]}
+        
+        pruned = extractor.prune_entities(entities, entity_map)
+        
+        assert pruned == [{'name': 'Microsoft', 'type': 'ORG', 'source_chunk_id': 0}]
+    
     def test_extract_noun_phrases(self, extractor):
         text = "Machine learning is a subset of artificial intelligence."
         phrases = extractor.extract_noun_phrases(text)
@@ -2,9 +2,23 @@
 Unit tests for graph builder module.
 """
 import pytest
+from types import SimpleNamespace
 from app.modules.graph_builder import KnowledgeGraphBuilder
 
 
+def fake_nlp(text):
+    """Parse "<Subject> <verb> <Object>." into a verb token with nsubj/dobj children."""
+    words = text.rstrip('.').split()
+    if len(words) != 3:
+        return []
+    subj, verb, obj = words
+    return [SimpleNamespace(
+        pos_='VERB',
+        lemma_=verb,
+        children=[SimpleNamespace(dep_='nsubj', text=subj), SimpleNamespace(dep_='dobj', text=obj)]
+    )]
+
+
 class TestKnowledgeGraphBuilder:
     @pytest.fixture
     def builder(self):
@@ -66,3 +80,82 @@ class TestKnowledgeGraphBuilder:
         relationships = builder.get_relationships()
         
         assert isinstance(relationships, list)
+    
+    def test_add_to_graph_incremental(self, builder):
+        builder.build_graph(
+            [{'name': 'Alice', 'type': 'PERSON', 'source_chunk_id': 0}],
+            {0: [{'name': 'Alice', 'type': 'PERSON'}]},
+            ["Alice is here."]
+        )
+        graph = builder.add_to_graph(
+            [{'name': 'Bob', 'type': 'PERSON', 'source_chunk_id': 1}],
+            {1: [{'name': 'Alice', 'type': 'PERSON'}, {'name': 'Bob', 'type': 'PERSON'}]},
+            ["Alice is here.", "Alice met Bob."]
+        )
+        
+        assert 'Alice' in graph.nodes()
+        assert graph.has_edge('Alice', 'Bob')
+    
+    def test_prune_graph(self, builder):
+        builder.build_graph(
+            [
+                {'name': 'Alice', 'type': 'PERSON', 'source_chunk_id': 0},
+                {'name': 'Bob', 'type': 'PERSON', 'source_chunk_id': 0},
+                {'name': 'Carol', 'type': 'PERSON', 'source_chunk_id': 1},
+            ],
+            {
+                0: [{'name': 'Alice', 'type': 'PERSON'}, {'name': 'Bob', 'type': 'PERSON'}],
+                1: [{'name': 'Alice', 'type': 'PERSON'}, {'name': 'Carol', 'type': 'PERSON'}],
+            },
+            ["Alice met Bob.", "Alice met Carol."]
+        )
+        # Chunk 0 removed; chunk 1 is now chunk 0
+        graph = builder.prune_graph(
+            [
+                {'name': 'Alice', 'type': 'PERSON', 'source_chunk_id': 0},
+                {'name': 'Carol', 'type': 'PERSON', 'source_chunk_id': 0},
+            ],
+            {0: [{'name': 'Alice', 'type': 'PERSON'}, {'name': 'Carol', 'type': 'PERSON'}]}
+        )
+        
+        assert 'Bob' not in graph
+        assert graph.has_edge('Alice', 'Carol')
+        assert graph.nodes['Carol']['source_chunk'] == 0
+    
+    def test_prune_graph_drops_unsupported_dependency_edges(self, builder):
+        builder.nlp = fake_nlp
+        people = [{'name': name, 'type': 'PERSON'} for name in ('Alice', 'Bob')]
+        builder.build_graph(
+            [dict(person, source_chunk_id=0) for person in people],
+            {0: people, 1: people[:1], 2: people[1:]},
+            ["Alice hired Bob.", "Alice left.", "Bob stayed."]
+        )
+        assert builder.graph['Alice']['Bob']['relation'] == 'hired'
+        
+        # Chunk 0 (the only one relating Alice and Bob) removed; both are still mentioned
+        graph = builder.prune_graph(
+            [dict(people[0], source_chunk_id=0), dict(people[1], source_chunk_id=1)],
+            {0: people[:1], 1: people[1:]},
+            remap={1: 0, 2: 1}
+        )
+        
+        assert 'Alice' in graph and 'Bob' in graph
+        assert not graph.has_edge('Alice', 'Bob')
+    
+    def test_prune_graph_remaps_dependency_support(self, builder):
+        builder.nlp = fake_nlp
+        people = [{'name': name, 'type': 'PERSON'} for name in ('Alice', 'Bob')]
+        builder.build_graph(
+            [dict(person, source_chunk_id=0) for person in people],
+            {0: people, 1: people},
+            ["Alice met Bob.", "Alice hired Bob."]
+        )
+        # Verb relations outweigh co-occurrence
+        assert builder.graph['Alice']['Bob']['relation'] == 'hired'
+        
+        # Chunk 1 removed: the edge falls back to the relation chunk 0 supports
+        graph = builder.prune_graph(
+            [dict(person, source_chunk_id=0) for person in people], {0: people}, remap={0: 0}
+        )
+        assert graph['Alice']['Bob']['relation'] == 'met'
+        assert graph['Alice']['Bob']['support'] == {'co-occurs-in-chunk': [0], 'met': [0]}
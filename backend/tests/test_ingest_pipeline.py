@@ -0,0 +1,237 @@
+"""
+Unit tests for the ingest pipeline.
+"""
+import threading
+
+import numpy as np
+import pytest
+from app.modules.ingest_pipeline import ChunkBatch, IngestPipeline, IngestProgress
+from app.modules.pipeline_tracker import Span, trace_span
+
+
+def fake_embed(chunks):
+    return np.array([[len(chunk), 1.0] for chunk in chunks], dtype=np.float32)
+
+
+def fake_entities(chunks, start_idx, seen):
+    """One entity per distinct capitalized word, deduplicated against the seen keys."""
+    entities, entity_map = [], {}
+    for idx, chunk in enumerate(chunks, start=start_idx):
+        names = [word for word in chunk.split() if word[0].isupper()]
+        entity_map[idx] = [{'name': name, 'type': 'X'} for name in names]
+        for name in names:
+            if (name.lower(), 'X') not in seen:
+                entities.append({'name': name, 'type': 'X', 'source_chunk_id': idx})
+                seen.add((name.lower(), 'X'))
+    return entities, entity_map
+
+
+class Recorder:
+    def __init__(self):
+        self.indexed = None
+        self.graph_batches = []
+
+    def index(self, chunks, sources, embeddings):
+        self.indexed = (list(chunks), list(sources), embeddings)
+
+    def add_to_graph(self, entities, entity_map, chunks, start_idx):
+        self.graph_batches.append((entities, sorted(entity_map)))
+
+
+@pytest.fixture
+def recorder():
+    return Recorder()
+
+
+def make_pipeline(recorder, **kwargs):
+    options = dict(
+        embed=fake_embed,
+        index=recorder.index,
+        extract_entities=fake_entities,
+        add_to_graph=recorder.add_to_graph,
+        reconstruct=lambda chunks: [chunk.upper() for chunk in chunks],
+        batch_size=3,
+        queue_size=2
+    )
+    options.update(kwargs)
+    return IngestPipeline(**options)
+
+
+def chunk_stream(count):
+    for i in range(count):
+        yield f"chunk {i} mentions Alice and Topic{i % 4}", "a.txt" if i < count // 2 else "b.txt"
+
+
+class TestIngestPipeline:
+    def test_results_match_sequential_processing(self, recorder):
+        expected = list(chunk_stream(10))
+        chunks = [chunk for chunk, _ in expected]
+        entities, entity_map = fake_entities(chunks, 5, set())
+
+        result = make_pipeline(recorder).run(chunk_stream(10), start_idx=5)
+
+        assert result.chunks == chunks
+        assert result.sources == [source for _, source in expected]
+        assert result.entities == entities
+        assert result.entity_chunk_map == entity_map
+        assert result.display_chunks == [chunk.upper() for chunk in chunks]
+        assert recorder.indexed[0] == chunks
+        np.testing.assert_array_equal(recorder.indexed[2], fake_embed(chunks))
+        # The graph is extended batch by batch with each batch's new entities
+        assert [keys for _, keys in recorder.graph_batches] == [[5, 6, 7], [8, 9, 10], [11, 12, 13], [14]]
+        assert sum(len(ents) for ents, _ in recorder.graph_batches) == len(entities)
+
+    def test_known_entities_are_not_returned(self, recorder):
+        result = make_pipeline(recorder).run(chunk_stream(4), known_entities=[{'name': 'Alice', 'type': 'X'}])
+        assert 'Alice' not in {ent['name'] for ent in result.entities}
+
+    def test_empty_stream(self, recorder):
+        result = make_pipeline(recorder).run(iter(()))
+        assert result.chunks == [] and result.entities == []
+        assert recorder.indexed is None
+
+    def test_stage_stats(self, recorder):
+        pipeline = make_pipeline(recorder)
+        pipeline.run(chunk_stream(10))
+        stats = {stage['name']: stage for stage in pipeline.stage_stats()}
+
+        assert list(stats) == ['extract', 'embed', 'index', 'entities', 'graph', 'reconstruct']
+        assert all(stage['status'] == 'done' for stage in stats.values())
+        assert all(stage['chunks'] == 10 and stage['batches'] == 4 for stage in stats.values())
+        assert all(stage['queue_depth'] == 0 for stage in stats.values())
+        assert all(stage['max_queue_depth'] <= 2 for stage in stats.values())
+
+    def test_queues_are_bounded(self, recorder):
+        release = threading.Event()
+        produced = []
+
+        def slow_embed(chunks):
+            release.wait(5)
+            return fake_embed(chunks)
+
+        def stream():
+            for chunk in chunk_stream(60):
+                produced.append(chunk)
+                yield chunk
+
+        pipeline = make_pipeline(recorder, embed=slow_embed, batch_size=1, queue_size=2)
+        runner = threading.Thread(target=pipeline.run, args=(stream(),))
+        runner.start()
+        runner.join(0.5)
+        # One batch in the stalled embed call, two queued, one blocked in put
+        assert len(produced) <= 5
+        release.set()
+        runner.join(5)
+        assert recorder.indexed is not None and len(recorder.indexed[0]) == 60
+
+    def test_stage_error_is_raised_without_deadlock(self, recorder):
+        def failing_entities(chunks, start_idx, seen):
+            if start_idx >= 3:
+                raise RuntimeError("extractor crashed")
+            return fake_entities(chunks, start_idx, seen)
+
+        closed = []
+
+        def stream():
+            try:
+                yield from chunk_stream(300)
+            finally:
+                closed.append(True)
+
+        pipeline = make_pipeline(recorder, extract_entities=failing_entities, batch_size=3, queue_size=1)
+        with pytest.raises(RuntimeError, match="extractor crashed"):
+            pipeline.run(stream())
+
+        stats = {stage['name']: stage for stage in pipeline.stage_stats()}
+        assert stats['entities']['status'] == 'error'
+        assert stats['extract']['chunks'] < 300
+        assert closed == [True]
+        assert recorder.indexed is None
+
+    def test_stream_error_is_raised(self, recorder):
+        def stream():
+            yield "first chunk", "a.txt"
+            raise ValueError("unreadable PDF")
+
+        pipeline = make_pipeline(recorder)
+        with pytest.raises(ValueError, match="unreadable PDF"):
+            pipeline.run(stream())
+        assert pipeline.stage_stats()[0]['status'] == 'error'
+
+
+    def test_stage_spans(self, recorder):
+        root = Span('ingest')
+
+        def stream():
+            for item in chunk_stream(10):
+                with trace_span('chunk'):
+                    pass
+                yield item
+
+        make_pipeline(recorder, span=root).run(stream())
+
+        assert set(root.children) == {'extract', 'embed', 'index', 'entities', 'graph', 'reconstruct'}
+        assert root.find(['embed']).calls == 4 and root.find(['embed']).data == {'batches': 4, 'chunks': 10}
+        assert root.find(['index']).calls == 5  # Four batches collected, then the index build
+        # Spans opened while the chunk stream is read nest under the extract stage
+        assert root.find(['extract', 'chunk']).calls == 10
+
+class TestIngestProgress:
+    @pytest.fixture
+    def statuses(self):
+        return {}
+
+    @pytest.fixture
+    def progress(self, statuses):
+        def publish(filename, status, progress, chunks, **details):
+            statuses[filename] = dict(status=status, progress=progress, chunks_count=chunks, **details)
+        return IngestProgress([("a.txt", 100), ("b.txt", 100)], publish)
+
+    def test_extraction_events(self, progress, statuses):
+        progress.extraction_progress("a.txt", 0, 4, "pages")
+        assert statuses["a.txt"]["status"] == "chunking"
+        progress.extraction_progress("a.txt", 2, 4, "pages")
+        assert statuses["a.txt"]["pages_parsed"] == 2 and statuses["a.txt"]["total_pages"] == 4
+        assert statuses["a.txt"]["progress"] == 15  # Half of the extraction share
+        assert "b.txt" not in statuses
+
+    def test_reaching_a_document_finishes_the_previous_ones(self, progress, statuses):
+        progress.extraction_progress("b.txt", 10, 100, "bytes")
+        assert statuses["a.txt"]["status"] == "indexing"  # Yielded no chunks at all
+        assert statuses["a.txt"]["progress"] == 99
+        assert "pages_parsed" not in statuses["b.txt"]
+
+    def test_pipeline_events(self, recorder, progress, statuses):
+        make_pipeline(recorder, on_batch=progress.batch_done).run(progress.chunks(chunk_stream(10)))
+
+        for filename in ("a.txt", "b.txt"):
+            assert statuses[filename]["status"] == "indexing"
+            assert statuses[filename]["chunks_count"] == 5
+            assert statuses[filename]["chunks_embedded"] == 5
+        # Every new entity is credited to the document that introduced it
+        assert statuses["a.txt"]["entities_count"] == 5
+        assert statuses["b.txt"]["entities_count"] == 0
+
+        overall = progress.overall()
+        assert overall["progress"] == 99.0
+        assert overall["eta_seconds"] == 0.0
+        assert overall["poll_after_seconds"] == 0.5
+
+    def test_partial_progress_extrapolates_chunk_count(self, progress, statuses):
+        stream = progress.chunks(chunk_stream(10))
+        progress.extraction_progress("a.txt", 1, 2, "pages")
+        chunks = [next(stream) for _ in range(2)]
+        progress.batch_done('embed', ChunkBatch(0, [c for c, _ in chunks], [s for _, s in chunks]), None)
+        # Two of an expected four chunks embedded at half the pages
+        assert statuses["a.txt"]["status"] == "embedding"
+        assert statuses["a.txt"]["progress"] == int(100 * (0.3 * 0.5 + 0.5 * 0.5))
+        overall = progress.overall()
+        assert 0 < overall["progress"] < 50
+        assert overall["eta_seconds"] is not None
+        stream.close()
+
+    def test_listener_errors_do_not_fail_ingest(self, recorder):
+        def broken_listener(stage, batch, result):
+            raise RuntimeError("listener bug")
+        result = make_pipeline(recorder, on_batch=broken_listener).run(chunk_stream(4))
+        assert len(result.chunks) == 4
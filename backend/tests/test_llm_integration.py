@@ -0,0 +1,50 @@
+"""
+Unit tests for LLM integration module.
+"""
+import asyncio
+
+from app.modules.llm_config import LLMConfig
+from app.modules.llm_integration import LLMClientPool, close_llm_pools, get_llm_pool
+
+
+def make_config(api_key="test-key", provider="openai"):
+    return LLMConfig(provider=provider, api_key=api_key, base_url=None, model="gpt-4o-mini")
+
+
+class TestLLMClientPool:
+    def test_no_pool_without_api_key(self):
+        assert get_llm_pool(make_config(api_key=None)) is None
+    
+    def test_pool_shared_per_provider(self):
+        pool = get_llm_pool(make_config())
+        assert get_llm_pool(make_config()) is pool
+        assert get_llm_pool(make_config(provider="groq")) is not pool
+    
+    def test_explicit_api_key_overrides_config(self):
+        pool = get_llm_pool(make_config(), api_key="other-key")
+        assert pool.config.api_key == "other-key"
+    
+    def test_client_closed_when_loop_shuts_down(self):
+        pool = LLMClientPool(make_config())
+        
+        async def use():
+            client, _ = pool._ensure_client()
+            assert pool._ensure_client()[0] is client
+            return client
+        
+        first = asyncio.run(use())
+        second = asyncio.run(use())
+        assert second is not first
+        assert first.is_closed() and second.is_closed()
+        assert not pool._clients and not pool._closers
+    
+    def test_close_llm_pools(self):
+        pool = get_llm_pool(make_config(api_key="close-key"))
+        
+        async def use_and_close():
+            client, _ = pool._ensure_client()
+            await close_llm_pools()
+            return client
+        
+        assert asyncio.run(use_and_close()).is_closed()
+        assert not pool._clients
@@ -0,0 +1,57 @@
+"""
+Unit tests for PDF extraction backends.
+"""
+import pytest
+from app.modules.pdf_extraction import PdfExtractor, available_backends, text_quality
+from tests.test_preprocessing import make_pdf
+
+
+class TestTextQuality:
+    def test_clean_text_scores_high(self):
+        assert text_quality("The attention mechanism computes a weighted sum of values.") == 1.0
+
+    def test_concatenated_text_scores_low(self):
+        text = "Theattentionmechanismcomputes aweightedsumofvaluesforeach query"
+        assert text_quality(text) < 0.9
+
+    def test_garbled_glyphs_score_low(self):
+        assert text_quality("(cid:12)(cid:13) ��") == 0.0
+
+    def test_empty_text(self):
+        assert text_quality("") == 0.0
+        assert text_quality("   \n") == 0.0
+
+
+class TestPdfExtractor:
+    @pytest.fixture
+    def pdf_path(self, tmp_path):
+        path = tmp_path / "paper.pdf"
+        path.write_bytes(make_pdf([
+            "A clean page of ordinary text",
+            "Theattentionmechanismcomputesaweightedsumofvalues",
+            "Another clean page",
+        ]))
+        return str(path)
+
+    def test_auto_prefers_fast_backend(self):
+        assert PdfExtractor().backend in ('pymupdf', 'pypdf')
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            PdfExtractor("nonexistent")
+
+    def test_falls_back_only_for_poor_pages(self, pdf_path):
+        extractor = PdfExtractor("pypdf", min_quality=0.9)
+        pages = extractor.extract_range(pdf_path, 0, extractor.page_count(pdf_path))
+
+        assert [page.backend for page in pages] == ['pypdf', 'pdfplumber', 'pypdf']
+        assert pages[0].text.strip() == "A clean page of ordinary text"
+
+    def test_zero_quality_never_falls_back(self, pdf_path):
+        pages = PdfExtractor("pypdf", min_quality=0).extract_range(pdf_path, 0, 3)
+        assert {page.backend for page in pages} == {'pypdf'}
+
+    @pytest.mark.parametrize("backend", available_backends())
+    def test_backends_agree_on_clean_text(self, pdf_path, backend):
+        pages = PdfExtractor(backend, min_quality=0).extract_range(pdf_path, 2, 3)
+        assert pages[0].text.strip() == "Another clean page"
@@ -0,0 +1,138 @@
+"""
+Unit tests for pipeline tracing.
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+from app.modules.pipeline_tracker import PipelineTracker, Span, annotate, current_span, trace_span, traced
+
+
+class TestSpans:
+    def test_nested_spans_are_measured(self):
+        tracker = PipelineTracker()
+        with tracker.trace('query', 's1', query="q") as trace:
+            with trace_span('retrieve'):
+                with trace_span('encode'):
+                    time.sleep(0.01)
+                annotate(chunks=3)
+            with trace_span('llm'):
+                time.sleep(0.005)
+
+        retrieve = trace.find('retrieve')
+        assert retrieve.find(['encode']).duration_ns >= 10_000_000
+        assert retrieve.duration_ns >= retrieve.find(['encode']).duration_ns
+        assert retrieve.data == {'chunks': 3}
+        assert trace.root.status == 'complete'
+        assert trace.root.duration_ns >= retrieve.duration_ns + trace.find('llm').duration_ns
+
+        view = trace.to_dict()['root']
+        assert [child['name'] for child in view['children']] == ['retrieve', 'llm']
+        assert view['children'][0]['self_ms'] <= view['children'][0]['duration_ms']
+        assert view['data'] == {'query': 'q'}
+
+    def test_no_trace_is_a_no_op(self):
+        with trace_span('encode') as span:
+            annotate(ignored=True)
+        assert span is None
+        assert current_span() is None
+        assert list(traced('chunk', [1, 2])) == [1, 2]
+
+    def test_repeated_spans_accumulate(self):
+        root = Span('upload')
+        with root.activate():
+            for _ in range(3):
+                with trace_span('clean'):
+                    pass
+        clean = root.find(['clean'])
+        assert clean.calls == 3
+        assert clean.start_ns <= clean.end_ns
+
+    def test_traced_generators_nest_as_they_call(self):
+        root = Span('extract')
+
+        def parse():
+            yield from ["a", "b"]
+
+        with root.activate():
+            pieces = traced('parse', parse())
+            assert list(traced('chunk', (piece.upper() for piece in pieces))) == ["A", "B"]
+
+        chunk = root.find(['chunk'])
+        assert chunk.calls == 3  # Two items and the exhausting call
+        assert chunk.find(['parse']).calls == 3
+
+    def test_error_marks_span_and_trace(self):
+        tracker = PipelineTracker()
+        with pytest.raises(ValueError):
+            with tracker.trace('query', 's1') as trace:
+                with trace_span('llm'):
+                    raise ValueError("rate limited")
+        assert trace.find('llm').status == 'error'
+        assert trace.root.status == 'error' and trace.root.error == "rate limited"
+
+    def test_spans_recorded_from_threads(self):
+        root = Span('ingest')
+        stage = root.child('embed')
+
+        def work():
+            began = time.perf_counter_ns()
+            stage.add(began, began + 1000)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert stage.calls == 8 and stage.duration_ns == 8000
+
+    def test_concurrent_tasks_keep_their_own_spans(self):
+        tracker = PipelineTracker()
+
+        async def request(name):
+            with tracker.trace('query', name) as trace:
+                with trace_span('llm'):
+                    await asyncio.sleep(0.01)
+                    annotate(request=name)
+            return trace
+
+        async def main():
+            return await asyncio.gather(request('a'), request('b'))
+
+        for trace in asyncio.run(main()):
+            assert list(trace.root.children) == ['llm']
+            assert trace.find('llm').data == {'request': trace.session_id}
+
+
+class TestPipelineTracker:
+    def test_ring_buffer_keeps_recent_traces(self):
+        tracker = PipelineTracker(capacity=3)
+        traces = [tracker.start_trace('query', 's1' if i % 2 else 's2') for i in range(5)]
+        assert tracker.traces() == traces[:1:-1]
+        assert tracker.traces(session_id='s1') == [traces[3]]
+        assert tracker.latest('s2', ('query',)) is traces[4]
+        assert tracker.latest('s2', ('upload',)) is None
+
+    def test_visualization_uses_measured_stages(self):
+        tracker = PipelineTracker()
+        upload = tracker.start_trace('upload', 's1')
+        with upload.span('read', files=2):
+            pass
+        with upload.span('ingest'):
+            with trace_span('embed'):
+                pass
+
+        view = tracker.get_pipeline_visualization('s1')
+        stages = {stage['id']: stage for stage in view['stages']}
+        assert stages['upload']['status'] == 'complete'
+        assert stages['upload']['data']['files'] == 2
+        assert stages['embedding']['data']['calls'] == 1
+        # Stages without spans are not reported as done
+        assert stages['indexing']['status'] == 'running'
+        assert {stage['status'] for stage in view['query_stages']} == {'pending'}
+        assert view['traces'][0]['kind'] == 'upload' and not view['traces'][0]['finished']
+
+        upload.finish()
+        stages = {stage['id']: stage for stage in tracker.get_pipeline_visualization('s1')['stages']}
+        assert stages['indexing']['status'] == 'pending'
@@ -1,10 +1,48 @@
 """
 Unit tests for preprocessing module.
 """
+import random
+import tempfile
+from pathlib import Path
+
 import pytest
+from app.modules.pdf_extraction import SharedPdf, read_source
+from app.modules import preprocessing
 from app.modules.preprocessing import (
-    clean_text, chunk_text, extract_text_from_file
+    TokenChunker, clean_text, chunk_text, extract_text_from_file, extract_pdf_pages, extract_text_from_pdf,
+    iter_chunks, iter_document_chunks, iter_sentences, preprocess_documents, worker_pdf_source
 )
+from app.modules.text_reconstructor import TextReconstructor
+
+
+def make_pdf(page_texts):
+    """Build a minimal PDF with one line of Helvetica text per page."""
+    count = len(page_texts)
+    font_id = 3 + 2 * count
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % (3 + 2 * i) for i in range(count))
+        + b"] /Count %d >>" % count,
+    ]
+    for i, text in enumerate(page_texts):
+        stream = b"BT /F1 12 Tf 72 720 Td (" + text.encode("latin-1") + b") Tj ET"
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (4 + 2 * i, font_id)
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(pdf)
 
 
 class TestTextCleaning:
@@ -37,6 +75,151 @@ class TestChunking:
         text = "This is a test. " * 20
         chunks = chunk_text(text)
         assert all(len(c) > 0 for c in chunks)
+    
+    def test_overlap_keeps_sentence_per_ten_words(self):
+        text = "One two three. Four five six. Seven eight nine. Ten eleven twelve."
+        chunks = chunk_text(text, chunk_size=6, overlap=10)
+        assert chunks == [
+            "One two three. Four five six.",
+            "Four five six. Seven eight nine.",
+            "Seven eight nine. Ten eleven twelve.",
+        ]
+    
+    def test_small_overlap_does_not_repeat_everything(self):
+        text = "One two three. Four five six. Seven eight nine."
+        assert chunk_text(text, chunk_size=3, overlap=5) == ["One two three.", "Four five six.", "Seven eight nine."]
+    
+    def test_iter_chunks_is_lazy(self):
+        def endless():
+            while True:
+                yield "Five words in this sentence."
+        chunks = iter_chunks(endless(), chunk_size=10, overlap=0)
+        assert next(chunks) == "Five words in this sentence. Five words in this sentence."
+
+
+@pytest.fixture
+def tokenizer():
+    """Small WordPiece tokenizer (BERT normalization, [CLS] ... [SEP])."""
+    from tokenizers import Tokenizer, models, normalizers, pre_tokenizers, processors
+    from transformers import PreTrainedTokenizerFast
+    
+    vocab = ['[PAD]', '[UNK]', '[CLS]', '[SEP]', '.', ',', 'the', 'model', 'train', 'head',
+             'attention', 'is', 'all', 'you', 'need', '##s', '##ing', '##ed']
+    backend = Tokenizer(models.WordPiece({token: i for i, token in enumerate(vocab)}, unk_token='[UNK]'))
+    backend.normalizer = normalizers.BertNormalizer(lowercase=True)
+    backend.pre_tokenizer = pre_tokenizers.BertPreTokenizer()
+    backend.post_processor = processors.TemplateProcessing(
+        single="[CLS] $A [SEP]", special_tokens=[("[CLS]", 2), ("[SEP]", 3)]
+    )
+    return PreTrainedTokenizerFast(tokenizer_object=backend, unk_token='[UNK]')
+
+
+class TestTokenChunking:
+    WORDS = "the models training attention heads is all you need trained xyz".split()
+    
+    def random_sentences(self, rng):
+        return [
+            ' '.join(rng.choice(self.WORDS) for _ in range(rng.randint(0, 30))) + rng.choice(['.', ''])
+            for _ in range(rng.randint(0, 20))
+        ]
+    
+    def test_limit_leaves_room_for_special_tokens(self, tokenizer):
+        chunker = TokenChunker(tokenizer, max_seq_length=256, max_tokens=1000)
+        assert chunker.max_tokens == 254
+        assert TokenChunker(tokenizer, 256, max_tokens=100).max_tokens == 100
+        assert TokenChunker(tokenizer, 10, overlap_tokens=32).overlap_tokens == 4
+    
+    def test_packs_sentences_by_tokens(self, tokenizer):
+        # "Models training." is 5 tokens: model ##s train ##ing .
+        chunker = TokenChunker(tokenizer, max_seq_length=12, overlap_tokens=0)
+        chunks = list(chunker.chunks(["Models training."] * 5))
+        assert chunks == ["Models training. Models training."] * 2 + ["Models training."]
+    
+    def test_chunks_fit_and_cover_text(self, tokenizer):
+        rng = random.Random(0)
+        for _ in range(200):
+            chunker = TokenChunker(tokenizer, rng.randint(6, 40), overlap_tokens=0, batch_size=rng.randint(1, 5))
+            sentences = self.random_sentences(rng)
+            chunks = list(chunker.chunks(sentences))
+            assert all(0 < chunker.count_tokens(chunk) <= chunker.max_tokens for chunk in chunks)
+            assert ' '.join(chunks).split() == ' '.join(sentences).split()
+    
+    def test_overlap_repeats_previous_tokens(self, tokenizer):
+        rng = random.Random(1)
+        for _ in range(200):
+            chunker = TokenChunker(tokenizer, rng.randint(6, 40), overlap_tokens=rng.randint(1, 20))
+            chunks = list(chunker.chunks(self.random_sentences(rng)))
+            for previous, chunk in zip(chunks, chunks[1:]):
+                assert chunker.count_tokens(chunk) <= chunker.max_tokens
+                assert any(
+                    previous.endswith(chunk[:end]) and chunker.count_tokens(chunk[:end]) <= chunker.overlap_tokens
+                    for end in range(len(chunk) + 1)
+                )
+    
+    def test_long_sentence_is_cut_at_word_starts(self, tokenizer):
+        # 5 tokens per chunk, 2 overlapping; every word is two tokens (model ##s, train ##ed)
+        chunker = TokenChunker(tokenizer, max_seq_length=7, overlap_tokens=2)
+        chunks = list(chunker.chunks(["models trained models trained"]))
+        assert chunks == ["models trained", "trained models", "models trained"]
+    
+    def test_requires_fast_tokenizer(self):
+        class SlowTokenizer:
+            is_fast = False
+        with pytest.raises(ValueError):
+            TokenChunker(SlowTokenizer(), 256)
+    
+    def test_pipeline_uses_chunker(self, tokenizer):
+        chunker = TokenChunker(tokenizer, max_seq_length=12, overlap_tokens=0)
+        chunks, sources = preprocess_documents([(b"Models training. " * 5, "notes.txt")], chunker=chunker)
+        assert chunks == ["Models training. Models training."] * 2 + ["Models training."]
+        assert sources == ["notes.txt"] * 3
+
+
+class TestStreamingPipeline:
+    def test_sentences_span_pieces(self):
+        pieces = ["The first sentence. The sec", "ond sentence", " ends here. Last"]
+        assert list(iter_sentences(pieces)) == ["The first sentence.", "The second sentence ends here.", "Last"]
+    
+    def test_random_pieces_match_whole_text(self):
+        # Punctuation-heavy text with characters cleaning drops (\x0b and \x1c are whitespace)
+        alphabet = list(".?!,;: \n\t\x0b\x1c\xa0€é•\"'()-xZ1")
+        words = ["The", "model", "et al.", "Fig. 3", " 12 ", "3.4 ", "INTRODUCTION", "eachDimension", "\r\n"]
+        rng = random.Random(0)
+        reconstructor = TextReconstructor()
+        for _ in range(400):
+            text = ''.join(
+                rng.choice(alphabet) if rng.random() < 0.5 else rng.choice(words)
+                for _ in range(rng.randint(1, 60))
+            )
+            whole = reconstructor.reconstruct(clean_text(text))
+            expected = preprocessing.split_sentences(whole) if whole else []
+            cuts = sorted(rng.sample(range(len(text) + 1), min(rng.randint(1, 6), len(text) + 1)))
+            pieces = [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+            assert list(iter_sentences(pieces, reconstructor)) == expected, repr(text)
+    
+    def test_text_blocks_match_whole_text(self, monkeypatch):
+        content = ("Attention is computed per head. The model uses eight heads! Does it scale? "
+                   "It does, with café-level ease. ") * 40
+        expected = preprocess_documents([(content.encode(), "notes.txt")])
+        monkeypatch.setattr(preprocessing, "TEXT_BLOCK_SIZE", 7)
+        assert preprocess_documents([(content.encode(), "notes.txt")]) == expected
+    
+    def test_pdf_chunks_match_whole_text(self):
+        pages = [f"Page {i} starts here. It continues onto the next" for i in range(12)]
+        content = make_pdf(pages)
+        text = TextReconstructor().reconstruct(clean_text(extract_text_from_file(content, "doc.pdf", pdf_workers=1)))
+        streamed = list(iter_document_chunks([(content, "doc.pdf")], pdf_workers=1, chunk_size=20))
+        assert streamed == [(chunk, "doc.pdf") for chunk in chunk_text(text, chunk_size=20)]
+    
+    def test_extraction_progress(self, monkeypatch):
+        monkeypatch.setattr(preprocessing, "TEXT_BLOCK_SIZE", 10)
+        events = []
+        files = [(make_pdf(["One page.", "Two pages."]), "doc.pdf"), (b"Some plain text here.", "notes.txt")]
+        list(iter_document_chunks(files, pdf_workers=1, progress=lambda *event: events.append(event)))
+        assert events == [
+            ("doc.pdf", 0, 2, "pages"), ("doc.pdf", 1, 2, "pages"), ("doc.pdf", 2, 2, "pages"),
+            ("notes.txt", 10, 21, "bytes"), ("notes.txt", 20, 21, "bytes"), ("notes.txt", 21, 21, "bytes"),
+        ]
 
 
 class TestFileExtraction:
@@ -49,3 +232,43 @@ class TestFileExtraction:
         content = b"test"
         result = extract_text_from_file(content, "test.xyz")
         assert result == ""
+
+
+class TestPdfExtraction:
+    @pytest.fixture
+    def pdf_path(self, tmp_path):
+        path = tmp_path / "report.pdf"
+        path.write_bytes(make_pdf([f"Page number {i} of the report" for i in range(20)]))
+        return str(path)
+
+    def test_extract_pages_in_order_with_timing(self, pdf_path):
+        pages = extract_pdf_pages(pdf_path, workers=1)
+        assert [page.text for page in pages] == [f"Page number {i} of the report" for i in range(20)]
+        assert all(page.seconds >= 0 for page in pages)
+
+    def test_worker_pool_matches_in_process(self, pdf_path):
+        assert extract_text_from_pdf(pdf_path, workers=2) == extract_text_from_pdf(pdf_path, workers=1)
+
+    def test_extract_pdf_upload(self):
+        result = extract_text_from_file(make_pdf(["Hello world"]), "doc.pdf", pdf_workers=1)
+        assert result == "Hello world"
+
+    def test_bytes_match_path(self, pdf_path):
+        content = Path(pdf_path).read_bytes()
+        expected = extract_text_from_pdf(pdf_path, workers=1)
+        assert extract_text_from_pdf(content, workers=1) == expected
+        assert extract_text_from_pdf(content, workers=2) == expected
+
+    def test_upload_does_not_touch_disk(self, monkeypatch):
+        def no_temp_file(*args, **kwargs):
+            raise AssertionError("temp file created")
+        monkeypatch.setattr(tempfile, "NamedTemporaryFile", no_temp_file)
+        assert extract_text_from_file(make_pdf(["Hello world"]), "doc.pdf", pdf_workers=1) == "Hello world"
+
+    def test_worker_source_shares_bytes(self):
+        content = make_pdf(["Shared page"])
+        with worker_pdf_source(content) as source:
+            assert isinstance(source, SharedPdf)
+            assert read_source(source) == content
+        with pytest.raises(FileNotFoundError):
+            read_source(source)
@@ -24,6 +24,22 @@ class TestEmbeddingModel:
         texts = ["Hello", "World", "Test"]
         embeddings = embedding_model.encode(texts)
         assert embeddings.shape == (3, 384)
+    
+    def test_encode_query_cached(self, embedding_model):
+        first = embedding_model.encode_query("What is RAG?")
+        second = embedding_model.encode_query("what is  RAG?")
+        
+        assert second is first
+        assert first.shape == (1, 384)
+        assert embedding_model.query_cache_info()['hits'] == 1
+    
+    def test_encode_documents_uses_cache(self, tmp_path):
+        model = EmbeddingModel('all-MiniLM-L6-v2', cache_dir=str(tmp_path))
+        first = model.encode_documents(["Hello", "World"])
+        second = model.encode_documents(["World", "Hello"])
+        
+        assert model.cache.hits == 2
+        np.testing.assert_allclose(first[0], second[1])
 
 
 class TestFAISSRetriever:
@@ -52,6 +68,64 @@ class TestFAISSRetriever:
         assert len(sims) == 2
         assert sims[0] > sims[1]  # Most relevant first
     
+    def test_retrieve_cosine_scores(self, retriever):
+        retriever.build_index(["machine learning", "cooking recipes"], ["doc.txt"] * 2)
+        chunks, srcs, sims = retriever.retrieve("machine learning", k=2)
+        
+        assert chunks[0] == "machine learning"
+        assert sims[0] == pytest.approx(1.0, abs=1e-3)
+        assert all(0.0 <= s <= 1.0 for s in sims)
+    
+    def test_min_score_threshold(self, retriever):
+        retriever.build_index(["machine learning", "cooking recipes"], ["doc.txt"] * 2)
+        indices, sims = retriever.get_retrieved_indices("machine learning", k=2, min_score=0.99)
+        assert indices == [0]
+    
+    def test_add_documents(self, retriever):
+        retriever.build_index(["machine learning"], ["a.txt"])
+        retriever.add_documents(["cooking recipes"], ["b.txt"])
+        
+        assert retriever.index.ntotal == 2
+        assert retriever.sources == ["a.txt", "b.txt"]
+        indices, sims = retriever.get_retrieved_indices("cooking recipes", k=1)
+        assert indices == [1]
+    
+    def test_remove_documents(self, retriever):
+        retriever.build_index(
+            ["machine learning", "cooking recipes", "deep learning"],
+            ["a.txt", "b.txt", "a.txt"]
+        )
+        remap = retriever.remove_documents("a.txt")
+        
+        assert remap == {1: 0}
+        assert retriever.chunks == ["cooking recipes"]
+        assert retriever.index.ntotal == 1
+        indices, sims = retriever.get_retrieved_indices("machine learning", k=3)
+        assert indices == [0]
+    
+    def test_remove_documents_hnsw_tombstones(self):
+        retriever = FAISSRetriever(EmbeddingModel('all-MiniLM-L6-v2'), index_factory="HNSW16")
+        retriever.build_index(["machine learning", "cooking recipes"], ["a.txt", "b.txt"])
+        retriever.remove_documents("a.txt")
+        
+        assert retriever.tombstones == {0}
+        assert retriever.get_retrieved_indices("machine learning", k=2)[0] == [0]
+        assert retriever.needs_compaction()
+        retriever.compact()
+        assert retriever.index.ntotal == 1 and not retriever.tombstones
+    
+    def test_search_batch_matches_single_queries(self, retriever):
+        retriever.build_index(["machine learning", "cooking recipes", "deep learning"], ["doc.txt"] * 3)
+        queries = ["machine learning", "recipes for cooking"]
+        
+        batch = retriever.search_batch(queries, k=2)
+        
+        assert len(batch) == 2
+        for query, (indices, sims) in zip(queries, batch):
+            single_indices, single_sims = retriever.get_retrieved_indices(query, k=2)
+            assert indices == single_indices
+            assert sims == pytest.approx(single_sims, abs=1e-5)
+    
     def test_retrieve_without_index(self, retriever):
         chunks, srcs, sims = retriever.retrieve("test", k=5)
         assert len(chunks) == 0
@@ -0,0 +1,108 @@
+"""
+Unit tests for session manager module.
+"""
+import threading
+
+import pytest
+import networkx as nx
+from types import SimpleNamespace
+from app.modules.session_manager import SessionManager, estimate_session_bytes
+
+
+def make_session(chunk_chars=1000, is_processing=False):
+    return SimpleNamespace(
+        retriever=SimpleNamespace(index=None),
+        graph_builder=SimpleNamespace(graph=nx.Graph()),
+        chunks=["x" * chunk_chars],
+        entities=[],
+        entity_chunk_map={},
+        is_processing=is_processing,
+        processing_error=None,
+    )
+
+
+class TestSessionManager:
+    def test_estimate_counts_chunks(self):
+        assert estimate_session_bytes(make_session(5000)) > estimate_session_bytes(make_session(10))
+
+    def test_lru_eviction_over_budget(self):
+        budget = estimate_session_bytes(make_session()) * 2 + 10
+        manager = SessionManager(memory_budget_bytes=budget)
+        manager['a'] = make_session()
+        manager['b'] = make_session()
+        manager.get('a')  # 'b' is now least recently used
+        manager['c'] = make_session()
+
+        assert 'a' in manager
+        assert 'b' not in manager
+        assert 'c' in manager
+        assert manager.stats()['evictions'] == 1
+
+    def test_processing_sessions_not_evicted(self):
+        manager = SessionManager(memory_budget_bytes=1)
+        manager['a'] = make_session(is_processing=True)
+        manager['b'] = make_session()
+        assert 'a' in manager
+
+    def test_appending_sessions_not_evicted(self):
+        manager = SessionManager(memory_budget_bytes=1)
+        appending = make_session()
+        appending.is_appending = True
+        manager['a'] = appending
+        manager['b'] = make_session()
+        assert 'a' in manager
+
+    def test_failed_spill_keeps_session(self):
+        class FailingStore:
+            def exists(self, session_id):
+                return False
+
+            def save(self, session):
+                raise OSError("disk full")
+
+        manager = SessionManager(idle_ttl_seconds=60, store=FailingStore())
+        manager['a'] = make_session()
+        manager._last_access['a'] -= 120
+        assert manager.evict_idle() == []
+        assert 'a' in manager
+        assert manager.stats()['evictions'] == 0
+
+    def test_spill_runs_outside_lock(self):
+        manager = SessionManager(idle_ttl_seconds=60)
+
+        class LockCheckingStore:
+            saved = []
+
+            def exists(self, session_id):
+                return False
+
+            def save(self, session):
+                # Another thread must be able to take the manager lock during the write
+                def try_lock():
+                    if manager._lock.acquire(timeout=1):
+                        manager._lock.release()
+                        self.saved.append(session)
+
+                thread = threading.Thread(target=try_lock)
+                thread.start()
+                thread.join()
+
+        manager.store = LockCheckingStore()
+        manager['a'] = make_session()
+        manager._last_access['a'] -= 120
+        assert manager.evict_idle() == ['a']
+        assert len(manager.store.saved) == 1
+
+    def test_idle_ttl(self):
+        manager = SessionManager(idle_ttl_seconds=60)
+        manager['a'] = make_session()
+        manager._last_access['a'] -= 120
+        assert manager.evict_idle() == ['a']
+        assert len(manager) == 0
+
+    def test_pop_and_missing_key(self):
+        manager = SessionManager()
+        manager['a'] = make_session()
+        assert manager.pop('a') is not None
+        with pytest.raises(KeyError):
+            manager['a']
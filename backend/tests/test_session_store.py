@@ -0,0 +1,107 @@
+"""
+Unit tests for session store module.
+"""
+import pytest
+import numpy as np
+import faiss
+import networkx as nx
+from types import SimpleNamespace
+from app.modules.retrieval import FAISSRetriever
+from app.modules.session_store import SessionStore
+
+
+def make_session(session_id):
+    index = faiss.IndexFlatL2(4)
+    index.add(np.eye(4, dtype=np.float32)[:2])
+    graph = nx.Graph()
+    graph.add_edge('Alice', 'Bob', relation='co-occurs-in-chunk', weight=1.0)
+    return SimpleNamespace(
+        session_id=session_id,
+        retriever=SimpleNamespace(index=index, chunks=[], sources=[]),
+        graph_builder=SimpleNamespace(graph=graph),
+        chunks=["Alice met Bob.", "Bob left."],
+        display_chunks=["Alice met Bob.", "Bob left."],
+        reconstruction_version=1,
+        sources=["a.txt", "a.txt"],
+        entities=[{'name': 'Alice', 'type': 'UNKNOWN', 'source_chunk_id': 0}],
+        entity_chunk_map={0: [{'name': 'Alice', 'type': 'UNKNOWN', 'start': 0}], 1: []},
+        documents_metadata={},
+        total_entities=1,
+        total_graph_edges=1,
+        is_processing=False,
+        processing_error=None,
+        processing_stage='completed',
+    )
+
+
+def make_empty_session(session_id):
+    return SimpleNamespace(
+        session_id=session_id,
+        retriever=SimpleNamespace(index=None, chunks=[], sources=[]),
+        graph_builder=SimpleNamespace(graph=nx.Graph()),
+    )
+
+
+class TestSessionStore:
+    @pytest.fixture
+    def store(self, tmp_path):
+        return SessionStore(str(tmp_path))
+
+    def test_save_and_load_roundtrip(self, store):
+        store.save(make_session('abc-123'))
+        loaded = make_empty_session('abc-123')
+
+        assert store.load(loaded)
+        assert loaded.chunks == ["Alice met Bob.", "Bob left."]
+        assert loaded.retriever.index.ntotal == 2
+        assert loaded.retriever.chunks is loaded.chunks
+        assert 0 in loaded.entity_chunk_map
+        assert loaded.graph_builder.graph.has_edge('Alice', 'Bob')
+        assert loaded.display_chunks == ["Alice met Bob.", "Bob left."]
+        assert loaded.reconstruction_version == 1
+
+    def test_update_reloaded_ivf_session(self, store):
+        embeddings = np.random.default_rng(0).random((400, 8), dtype=np.float32)
+        session = make_session('abc-123')
+        session.retriever = FAISSRetriever(None, index_factory="IVF8,Flat", metric="l2")
+        session.chunks = [f"chunk {i}" for i in range(400)]
+        session.sources = ["a.txt"] * 200 + ["b.txt"] * 200
+        session.retriever.build_index(session.chunks, session.sources, embeddings)
+        store.save(session)
+        loaded = make_empty_session('abc-123')
+        loaded.retriever = FAISSRetriever(None, index_factory="IVF8,Flat", metric="l2")
+
+        assert store.load(loaded)
+        # The reloaded lists are memory-mapped and read-only until the first update
+        loaded.retriever.add_documents(["new"], ["c.txt"], embeddings[:1] + 1)
+        loaded.retriever.remove_documents("a.txt")
+
+        assert loaded.retriever.index.ntotal == 201
+        assert not loaded.retriever.tombstones
+        assert loaded.retriever.sources == ["b.txt"] * 200 + ["c.txt"]
+        _, ids = loaded.retriever.index.search(embeddings[:1] + 1, 1)
+        assert ids[0][0] == 400
+
+    def test_load_without_display_chunks(self, store):
+        session = make_session('abc-123')
+        del session.display_chunks, session.reconstruction_version
+        store.save(session)
+        loaded = make_empty_session('abc-123')
+
+        assert store.load(loaded)
+        assert loaded.display_chunks == []
+        assert loaded.reconstruction_version is None
+
+    def test_load_missing_session(self, store):
+        assert not store.load(make_empty_session('missing'))
+
+    def test_delete(self, store):
+        store.save(make_session('abc-123'))
+        assert store.list_sessions() == ['abc-123']
+        assert store.delete('abc-123')
+        assert not store.exists('abc-123')
+
+    def test_rejects_unsafe_session_id(self, store):
+        assert not store.exists('../etc')
+        with pytest.raises(ValueError):
+            store.save(make_session('../etc'))
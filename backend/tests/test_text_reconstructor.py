@@ -0,0 +1,74 @@
+"""
+Unit tests for text reconstruction module.
+"""
+import random
+import re
+
+import pytest
+from app.modules.text_reconstructor import TextReconstructor
+
+
+@pytest.fixture
+def reconstructor():
+    return TextReconstructor()
+
+
+def sequential_spacing(text: str) -> str:
+    """The spacing rules applied one pass at a time."""
+    text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text)
+    text = re.sub(r'([a-z])([A-Z][a-z])', r'\1 \2', text)
+    text = re.sub(r'(\.)([A-Z])', r'\1 \2', text)
+    text = re.sub(r'([a-zA-Z])(\d)', r'\1 \2', text)
+    text = re.sub(r'(\d)([a-zA-Z])', r'\1 \2', text)
+    text = re.sub(r'([\)\]\}])([A-Za-z])', r'\1 \2', text)
+    return re.sub(r' {2,}', ' ', text)
+
+
+def sequential_greek(text: str) -> str:
+    """Greek letter names substituted one word at a time."""
+    for word, symbol in TextReconstructor.GREEK_LETTERS.items():
+        text = re.sub(rf'\b{word}\b', symbol, text, flags=re.IGNORECASE)
+    return text
+
+
+class TestReconstruction:
+    def test_inserts_missing_spaces(self, reconstructor):
+        result = reconstructor.reconstruct("The mechanism usesSoftmax over2 heads.")
+        assert result == "The mechanism uses Softmax over 2 heads."
+
+    def test_replaces_greek_letter_names(self, reconstructor):
+        result = reconstructor.reconstruct("learning rate alpha and Beta decay, not alphabet")
+        assert result == "learning rate α and β decay, not alphabet"
+
+    def test_removes_extraction_markers(self, reconstructor):
+        result = reconstructor.reconstruct("text (cid:12) here [Chunk 3] more")
+        assert result == "text here more"
+
+    def test_normalizes_whitespace_and_punctuation(self, reconstructor):
+        assert reconstructor.reconstruct("Some text  ,  with spaces ; ok") == "Some text, with spaces; ok"
+        assert reconstructor.reconstruct("line one  \r\n\n\n\n \tline two") == "line one\n\nline two"
+
+    def test_splits_concatenated_known_words(self, reconstructor):
+        assert reconstructor.fix_concatenated_words("wordpieceModel") == "wordpiece Model"
+        assert reconstructor.fix_concatenated_words("isModel") == "is Model"
+        assert reconstructor.fix_concatenated_words("xyzQuux") == "xyzQuux"
+
+
+class TestFusedPasses:
+    ALPHABET = 'aAbBzZTtk19 .,;()[]{}\n\t_éÉαßſı'
+
+    def random_texts(self, count=2000):
+        rng = random.Random(0)
+        for _ in range(count):
+            yield ''.join(rng.choice(self.ALPHABET) for _ in range(rng.randint(0, 30)))
+
+    def test_spacing_matches_sequential_rules(self, reconstructor):
+        for text in self.random_texts():
+            assert reconstructor.fix_spacing_patterns(text) == sequential_spacing(text)
+
+    def test_greek_matches_sequential_rules(self, reconstructor):
+        words = list(TextReconstructor.GREEK_LETTERS) + ['ſigma', 'ETA', 'zetas', 'x']
+        rng = random.Random(1)
+        for _ in range(500):
+            text = ' '.join(rng.choice(words) for _ in range(rng.randint(1, 8)))
+            assert reconstructor.fix_equations(text) == sequential_greek(reconstructor._TRANSPOSE.sub(r'\1^T \2', text))
@@ -0,0 +1,78 @@
+"""
+Unit tests for word segmentation module.
+"""
+import pytest
+from app.modules import word_segmentation
+from app.modules.word_segmentation import (
+    WordSegmenter, configure_segmenter, get_segmenter, load_word_list
+)
+
+
+class TestWordSegmenter:
+    @pytest.fixture
+    def segmenter(self):
+        return WordSegmenter(['each', 'that', 'is', 'model', 'transformer'])
+
+    def test_word_ends_at(self, segmenter):
+        text = "eachDimension"
+        assert segmenter.word_ends_at(text, 4, min_length=2, max_length=11)
+        assert not segmenter.word_ends_at(text, 3, min_length=2, max_length=11)
+
+    def test_word_ends_at_respects_length_bounds(self, segmenter):
+        assert not segmenter.word_ends_at("thisIs", 4, min_length=3, max_length=9)
+        assert segmenter.word_ends_at("xisY", 3, min_length=2, max_length=9)
+        assert not segmenter.word_ends_at("xisY", 3, min_length=3, max_length=9)
+        assert not segmenter.word_ends_at("transformerX", 11, min_length=2, max_length=9)
+
+    def test_matching_is_case_insensitive(self, segmenter):
+        assert segmenter.word_ends_at("THATx", 4)
+        assert "Model" in segmenter
+
+    def test_split_at_known_words(self, segmenter):
+        assert segmenter.split("eachDimension and thatModel") == "each Dimension and that Model"
+        assert segmenter.split("fooBar") == "fooBar"
+
+    def test_split_on_known_suffix(self, segmenter):
+        assert segmenter.split("fooModel") == "fooModel"
+        assert segmenter.split("fooModel", match_suffix=True) == "foo Model"
+
+    def test_case_boundaries_outside_ascii(self):
+        assert WordSegmenter.case_boundaries("caféAu lait") == [4]
+        assert WordSegmenter.case_boundaries("aÉb") == [1]
+
+    def test_long_text_is_handled(self, segmenter):
+        text = "eachModel " * 20000
+        assert segmenter.split(text) == "each Model " * 20000
+
+    def test_suffix_matching_keeps_split_linear(self):
+        class CountingSegmenter(WordSegmenter):
+            examined = 0
+
+            def __contains__(self, word):
+                CountingSegmenter.examined += len(word)
+                return super().__contains__(word)
+
+        segmenter = CountingSegmenter(['each', 'model'])
+        # A case boundary every three characters and no known words
+        text = "xqZ" * 10000
+        assert segmenter.split(text, match_suffix=True) == text
+        # Slicing the rest of the text at each boundary would examine ~len(text)**2 / 6 characters
+        assert CountingSegmenter.examined <= len(text)
+
+
+class TestSharedSegmenter:
+    @pytest.fixture(autouse=True)
+    def restore_segmenter(self):
+        original = word_segmentation._segmenter
+        yield
+        word_segmentation._segmenter = original
+
+    def test_configure_adds_domain_words(self, tmp_path):
+        path = tmp_path / "words.txt"
+        path.write_text("# chemistry\nbenzene\n\nToluene  # solvent\n")
+        words = load_word_list(str(path))
+        assert words == ["benzene", "Toluene"]
+
+        configure_segmenter(words)
+        assert get_segmenter().split("tolueneRing") == "toluene Ring"
+        assert "the" in get_segmenter()
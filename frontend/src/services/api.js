@@ -95,7 +95,7 @@ export const waitForUploadCompletion = async (
     try {
       const status = await checkUploadStatus(sessionId);
       console.log(
-        `[POLL] Upload status: ${status.overall_status}, stage: ${status.current_stage}`,
+        `[POLL] Upload status: ${status.overall_status}, stage: ${status.current_stage}, progress: ${status.progress}%, ETA: ${status.eta_seconds ?? "?"}s`,
       );
 
       if (status.overall_status === "completed") {
@@ -107,8 +107,11 @@ export const waitForUploadCompletion = async (
         throw new Error(`Upload error: ${status.error_message}`);
       }
 
-      // Wait before next poll
-      await new Promise((resolve) => setTimeout(resolve, pollIntervalMs));
+      // Wait before next poll, as long as the server suggests from its ETA
+      const delayMs = status.poll_after_seconds
+        ? status.poll_after_seconds * 1000
+        : pollIntervalMs;
+      await new Promise((resolve) => setTimeout(resolve, delayMs));
     } catch (error) {
       // If session not found yet, try again
       if (error.response?.status === 404) {